@@ -4,29 +4,63 @@ import numpy as np
 import os
 import threading
 import time
-import pickle
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from .config import MONGODB_URI, DATABASE_NAME, COLLECTION_NAME
+from .config import (
+    MONGODB_URI, DATABASE_NAME, COLLECTION_NAME,
+    GALLERY_SEARCH, GALLERY_IVF_NLIST, GALLERY_IVF_NPROBE, GALLERY_PROTOTYPES,
+    ENCODINGS_CACHE_DIR, ENCODING_MODEL_VERSION, ENCODING_WORKERS, ENCODING_MAX_PENDING,
+    MOTION_GATE_ENABLED, MOTION_THRESHOLD, MOTION_HOLD, MOTION_IDLE_INTERVAL,
+    INFERENCE_TORCH_THREADS, INFERENCE_FACE_WORKERS,
+    FACE_TRACK_REVERIFY, FACE_TRACK_IOU, FACE_TRACK_MAX_MISSES,
+    EVENT_LEAVE_AFTER, EVENT_COOLDOWN,
+    LOG_QUEUE_SIZE, LOG_BATCH_SIZE, LOG_FLUSH_INTERVAL,
+    STATS_RECONCILE_INTERVAL,
+    EVENT_RETENTION_DAYS,
+    CAMERA_FPS, CAMERA_WIDTH, CAMERA_HEIGHT, CAMERA_RECONNECT_MIN, CAMERA_RECONNECT_MAX,
+)
 from pymongo import MongoClient
 from ultralytics import YOLO
 import torch 
 from .emergency_manager import EmergencyManager
+from .frame_broadcast import FrameBroadcaster
+from .frame_sources import open_source, Backoff
+from .stage_timer import stage_timer
+from .metrics import FRAMES_GRABBED, FRAME_READ_FAILURES, RECONNECTS
+from .motion_gate import MotionGate
+from .face_tracker import FaceTracker
+from .event_aggregator import EventAggregator
+from .log_writer import LogWriter
+from .db_provider import DatabaseUnavailable
+from .dashboard_stats import DashboardStats
+from .event_hub import EventHub
+from .event_store import EventStore
+from .face_gallery import FaceGallery, compact_encodings
+from .encoding_store import EncodingStore
+from .encoding_pool import EncodingPool
 
 class CameraStream:
-    def __init__(self, src, name):
+    def __init__(self, src, name, fps=CAMERA_FPS, width=CAMERA_WIDTH, height=CAMERA_HEIGHT, camera_id=None):
         self.src = src
-        self.name = name
+        self.name = name # Display label, may change or repeat
+        self.camera_id = name if camera_id is None else camera_id # Stable key for trackers, events and metrics
         
-        # Initialize Stream
-        self.stream = cv2.VideoCapture(self.src, cv2.CAP_DSHOW)
-        (self.grabbed, self.frame) = self.stream.read()
+        # Initialize Stream (device, URL, video file, image folder or "synthetic")
+        self.source = open_source(self.src, fps, width, height)
+        self.source.open()
+        (self.grabbed, self.frame) = self.source.read()
+        self.backoff = Backoff(CAMERA_RECONNECT_MIN, CAMERA_RECONNECT_MAX)
+        self.reconnects = 0
+        self.stop_event = threading.Event()
         self.started = False
         self.read_lock = threading.Lock()
         self.output_frame = None
         self.roi_mask = None # For ROI
+        self.broadcaster = FrameBroadcaster(self.camera_id) # Shared JPEG fan-out for video_feed viewers
         
         if self.grabbed:
             self.output_frame = self.frame.copy()
+            self.broadcaster.publish(self.output_frame)
 
         # Async Processing State
         self.latest_overlays = []
@@ -35,6 +69,11 @@ class CameraStream:
         # Pipeline Functions
         self.detector_func = None
         self.drawer_func = None
+        
+        # Skips heavy detection while the (ROI) scene is static
+        self.motion_gate = None
+        if MOTION_GATE_ENABLED:
+            self.motion_gate = MotionGate(threshold=MOTION_THRESHOLD, hold=MOTION_HOLD, idle_interval=MOTION_IDLE_INTERVAL)
 
     def set_roi(self, roi_data):
         """
@@ -83,22 +122,28 @@ class CameraStream:
         self.detector_func = detector
         self.drawer_func = drawer
 
-    def start(self):
+    def start(self, run_detector=True):
+        """Starts the grabber thread, and the per-stream detection thread unless an InferenceScheduler drives detection"""
         if self.started: return self
         self.started = True
         
         # Start Frame Grabber & Drawer Thread
-        self.thread = threading.Thread(target=self.update, args=())
+        self.thread = threading.Thread(target=self.update, args=(), name=f"camera:{self.name}:grab")
         self.thread.daemon = True
         self.thread.start()
         
         # Start AI Detection Thread
-        self.detect_thread = threading.Thread(target=self.run_detection, args=())
-        self.detect_thread.daemon = True
-        self.detect_thread.start()
+        if run_detector:
+            self.detect_thread = threading.Thread(target=self.run_detection, args=(), name=f"camera:{self.name}:detect")
+            self.detect_thread.daemon = True
+            self.detect_thread.start()
         
         return self
 
+    def set_overlays(self, results):
+        with self.overlay_lock:
+            self.latest_overlays = results
+
     def run_detection(self):
         """Background thread for heavy AI processing"""
         while self.started:
@@ -107,12 +152,16 @@ class CameraStream:
                     # Use a copy of the frame to avoid tearing/race conditions
                     detect_frame = self.frame.copy()
                     
+                    # Motion gate (Cheap): keep the last overlays if nothing changed
+                    if self.motion_gate and not self.motion_gate.should_detect(detect_frame, self.roi_mask):
+                        time.sleep(0.08)
+                        continue
+                    
                     # Run Detection (Slow)
-                    results = self.detector_func(detect_frame, self.roi_mask)
+                    results = self.detector_func(detect_frame, self.roi_mask, self.camera_id)
                     
                     # Update Overlays safely
-                    with self.overlay_lock:
-                        self.latest_overlays = results
+                    self.set_overlays(results)
                         
                 except Exception as e:
                     print(f"Detection Thread Error: {e}")
@@ -124,17 +173,25 @@ class CameraStream:
         """Main loop for grabbing frames and drawing overlays (Fast)"""
         while self.started:
             try:
-                (grabbed, frame) = self.stream.read()
+                self.source.pace()
+                with stage_timer.measure("decode", self.camera_id):
+                    (grabbed, frame) = self.source.read()
                 self.grabbed = grabbed
                 if not grabbed:
-                    # Retry logic
-                    time.sleep(0.5)
+                    FRAME_READ_FAILURES.inc(self.camera_id)
+                    # Reconnect with exponential backoff (a dead source isn't hammered)
+                    if self.stop_event.wait(self.backoff.next()):
+                        break
                     try:
-                         self.stream.release()
-                         self.stream = cv2.VideoCapture(self.src, cv2.CAP_DSHOW)
-                    except: pass
+                        self.reconnects += 1
+                        RECONNECTS.inc(self.camera_id)
+                        self.source.open()
+                    except Exception as e:
+                        print(f"Reconnect Error ({self.name}): {e}")
                     continue
                 
+                self.backoff.reset()
+                FRAMES_GRABBED.inc(self.camera_id)
                 self.frame = frame
                 
                 # Draw Overlays (Fast)
@@ -145,11 +202,13 @@ class CameraStream:
                     
                     # Render
                     try:
-                        self.output_frame = self.drawer_func(frame.copy(), current_overlays, self.roi_mask)
+                        with stage_timer.measure("draw", self.camera_id):
+                            self.output_frame = self.drawer_func(frame.copy(), current_overlays, self.roi_mask)
                     except Exception as e:
                         self.output_frame = frame
                 else:
                     self.output_frame = frame
+                self.broadcaster.publish(self.output_frame)
                 
                 # Cap Video FPS slightly to save resources, but keep it smooth
                 time.sleep(0.01)
@@ -164,18 +223,20 @@ class CameraStream:
 
     def stop(self):
         self.started = False
+        self.stop_event.set()
         if hasattr(self, 'thread') and self.thread.is_alive():
              self.thread.join(timeout=1.0)
-        self.stream.release()
+        self.source.release()
 
 class CameraManager:
-    def __init__(self, app_config, db):
+    def __init__(self, app_config, db, encodings_dir=ENCODINGS_CACHE_DIR):
         self.app_config = app_config
         self.db = db
         self.persons = self.db[COLLECTION_NAME]
         
         # Initialize Emergency Manager
-        self.emergency = EmergencyManager(self.db)
+        self.hub = EventHub() # Server-sent events for dashboards
+        self.emergency = EmergencyManager(self.db, hub=self.hub)
         
         # Initialize YOLO
         print("Loading YOLOv8 model...")
@@ -185,6 +246,8 @@ class CameraManager:
         except:
             pass
             
+        if INFERENCE_TORCH_THREADS > 0:
+            torch.set_num_threads(INFERENCE_TORCH_THREADS)
         self.model = YOLO('yolov8n.pt') 
         self.threat_classes = {
             43: "Knife", 76: "Scissors",
@@ -194,31 +257,29 @@ class CameraManager:
         }
         self.class_names = self.model.names
 
-        self.known_face_encodings = []
-        self.known_face_names = []
-        self.known_face_relations = [] # To store relation (e.g. employee, family)
+        # Face stage of a batch (locate/encode per frame) runs on a few threads: dlib releases
+        # the GIL, so cameras still use several cores after sharing one scheduler thread
+        self.face_pool = ThreadPoolExecutor(max_workers=INFERENCE_FACE_WORKERS, thread_name_prefix="face") if INFERENCE_FACE_WORKERS > 1 else None
+        self.auto_reg_lock = threading.Lock() # "Unknown N" names are allocated from several face threads
+
+        # Known faces: one contiguous matrix + parallel name/relation arrays
+        self.gallery = self._new_gallery()
+        self.gallery_lock = threading.Lock() # Guards the gallery swap and the change log below
+        self.reload_lock = threading.Lock() # One full reload at a time
+        self._gallery_changes = None # [(method, args)] made while a reload builds its gallery
+        self.face_trackers = {} # camera -> FaceTracker
+        self.events = EventAggregator(leave_after=EVENT_LEAVE_AFTER, cooldown=EVENT_COOLDOWN)
+        self.encoding_store = EncodingStore(encodings_dir, model_version=ENCODING_MODEL_VERSION)
+        self.encoder = EncodingPool(self.encoding_store, workers=ENCODING_WORKERS, max_pending=ENCODING_MAX_PENDING)
         
-        # Stats
-        self.stats = {
-            "suspects": 0,
-            "unknown": 0,
-            "known": 0,
-            "traffic": 0,
-            "history": [], 
-            "suspect_logs": []
-        }
+        # Events: day-partitioned collections + hourly/daily rollups
+        self.event_store = EventStore(self.db, retention_days=EVENT_RETENTION_DAYS)
         
-        # Hydrate stats from DB
-        try:
-            recent_logs = list(self.db['suspect_logs'].find().sort("timestamp", -1).limit(20))
-            for log in recent_logs:
-                if '_id' in log: del log['_id'] 
-                if 'timestamp' in log: del log['timestamp']
-            self.stats['history'] = recent_logs
-            self.stats['suspect_logs'] = recent_logs 
-        except Exception as e:
-            print(f"Error hydrating stats: {e}")
-        self.stats_lock = threading.Lock()
+        # Stats (maintained incrementally, reconciled against the DB in the background)
+        self.dashboard = DashboardStats()
+        self._reconcile_now = threading.Event()
+        self.reconcile_stats()
+        threading.Thread(target=self._reconcile_loop, name="stats-reconcile", daemon=True).start()
         
         # Auto-Registration Counter
         last_unknown = self.persons.find_one({"name": {"$regex": r"^Unknown \d+"}}, sort=[("created_at", -1)])
@@ -231,6 +292,21 @@ class CameraManager:
         self.captures_dir = os.path.join(app_config['UPLOAD_FOLDER'], 'captures')
         os.makedirs(self.captures_dir, exist_ok=True)
         
+        # Event rows + snapshots are written off the detection path
+        self.log_writer = LogWriter(
+            lambda: self.event_store,
+            max_queue=LOG_QUEUE_SIZE, batch_size=LOG_BATCH_SIZE, flush_interval=LOG_FLUSH_INTERVAL,
+            retry_on=(DatabaseUnavailable,)
+        )
+        # Auto-registered faces (person row + face crop) go through their own bounded writer
+        self.known_dir = os.path.join(app_config['UPLOAD_FOLDER'], 'known')
+        os.makedirs(self.known_dir, exist_ok=True)
+        self.person_writer = LogWriter(
+            lambda: self.persons,
+            max_queue=LOG_QUEUE_SIZE, batch_size=LOG_BATCH_SIZE, flush_interval=LOG_FLUSH_INTERVAL,
+            retry_on=(DatabaseUnavailable,)
+        )
+        
         self.load_known_faces()
 
     def set_camera_roi(self, device_id, roi_data, cameras_dict):
@@ -241,130 +317,122 @@ class CameraManager:
              return True
         return False
 
-    def _load_cache(self):
-        cache_path = "encodings_cache.pkl"
-        if os.path.exists(cache_path):
-            try:
-                with open(cache_path, 'rb') as f:
-                    return pickle.load(f)
-            except Exception as e:
-                print(f"Warning: Cache corrupted or unreadable ({e}). Ignoring.")
-        return {}
+    def _new_gallery(self):
+        if GALLERY_SEARCH == "ivf":
+            return FaceGallery(search="ivf", nlist=GALLERY_IVF_NLIST, nprobe=GALLERY_IVF_NPROBE)
+        return FaceGallery()
 
-    def _save_cache(self, cache):
-        try:
-            with open("encodings_cache.pkl", 'wb') as f:
-                pickle.dump(cache, f)
-        except Exception as e:
-            print(f"Warning: Could not save cache: {e}")
+    def _change_gallery(self, method, *args):
+        """Applies add/replace/remove to the live gallery, and records it for a reload in progress."""
+        with self.gallery_lock:
+            getattr(self.gallery, method)(*args)
+            if self._gallery_changes is not None:
+                self._gallery_changes.append((method, args))
+
+    def _encode_persons(self, persons):
+        """
+        Returns one list of encodings per person: every sample in `photo_dir`, or the
+        single `photo` when no sample has a face. All images go through the parallel
+        encoding pool in one batch per pass.
+        """
+        upload = self.app_config['UPLOAD_FOLDER']
+        sample_paths = []
+        for person in persons:
+            paths = []
+            if 'photo_dir' in person and person['photo_dir']:
+                 dir_path = os.path.join(upload, person['photo_dir'])
+                 if os.path.exists(dir_path):
+                     for fname in os.listdir(dir_path):
+                         if not fname.lower().endswith(('.jpg', '.jpeg', '.png')): continue
+                         paths.append(os.path.join(dir_path, fname))
+            sample_paths.append(paths)
+
+        # Directory samples
+        encoded = self.encoder.encode_files([p for paths in sample_paths for p in paths])
+        person_encodings = [[encoded[p] for p in paths if encoded.get(p) is not None] for paths in sample_paths]
+
+        # Single file fallback
+        fallback = {i: os.path.join(upload, person['photo']) for i, person in enumerate(persons)
+                    if not person_encodings[i] and person.get('photo')}
+        if fallback:
+            encoded = self.encoder.encode_files(list(fallback.values()))
+            for i, path in fallback.items():
+                if encoded.get(path) is not None:
+                    person_encodings[i].append(encoded[path])
+
+        return person_encodings
 
     def load_known_faces(self):
         """Loads known faces from database with caching to improve performance."""
         print("Loading known faces...")
-        self.known_face_encodings = []
-        self.known_face_names = []
-        self.known_face_relations = []
-        
-        cache = self._load_cache()
-        new_cache = {}
         
-        all_persons = list(self.persons.find())
-        
-        def get_encoding(path):
-            if path in cache:
-                new_cache[path] = cache[path]
-                return cache[path]
-            
-            if not os.path.exists(path): return None
+        # Build the new gallery off to the side and swap it in, so detection keeps
+        # matching against the old one while images are being encoded. Changes made to
+        # the live gallery meanwhile (enrolment jobs, auto-registration) are replayed
+        # onto the new one before the swap, so none are lost.
+        with self.reload_lock:
+            with self.gallery_lock:
+                self._gallery_changes = []
             try:
-                image = face_recognition.load_image_file(path)
-                encs = face_recognition.face_encodings(image)
-                if len(encs) > 0:
-                    new_cache[path] = encs[0]
-                    return encs[0]
-            except Exception as e:
-                print(f"Error processing {path}: {e}")
-            return None
-
-        for person in all_persons:
-            encodings_found = 0
-            
-            # Directory
-            if 'photo_dir' in person and person['photo_dir']:
-                 dir_path = os.path.join(self.app_config['UPLOAD_FOLDER'], person['photo_dir'])
-                 if os.path.exists(dir_path):
-                     for fname in os.listdir(dir_path):
-                         if not fname.lower().endswith(('.jpg', '.jpeg', '.png')): continue
-                         full_path = os.path.join(dir_path, fname)
-                         enc = get_encoding(full_path)
-                         if enc is not None:
-                             self.known_face_encodings.append(enc)
-                             self.known_face_names.append(person['name'])
-                             self.known_face_relations.append(person['relation'])
-                             encodings_found += 1
-            
-            # Single File
-            if encodings_found == 0:
-                photo_path = os.path.join(self.app_config['UPLOAD_FOLDER'], person['photo'])
-                enc = get_encoding(photo_path)
-                if enc is not None:
-                    self.known_face_encodings.append(enc)
-                    self.known_face_names.append(person['name'])
-                    self.known_face_relations.append(person['relation'])
-
-        self._save_cache(new_cache)
-        print(f"Loaded {len(self.known_face_names)} faces.")
+                gallery = self._new_gallery()
+                errors = self.encoder.errors
+                all_persons = list(self.persons.find({}, {"photo_bin": 0}))
+                for person, encodings in zip(all_persons, self._encode_persons(all_persons)):
+                    if encodings:
+                        gallery.add_many(compact_encodings(encodings, GALLERY_PROTOTYPES), person['name'], person['relation'])
+                with self.gallery_lock:
+                    for method, args in self._gallery_changes:
+                        getattr(gallery, method)(*args)
+                    self.gallery = gallery
+            finally:
+                with self.gallery_lock:
+                    self._gallery_changes = None
+
+        # Drop cache rows for images that no longer exist once they dominate the file. Only
+        # after a clean full pass: then every live image was touched, and nothing else is lost
+        clean = self.encoder.errors == errors
+        if clean and self.encoding_store.dead_rows() > max(64, len(self.encoding_store.touched)):
+            self.encoding_store.compact()
+        print(f"Loaded {len(self.gallery)} faces.")
 
     def add_person_to_memory(self, person_data):
         print(f"Adding person incrementally: {person_data['name']}")
-        encodings_to_add = []
-        
-        if 'photo_dir' in person_data and person_data['photo_dir']:
-             dir_path = os.path.join(self.app_config['UPLOAD_FOLDER'], person_data['photo_dir'])
-             if os.path.exists(dir_path):
-                 for fname in os.listdir(dir_path):
-                     if not fname.lower().endswith(('.jpg', '.jpeg', '.png')): continue
-                     full_path = os.path.join(dir_path, fname)
-                     try:
-                         image = face_recognition.load_image_file(full_path)
-                         encs = face_recognition.face_encodings(image)
-                         if encs: encodings_to_add.append(encs[0])
-                     except: pass
-        
-        if not encodings_to_add and 'photo' in person_data:
-             photo_path = os.path.join(self.app_config['UPLOAD_FOLDER'], person_data['photo'])
-             try:
-                 image = face_recognition.load_image_file(photo_path)
-                 encs = face_recognition.face_encodings(image)
-                 if encs: encodings_to_add.append(encs[0])
-             except: pass
+        encodings_to_add = self._encode_persons([person_data])[0]
 
         if encodings_to_add:
-            for enc in encodings_to_add:
-                self.known_face_encodings.append(enc)
-                self.known_face_names.append(person_data['name'])
-                self.known_face_relations.append(person_data['relation'])
+            # The whole photo_dir was re-encoded, so swap out the person's old rows in one step
+            self._change_gallery("replace", person_data['name'], compact_encodings(encodings_to_add, GALLERY_PROTOTYPES), person_data['relation'])
+        return len(encodings_to_add)
 
     def remove_person_from_memory(self, name):
         """Incrementally removes a person from memory by name."""
-        indices_to_remove = [i for i, n in enumerate(self.known_face_names) if n == name]
-        for index in sorted(indices_to_remove, reverse=True):
-            del self.known_face_encodings[index]
-            del self.known_face_names[index]
-            del self.known_face_relations[index]
+        self._change_gallery("remove", name)
 
     # --- NEW ARCHITECTURE METHODS ---
     
-    def detect_task(self, frame, roi_mask=None):
+    def detect_task(self, frame, roi_mask=None, camera=None):
         """Task that runs detection and returns overlays (runs in BG thread)"""
-        # Apply ROI ONLY for detection
-        detect_frame = frame
-        if roi_mask is not None:
-            try:
-                detect_frame = cv2.bitwise_and(frame, frame, mask=roi_mask)
-            except: pass
+        return self.detect_batch([(frame, roi_mask, camera)])[0]
+
+    def detect_batch(self, items):
+        """
+        Runs detection for several frames at once (used by the InferenceScheduler).
+        items: [(frame, roi_mask, camera), ...]. Returns one overlay list per item.
+        """
+        frames = []
+        cameras = []
+        for frame, roi_mask, camera in items:
+            cameras.append(camera)
+            # Apply ROI ONLY for detection
+            detect_frame = frame
+            if roi_mask is not None:
+                try:
+                    detect_frame = cv2.bitwise_and(frame, frame, mask=roi_mask)
+                except: pass
+            frames.append(detect_frame)
             
-        return self._detect_faces_and_objects(detect_frame)
+        with stage_timer.measure("detect", cameras[0] if len(cameras) == 1 else None):
+            return self._detect_faces_and_objects(frames, cameras)
 
     def draw_task(self, frame, overlays, roi_mask=None):
         """Task that draws overlays on the frame (runs in Main Stream thread)"""
@@ -376,70 +444,110 @@ class CameraManager:
             
         return frame
 
-    def _detect_faces_and_objects(self, frame):
-        """Runs heavy AI detection and returns list of overlay data"""
-        overlays = []
+    def _detect_faces_and_objects(self, frames, cameras=None):
+        """Runs heavy AI detection on a batch of frames and returns one list of overlay data per frame"""
+        cameras = cameras or [None] * len(frames)
         
         # Resize for speed
+        with stage_timer.measure("resize"):
+            rgb_small_frames = [cv2.resize(frame, (0, 0), fx=0.5, fy=0.5)[:, :, ::-1] for frame in frames]
+
+        if self.face_pool is not None and len(frames) > 1:
+            overlays = list(self.face_pool.map(self._detect_faces, frames, rgb_small_frames, cameras))
+        else:
+            overlays = [self._detect_faces(frame, rgb_small, camera) for frame, rgb_small, camera in zip(frames, rgb_small_frames, cameras)]
+
+        # --- YOLO OBJECT DETECTION ---
+        # One batched forward pass for every frame in the batch
+        with stage_timer.measure("yolo"):
+            results = self.model(rgb_small_frames, verbose=False, iou=0.5, conf=0.4)
+        for frame, result, frame_overlays, camera in zip(frames, results, overlays, cameras):
+            frame_overlays.extend(self._detect_objects(frame, result, camera))
+            self._close_episodes(camera)
+            
+        return overlays
+
+    def _face_tracker(self, camera):
+        if camera not in self.face_trackers:
+            self.face_trackers[camera] = FaceTracker(
+                iou_threshold=FACE_TRACK_IOU, max_misses=FACE_TRACK_MAX_MISSES, reverify_interval=FACE_TRACK_REVERIFY
+            )
+        return self.face_trackers[camera]
+
+    def _detect_faces(self, frame, rgb_small_frame, camera=None):
+        """Face recognition and auto-registration for one frame"""
+        overlays = []
         h, w = frame.shape[:2]
-        small_frame = cv2.resize(frame, (0, 0), fx=0.5, fy=0.5)
-        rgb_small_frame = small_frame[:, :, ::-1]
+        now = time.time()
 
         # --- FACE RECOGNITION ---
-        face_locations = face_recognition.face_locations(rgb_small_frame)
-        face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations)
+        with stage_timer.measure("face_locate", camera):
+            face_locations = face_recognition.face_locations(rgb_small_frame)
+
+        # Track faces between cycles; only new, stale or moved tracks are encoded again
+        tracker = self._face_tracker(camera)
+        tracks, needs_encoding = tracker.update(face_locations, now)
+        to_encode = [i for i, need in enumerate(needs_encoding) if need]
+        face_encodings = [None] * len(face_locations)
+        if to_encode:
+            with stage_timer.measure("face_encode", camera):
+                encs = face_recognition.face_encodings(rgb_small_frame, [face_locations[i] for i in to_encode])
+            
+            # Match every encoded face in the frame against the gallery in one batched call.
+            # Tolerance adjusted for "Proper Detection" (0.55 is good, maybe 0.6 if user complains of misses)
+            with stage_timer.measure("match", camera):
+                face_matches = self.gallery.match(encs, tolerance=0.55)
+            for i, enc, (match_name, match_relation, _) in zip(to_encode, encs, face_matches):
+                face_encodings[i] = enc
+                if match_name is not None:
+                    tracker.set_identity(tracks[i], match_name, match_relation, now)
+                else:
+                    tracker.set_identity(tracks[i], "Unknown", "Stranger", now)
 
-        for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
+        for (top, right, bottom, left), face_encoding, track in zip(face_locations, face_encodings, tracks):
             top *= 2; right *= 2; bottom *= 2; left *= 2
 
-            # Tolerance adjusted for "Proper Detection" (0.55 is good, maybe 0.6 if user complains of misses)
-            matches = face_recognition.compare_faces(self.known_face_encodings, face_encoding, tolerance=0.55)
-            name = "Unknown"
-            relation = "Stranger"
-
-            face_distances = face_recognition.face_distance(self.known_face_encodings, face_encoding)
-            if len(face_distances) > 0:
-                best_match_index = np.argmin(face_distances)
-                if matches[best_match_index]:
-                    name = self.known_face_names[best_match_index]
-                    relation = self.known_face_relations[best_match_index]
+            name = track.name or "Unknown"
+            relation = track.relation or "Stranger"
             
-            # Auto Registration
-            if name == "Unknown":
+            # Auto Registration (only for a freshly encoded face)
+            if name == "Unknown" and face_encoding is not None:
                 try:
-                    new_name = f"Unknown {self.auto_id_counter}"
-                    self.auto_id_counter += 1
-                    relation = "Auto-Detected"
-                    
                     face_img_save = frame[max(0,top):min(h,bottom), max(0,left):min(w,right)].copy()
                     
                     if face_img_save.size > 0:
-                        filename = f"{new_name.replace(' ', '_')}.jpg"
-                        save_path = os.path.join(self.app_config['UPLOAD_FOLDER'], 'known', filename)
-                        os.makedirs(os.path.dirname(save_path), exist_ok=True)
-                        cv2.imwrite(save_path, face_img_save)
-                        
-                        self.persons.insert_one({
-                            "serial_no": 9000 + self.auto_id_counter,
-                            "name": new_name,
-                            "relation": relation,
-                            "phone": "N/A",
-                            "address": "Auto-Captured",
-                            "photo": f"known/{filename}",
-                            "created_at": datetime.now()
-                        })
-                        self.known_face_encodings.append(face_encoding)
-                        self.known_face_names.append(new_name)
-                        self.known_face_relations.append(relation)
-                        name = new_name
+                        with self.auto_reg_lock:
+                            new_name = f"Unknown {self.auto_id_counter}"
+                            filename = f"{new_name.replace(' ', '_')}.jpg"
+                            person = {
+                                "serial_no": 9000 + self.auto_id_counter + 1,
+                                "name": new_name,
+                                "relation": "Auto-Detected",
+                                "phone": "N/A",
+                                "address": "Auto-Captured",
+                                "photo": f"known/{filename}",
+                                "created_at": datetime.now()
+                            }
+                            # Queued (crop + row), never written here; if the writer is full the
+                            # face stays unknown and is registered on a later encode
+                            registered = self.person_writer.submit(person, face_img_save, os.path.join(self.known_dir, filename))
+                            if registered:
+                                self.auto_id_counter += 1
+                        if registered:
+                            relation = "Auto-Detected"
+                            self._change_gallery("add", face_encoding, new_name, relation)
+                            name = new_name
+                            tracker.set_identity(track, new_name, relation, now)
                 except Exception as e: print(f"Auto-reg error: {e}")
 
             # Triggers
             if "suspect" in relation.lower():
                  self.emergency.trigger_emergency("Known Suspect")
 
-            # Log
-            self.log_event(name, "Detected", relation, frame.copy())
+            # Log once per appearance (keyed by track while the face has no identity)
+            identity = name if name != "Unknown" else f"track-{track.id}"
+            if self.events.observe(camera, identity, "Detected", relation, now):
+                self.log_event(name, "Detected", relation, frame.copy(), camera=camera)
 
             # Add to overlays
             color = (0, 0, 255) if name.startswith("Unknown") else (0, 255, 0)
@@ -450,38 +558,42 @@ class CameraManager:
                 'coords': (left, top, right, bottom),
                 'color': color,
                 'label': f"{name} ({relation})",
-                'filled': True
+                'filled': True,
+                'track_id': track.id
             })
 
-        # --- YOLO OBJECT DETECTION ---
-        results = self.model(rgb_small_frame, verbose=False, iou=0.5, conf=0.4)
-        person_boxes = []
-
-        for r in results:
-            boxes = r.boxes
-            for box in boxes:
-                cls = int(box.cls[0])
-                if cls == 0: # Person
-                     x1, y1, x2, y2 = box.xyxy[0]
-                     x1, y1, x2, y2 = int(x1*2), int(y1*2), int(x2*2), int(y2*2) # Scale 2x (since 0.5x)
-                     person_boxes.append((x1, y1, x2, y2))
-                     continue
-
-                if cls in self.threat_classes:
-                    x1, y1, x2, y2 = box.xyxy[0]
-                    x1, y1, x2, y2 = int(x1*2), int(y1*2), int(x2*2), int(y2*2) # Scale 2x
-                    label = self.threat_classes[cls]
-                    
-                    self.emergency.trigger_emergency(f"Weapon ({label})")
-                    self.log_event("System", f"Weapon: {label}", "Suspect", frame.copy())
+        return overlays
 
-                    overlays.append({
-                        'type': 'box',
-                        'coords': (x1, y1, x2, y2),
-                        'color': (0, 0, 255),
-                        'label': f"THREAT: {label}", 
-                        'thick': 3
-                    })
+    def _detect_objects(self, frame, result, camera=None):
+        """Threat and fight detection from one frame's YOLO result"""
+        overlays = []
+        person_boxes = []
+        now = time.time()
+
+        for box in result.boxes:
+            cls = int(box.cls[0])
+            if cls == 0: # Person
+                 x1, y1, x2, y2 = box.xyxy[0]
+                 x1, y1, x2, y2 = int(x1*2), int(y1*2), int(x2*2), int(y2*2) # Scale 2x (since 0.5x)
+                 person_boxes.append((x1, y1, x2, y2))
+                 continue
+
+            if cls in self.threat_classes:
+                x1, y1, x2, y2 = box.xyxy[0]
+                x1, y1, x2, y2 = int(x1*2), int(y1*2), int(x2*2), int(y2*2) # Scale 2x
+                label = self.threat_classes[cls]
+                
+                self.emergency.trigger_emergency(f"Weapon ({label})")
+                if self.events.observe(camera, "System", f"Weapon: {label}", "Suspect", now):
+                    self.log_event("System", f"Weapon: {label}", "Suspect", frame.copy(), camera=camera)
+
+                overlays.append({
+                    'type': 'box',
+                    'coords': (x1, y1, x2, y2),
+                    'color': (0, 0, 255),
+                    'label': f"THREAT: {label}", 
+                    'thick': 3
+                })
 
         # --- FIGHT DETECTION ---
         if len(person_boxes) >= 2:
@@ -498,7 +610,8 @@ class CameraManager:
                      fx1 = min(box1[0], box2[0]); fy1 = min(box1[1], box2[1])
                      fx2 = max(box1[2], box2[2]); fy2 = max(box1[3], box2[3])
                      
-                     self.log_event("System", "Violence Detected", "Suspect", frame.copy())
+                     if self.events.observe(camera, "System", "Violence Detected", "Suspect", now):
+                         self.log_event("System", "Violence Detected", "Suspect", frame.copy(), camera=camera)
                      self.emergency.trigger_emergency("Violence / Fighting")
                      
                      overlays.append({
@@ -532,107 +645,98 @@ class CameraManager:
             except: pass
         return frame
 
-    def log_event(self, name, action, relation="Visitor", face_img=None):
-        """Adds an event to the history log and persists to MongoDB"""
-        
-        # Debounce (Memory check)
-        now = datetime.now()
-        if self.stats["history"]:
-            last = self.stats["history"][-1]
-            try:
-                last_time_str = last.get('time') 
-                if last_time_str:
-                    last_time = datetime.strptime(last_time_str, "%H:%M:%S")
-                    pass # logic is complicated to reconstruct from snippet, assuming standard compare
-                    # Reusing previous logic, but fixing datetime
-                    last_time = now.replace(hour=last_time.hour, minute=last_time.minute, second=last_time.second)
-                    seconds_diff = abs((now - last_time).total_seconds())
-                    if last['name'] == name and last['action'] == action and seconds_diff < 3: 
-                        return
-            except: pass
+    def _close_episodes(self, camera):
+        """Logs a "Left" event (with duration) for faces this camera has stopped seeing"""
+        for identity, action, relation, duration in self.events.expire(camera, time.time()):
+            if action != "Detected":
+                continue # Threat episodes just end; their appearance was already logged
+            name = "Unknown" if identity.startswith("track-") else identity
+            self.log_event(name, "Left", relation or "Visitor", duration=duration, camera=camera)
 
-        # Increment Stats
-        with self.stats_lock:
-            if name == "System": 
-                self.stats["suspects"] += 1
-            elif name == "Unknown":
-                self.stats["unknown"] += 1
-            else:
-                self.stats["known"] += 1
-
-        # Save Image
-        snap_rel_path = "default_avatar.png"
-        if face_img is not None:
-            clean_name = "".join([c for c in name if c.isalnum() or c in (' ', '-', '_')]).strip().replace(' ', '_')
-            ts = now.strftime("%Y%m%d_%H%M%S")
-            filename = f"{ts}_{clean_name}.jpg"
-            save_path = os.path.join(self.captures_dir, filename)
-            try:
-                cv2.imwrite(save_path, face_img)
+    def log_event(self, name, action, relation="Visitor", face_img=None, duration=None, camera=None):
+        """
+        Adds an event to the history log and queues it (with its snapshot) for MongoDB.
+        Detection goes through self.events, so this is called once per appearance/departure.
+        Never blocks on disk or DB: the LogWriter thread does the writes.
+        """
+        with stage_timer.measure("log_event", camera):
+            now = datetime.now()
+
+            # Snapshot path (the image itself is written by the LogWriter)
+            snap_rel_path = "default_avatar.png"
+            save_path = None
+            if face_img is not None and self.log_writer.snapshots_allowed():
+                clean_name = "".join([c for c in name if c.isalnum() or c in (' ', '-', '_')]).strip().replace(' ', '_')
+                ts = now.strftime("%Y%m%d_%H%M%S")
+                filename = f"{ts}_{clean_name}.jpg"
+                save_path = os.path.join(self.captures_dir, filename)
                 snap_rel_path = f"uploads/captures/{filename}"
-            except Exception as e:
-                print(f"Failed to save snap: {e}")
-
-        log_entry = {
-            "name": name,
-            "action": action,
-            "relation": relation,
-            "image": snap_rel_path,
-            "time": now.strftime("%H:%M:%S"),
-            "date": now.strftime("%Y-%m-%d"),
-            "timestamp": now
-        }
+
+            log_entry = {
+                "name": name,
+                "action": action,
+                "relation": relation,
+                "image": snap_rel_path,
+                "time": now.strftime("%H:%M:%S"),
+                "date": now.strftime("%Y-%m-%d"),
+                "timestamp": now,
+                "camera": None if camera is None else str(camera)
+            }
+            if duration is not None:
+                log_entry["duration"] = round(duration, 1)
         
-        # In-Memory
-        self.stats["history"].append(log_entry)
-        if len(self.stats["history"]) > 20: 
-            self.stats["history"].pop(0)
+            # In-Memory counters + history, pushed to connected dashboards
+            log, delta, counts = self.dashboard.record(log_entry)
+            self.hub.publish("detection", log)
+            if delta:
+                self.hub.publish("stats", {"counts": counts, "delta": delta})
 
-        # MongoDB
-        try:
-             self.db['suspect_logs'].insert_one(log_entry.copy())
-        except Exception as e:
-             print(f"DB Log Error: {e}")
+            # MongoDB (batched, in the background)
+            self.log_writer.submit(log_entry.copy(), face_img, save_path)
 
-    def get_stats(self):
+    def reconcile_stats(self):
+        """Reloads today's counts (from the rollups) and recent history from the event store"""
         try:
             today = datetime.now().strftime("%Y-%m-%d")
             
-            known_count = self.db['suspect_logs'].count_documents({
-                "date": today,
-                "name": {"$not": {"$regex": "^Unknown"}, "$ne": "System"}
-            })
-            
-            unknown_count = self.db['suspect_logs'].count_documents({
-                "date": today,
-                "name": {"$regex": "^Unknown"}
-            })
-            
-            suspect_count = self.db['suspect_logs'].count_documents({
-                "date": today,
-                "$or": [
-                    {"name": "System"},
-                    {"relation": {"$regex": "Suspect"}}
-                ]
-            })
-            
-            with self.stats_lock:
-                self.stats["known"] = known_count
-                self.stats["unknown"] = unknown_count
-                self.stats["suspects"] = suspect_count
-                
-                # Refresh history from DB to reflect deletions
-                recent_logs = list(self.db['suspect_logs'].find().sort("timestamp", -1).limit(20))
-                cleaned_history = []
-                for log in recent_logs:
-                    if '_id' in log: log['_id'] = str(log['_id'])
-                    if 'timestamp' in log and isinstance(log['timestamp'], datetime):
-                         log['timestamp'] = log['timestamp'].isoformat()
-                    cleaned_history.append(log)
-                self.stats["history"] = cleaned_history
-                
-            return self.stats
+            # Constant-time: today's rollup documents, not a scan of the logs
+            daily = self.event_store.daily_counts(today)
+            counts = {key: daily.get(key, 0) for key in ("known", "unknown", "suspects")}
+            recent_logs = self.event_store.recent(self.dashboard.history.maxlen)
+            if self.dashboard.reconcile(counts, recent_logs):
+                self.hub.publish("resync", {}) # History may have changed too; clients refetch
         except Exception as e:
-            print(f"Stats Error: {e}")
-            return self.stats
+            print(f"Stats Reconcile Error: {e}")
+
+    def request_stats_reconcile(self):
+        """Reconcile soon (e.g. after logs were deleted) instead of waiting for the next interval"""
+        self._reconcile_now.set()
+
+    def _reconcile_loop(self):
+        last_retention = 0
+        legacy_migrated = False
+        while True:
+            self._reconcile_now.wait(STATS_RECONCILE_INTERVAL)
+            self._reconcile_now.clear()
+            if not legacy_migrated:
+                # Once per start (retried until it succeeds): pre-partitioning rows get rollups and retention
+                try:
+                    if self.event_store.migrate_legacy():
+                        self._reconcile_now.set() # Counts changed
+                    legacy_migrated = True
+                except Exception as e:
+                    print(f"Event Migration Error: {e}")
+            self.reconcile_stats()
+            if time.time() - last_retention > 3600:
+                last_retention = time.time()
+                try:
+                    self.event_store.enforce_retention()
+                except Exception as e:
+                    print(f"Retention Error: {e}")
 
+    def get_stats_snapshot(self):
+        """Returns (etag, stats) from the cached counters; no DB work on the request path"""
+        return self.dashboard.snapshot()
+
+    def get_stats(self):
+        return self.get_stats_snapshot()[1]
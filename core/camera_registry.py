@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+from .frame_sources import open_source, source_kind
+
+# Configured (URL/file) sources get ids from here up, so they fit the int device_id routes
+CONFIGURED_ID_BASE = 100
+
+def parse_sources(spec):
+    """
+    "Gate=rtsp://host/stream, /videos/lobby.mp4, http://cam2:8080/video" ->
+    [("Gate", "rtsp://..."), ("lobby.mp4", "/videos/lobby.mp4"), ("cam2:8080", "http://...")]
+    Unlabelled synthetic[:WxH@FPS] sources are labelled with their spec.
+    """
+    sources = []
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        label, sep, src = item.partition("=")
+        if sep and "://" not in label and not os.path.exists(item):
+            sources.append((label.strip(), src.strip()))
+        elif item.startswith("synthetic"):
+            sources.append((item, item))
+        elif "://" in item:
+            sources.append((item.split("://", 1)[1].split("/")[0].rpartition("@")[2] or item, item)) # Host, without credentials
+        else:
+            sources.append((os.path.basename(item.rstrip("/")) or item, item))
+    return sources
+
+class CameraRegistry:
+    """
+    Known capture sources and whether they currently deliver frames.
+
+    Local device indexes and configured RTSP/HTTP/file/synthetic sources are probed in parallel
+    by a background scan, each probe in its own thread with a timeout, so one dead
+    stream or a hanging driver can't stall the rest. Results are kept in memory and
+    re-probed when older than `ttl` seconds; readers never wait for a scan. Devices
+    the app already has open are never probed (opening them again can fail or steal
+    them), they keep their last known result.
+    """
+    def __init__(self, device_count=5, sources=None, ttl=300.0, probe_timeout=3.0):
+        self.device_count = device_count
+        self.sources = sources or [] # [(label, src)]
+        self.ttl = ttl
+        self.probe_timeout = probe_timeout
+        self.lock = threading.Lock()
+        self.entries = {} # id -> {'id', 'label', 'kind', 'available', 'width', 'height', 'checked'}
+        self.last_scan = 0.0
+        self.scan_duration = 0.0
+        self._scan_done = threading.Event()
+        self._scanning = False
+        self._hung = set() # Ids whose previous probe never returned
+
+    def targets(self):
+        """[(id, label, src)] for every source the registry knows about."""
+        targets = [(i, f"Camera {i}", i) for i in range(self.device_count)]
+        for n, (label, src) in enumerate(self.sources):
+            targets.append((CONFIGURED_ID_BASE + n, label, src))
+        return targets
+
+    def source(self, device_id):
+        """Capture source (device index, URL or path) for a registry id, or None."""
+        for target_id, _, src in self.targets():
+            if target_id == device_id:
+                return src
+        return None
+
+    # --- Probing ---
+
+    def _probe(self, src, result):
+        source = open_source(src, timeout=self.probe_timeout)
+        try:
+            if source.open():
+                ret, frame = source.read()
+                if ret and frame is not None:
+                    result['available'] = True
+                    result['height'], result['width'] = frame.shape[:2]
+        except Exception as e:
+            print(f"Camera probe error ({src}): {e}")
+        finally:
+            source.release()
+
+    def scan(self, skip=()):
+        """Probes all sources in parallel (blocking, at most about `probe_timeout` s)."""
+        start = time.time()
+        probes = []
+        for target_id, label, src in self.targets():
+            if target_id in skip or target_id in self._hung:
+                continue
+            result = {'id': target_id, 'label': label, 'kind': source_kind(src), 'available': False, 'width': None, 'height': None}
+            thread = threading.Thread(target=self._probe, args=(src, result), name=f"camera-probe-{target_id}", daemon=True)
+            thread.start()
+            probes.append((thread, result))
+
+        deadline = start + self.probe_timeout
+        for thread, result in probes:
+            thread.join(max(0.0, deadline - time.time()))
+            if thread.is_alive():
+                # Leave it to finish on its own; don't probe that source again until it does
+                self._hung.add(result['id'])
+                threading.Thread(target=self._clear_hung, args=(thread, result['id']), daemon=True).start()
+            result['checked'] = time.time()
+
+        with self.lock:
+            for _, result in probes:
+                self.entries[result['id']] = result
+            self.last_scan = time.time()
+            self.scan_duration = self.last_scan - start
+        print(f"Camera scan: {sum(r['available'] for _, r in probes)}/{len(probes)} sources available ({self.scan_duration:.1f}s)")
+
+    def _clear_hung(self, thread, target_id):
+        thread.join()
+        self._hung.discard(target_id)
+
+    def rescan(self, skip=()):
+        """Starts a background scan unless one is already running. Returns immediately."""
+        with self.lock:
+            if self._scanning:
+                return False
+            self._scanning = True
+            self._scan_done.clear()
+        threading.Thread(target=self._scan_thread, args=(set(skip),), name="camera-scan", daemon=True).start()
+        return True
+
+    def _scan_thread(self, skip):
+        try:
+            self.scan(skip)
+        finally:
+            with self.lock:
+                self._scanning = False
+            self._scan_done.set()
+
+    def wait(self, timeout=None):
+        """Blocks until the running scan (if any) finishes."""
+        with self.lock:
+            if not self._scanning:
+                return True
+        return self._scan_done.wait(timeout)
+
+    # --- Reads ---
+
+    def available(self, exclude=()):
+        """Sources that delivered a frame at the last scan, minus `exclude`. Refreshes in the background when stale."""
+        if time.time() - self.last_scan > self.ttl:
+            self.rescan(skip=exclude)
+        with self.lock:
+            entries = [dict(e) for e in self.entries.values() if e['available'] and e['id'] not in exclude]
+        return sorted(entries, key=lambda e: e['id'])
+
+    def stats(self):
+        with self.lock:
+            return {
+                "sources": len(self.targets()),
+                "available": sum(1 for e in self.entries.values() if e['available']),
+                "last_scan": self.last_scan,
+                "scan_duration": round(self.scan_duration, 2),
+                "scanning": self._scanning,
+                "hung": sorted(self._hung),
+            }
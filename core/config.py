@@ -13,3 +13,89 @@ MONGODB_URI = os.getenv(
 
 DATABASE_NAME = os.getenv("DATABASE_NAME", "autosecure_db")
 COLLECTION_NAME = os.getenv("COLLECTION_NAME", "known_persons")
+
+# Face gallery search: "exact" (brute force) or "ivf" (approximate, for large galleries)
+GALLERY_SEARCH = os.getenv("GALLERY_SEARCH", "exact")
+GALLERY_IVF_NLIST = int(os.getenv("GALLERY_IVF_NLIST", "64"))
+GALLERY_IVF_NPROBE = int(os.getenv("GALLERY_IVF_NPROBE", "8"))
+# Max encodings kept per person (centroid + k-medoids); 0 keeps every sample
+GALLERY_PROTOTYPES = int(os.getenv("GALLERY_PROTOTYPES", "0"))
+
+# Persistent encodings cache (content hash + model version keyed, memory-mapped)
+ENCODINGS_CACHE_DIR = os.getenv("ENCODINGS_CACHE_DIR", "encodings_cache")
+ENCODING_MODEL_VERSION = os.getenv("ENCODING_MODEL_VERSION", "dlib-resnet-v1")
+# Parallel face encoding (0 = one worker per CPU core / 4 jobs in flight per worker)
+ENCODING_WORKERS = int(os.getenv("ENCODING_WORKERS", "0"))
+ENCODING_MAX_PENDING = int(os.getenv("ENCODING_MAX_PENDING", "0"))
+
+# Background enrolment workers (1 keeps jobs for the same name in order; serial_no comes from an atomic counter)
+ENROLMENT_WORKERS = int(os.getenv("ENROLMENT_WORKERS", "1"))
+
+# Motion gating of detection: skip YOLO/face detection on static scenes
+MOTION_GATE_ENABLED = os.getenv("MOTION_GATE_ENABLED", "1") == "1"
+MOTION_THRESHOLD = float(os.getenv("MOTION_THRESHOLD", "0.01")) # Fraction of ROI pixels changed
+MOTION_HOLD = float(os.getenv("MOTION_HOLD", "2.0")) # Keep detecting this long after motion (s)
+MOTION_IDLE_INTERVAL = float(os.getenv("MOTION_IDLE_INTERVAL", "5.0")) # Heartbeat detection on idle scenes (s)
+
+# Central inference scheduler: one batched YOLO call per tick for all cameras
+INFERENCE_SCHEDULER = os.getenv("INFERENCE_SCHEDULER", "1") == "1"
+INFERENCE_INTERVAL = float(os.getenv("INFERENCE_INTERVAL", "0.08")) # Per-camera detection interval (s) at priority 1
+INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "8"))
+INFERENCE_MAIN_PRIORITY = float(os.getenv("INFERENCE_MAIN_PRIORITY", "2.0")) # Main camera detection rate multiplier
+INFERENCE_TORCH_THREADS = int(os.getenv("INFERENCE_TORCH_THREADS", "0")) # 0 = torch default
+INFERENCE_FACE_WORKERS = int(os.getenv("INFERENCE_FACE_WORKERS", str(min(4, os.cpu_count() or 1)))) # Threads for the per-frame face stage of a batch
+
+# Face tracking between detections: recognised faces are re-encoded only this often (s)
+FACE_TRACK_REVERIFY = float(os.getenv("FACE_TRACK_REVERIFY", "2.0"))
+FACE_TRACK_IOU = float(os.getenv("FACE_TRACK_IOU", "0.3"))
+FACE_TRACK_MAX_MISSES = int(os.getenv("FACE_TRACK_MAX_MISSES", "5")) # Detection cycles before a track is dropped
+
+# Event aggregation: an episode ends after EVENT_LEAVE_AFTER s unseen; the same
+# (camera, identity, action) is not logged again within EVENT_COOLDOWN s
+EVENT_LEAVE_AFTER = float(os.getenv("EVENT_LEAVE_AFTER", "5.0"))
+EVENT_COOLDOWN = float(os.getenv("EVENT_COOLDOWN", "30.0"))
+
+# Background event writer: bounded queue (events beyond it are dropped), insert_many batch size
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "1000"))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "50"))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "0.5"))
+
+# Dashboard counters are kept in memory and recounted from the DB this often (s)
+STATS_RECONCILE_INTERVAL = float(os.getenv("STATS_RECONCILE_INTERVAL", "60"))
+
+# Event store: days of day-partitioned event history to keep (0 = keep everything)
+EVENT_RETENTION_DAYS = int(os.getenv("EVENT_RETENTION_DAYS", "0"))
+
+# Database connection (chosen lazily on first use; see db_provider)
+DB_MAX_POOL_SIZE = int(os.getenv("DB_MAX_POOL_SIZE", "50"))
+DB_MIN_POOL_SIZE = int(os.getenv("DB_MIN_POOL_SIZE", "0"))
+DB_CONNECT_TIMEOUT_MS = int(os.getenv("DB_CONNECT_TIMEOUT_MS", "5000"))
+DB_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("DB_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+DB_SOCKET_TIMEOUT_MS = int(os.getenv("DB_SOCKET_TIMEOUT_MS", "0")) # 0 = no timeout
+DB_RETRY_INTERVAL = float(os.getenv("DB_RETRY_INTERVAL", "30")) # Seconds between MongoDB recovery probes
+DB_TRANSIENT_RETRIES = int(os.getenv("DB_TRANSIENT_RETRIES", "2")) # Retries of a read after AutoReconnect/NetworkTimeout
+
+# Camera discovery: local device indexes to probe, extra sources ("Label=rtsp://...,/path/video.mp4"),
+# how long scan results are trusted (s) and the per-probe timeout (s)
+CAMERA_SCAN_DEVICES = int(os.getenv("CAMERA_SCAN_DEVICES", "5"))
+CAMERA_SOURCES = os.getenv("CAMERA_SOURCES", "")
+CAMERA_SCAN_TTL = float(os.getenv("CAMERA_SCAN_TTL", "300"))
+CAMERA_PROBE_TIMEOUT = float(os.getenv("CAMERA_PROBE_TIMEOUT", "3.0"))
+
+# Capture: delivered FPS and frame size for every camera source (0 = the source's own),
+# and the exponential reconnect backoff range (s) for lost sources
+CAMERA_FPS = float(os.getenv("CAMERA_FPS", "0"))
+CAMERA_WIDTH = int(os.getenv("CAMERA_WIDTH", "0"))
+CAMERA_HEIGHT = int(os.getenv("CAMERA_HEIGHT", "0"))
+CAMERA_RECONNECT_MIN = float(os.getenv("CAMERA_RECONNECT_MIN", "0.5"))
+CAMERA_RECONNECT_MAX = float(os.getenv("CAMERA_RECONNECT_MAX", "10"))
+
+# Prometheus /metrics endpoint and per-stage timing; set METRICS_TOKEN to require "Authorization: Bearer <token>"
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Admin-only tools (sampling profiler): admins are the logged-in users listed in ADMIN_EMAILS,
+# or requests with "Authorization: Bearer <ADMIN_TOKEN>". Both empty = disabled.
+ADMIN_EMAILS = [e.strip().lower() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()]
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "30"))
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import threading
+from collections import deque
+from datetime import datetime
+
+def _serializable(entry):
+    log = dict(entry)
+    if '_id' in log: log['_id'] = str(log['_id'])
+    if isinstance(log.get('timestamp'), datetime):
+        log['timestamp'] = log['timestamp'].isoformat()
+    return log
+
+class DashboardStats:
+    """
+    Today's known/unknown/suspect counters and the recent-history ring, kept up to date as
+    events are logged instead of being recounted from the DB on every /api/stats/ poll.
+    `snapshot()` returns a cached JSON-ready dict plus an ETag that only changes when the
+    numbers do. Counters roll over at midnight; `reconcile()` overwrites them with DB counts
+    (run periodically, and after deletions) so they cannot drift for long.
+    """
+    def __init__(self, history_size=20):
+        self.lock = threading.Lock()
+        self.date = datetime.now().strftime("%Y-%m-%d")
+        self.counts = {"known": 0, "unknown": 0, "suspects": 0}
+        self.traffic = 0
+        self.history = deque(maxlen=history_size) # Oldest first
+        self.version = 0
+        self._snapshot = None
+
+    @staticmethod
+    def classify(entry):
+        """Counter keys an event contributes to (same rules as the DB reconciliation queries)."""
+        if entry.get("action") == "Left":
+            return []
+        name = entry.get("name", "")
+        keys = []
+        if name.startswith("Unknown"):
+            keys.append("unknown")
+        elif name != "System":
+            keys.append("known")
+        if name == "System" or "Suspect" in (entry.get("relation") or ""):
+            keys.append("suspects")
+        return keys
+
+    def _roll_over(self, today):
+        if today != self.date:
+            self.date = today
+            self.counts = dict.fromkeys(self.counts, 0)
+            self._changed()
+
+    def record(self, entry):
+        """Counts one logged event. Returns (JSON-ready entry, counter keys bumped, counts)."""
+        with self.lock:
+            self._roll_over(entry.get("date") or datetime.now().strftime("%Y-%m-%d"))
+            keys = self.classify(entry)
+            for key in keys:
+                self.counts[key] += 1
+            log = _serializable(entry)
+            self.history.append(log)
+            self._changed()
+            return log, keys, dict(self.counts)
+
+    def reconcile(self, counts, recent_logs):
+        """
+        Replaces the counters and history with what the DB says (recent_logs newest first).
+        Returns True if anything changed.
+        """
+        with self.lock:
+            self._roll_over(datetime.now().strftime("%Y-%m-%d"))
+            history = [_serializable(log) for log in reversed(recent_logs)][-self.history.maxlen:]
+            if counts == self.counts and history == list(self.history):
+                return False
+            self.counts = dict(counts)
+            self.history = deque(history, maxlen=self.history.maxlen)
+            self._changed()
+            return True
+
+    def _changed(self):
+        self.version += 1
+        self._snapshot = None
+
+    def snapshot(self):
+        """Returns (etag, stats dict). The dict is shared between callers; do not mutate it."""
+        with self.lock:
+            self._roll_over(datetime.now().strftime("%Y-%m-%d"))
+            if self._snapshot is None:
+                history = list(self.history)
+                stats = dict(self.counts, traffic=self.traffic, history=history, suspect_logs=history)
+                body = json.dumps(stats, default=str, sort_keys=True)
+                etag = '"%s"' % hashlib.sha1(body.encode()).hexdigest()[:16]
+                self._snapshot = (etag, stats)
+            return self._snapshot
@@ -0,0 +1,270 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import certifi
+from pymongo import MongoClient
+from pymongo.errors import AutoReconnect, ConnectionFailure, NetworkTimeout, ServerSelectionTimeoutError
+from .json_db import JsonDB
+
+# Errors that mean "the server is gone", as opposed to a bad query or a bad config
+CONNECTION_ERRORS = (ConnectionFailure, ServerSelectionTimeoutError)
+# Blips worth retrying before declaring an outage (ServerSelectionTimeoutError already waited its timeout)
+TRANSIENT_ERRORS = (AutoReconnect, NetworkTimeout)
+
+# Methods that change data (never retried here; counted while JsonDB is the primary store)
+WRITE_METHODS = {
+    'insert_one', 'insert_many', 'update_one', 'update_many', 'replace_one', 'delete_one', 'delete_many',
+    'find_one_and_update', 'find_one_and_replace', 'find_one_and_delete', 'bulk_write', 'drop',
+    'drop_collection', 'create_collection',
+}
+
+class DatabaseUnavailable(ConnectionFailure):
+    """MongoDB is down: the call was refused without touching any store."""
+
+class DatabaseProvider:
+    """
+    Chooses the database backend lazily, on first use, instead of at import time.
+
+    All MongoDB candidates (Atlas with certifi, Atlas with unverified TLS, localhost) are
+    pinged in parallel, so startup costs the slowest timeout rather than the sum. The most
+    preferred candidate that answers wins; if none does, JsonDB is used. The choice is
+    cached.
+
+    At runtime, transient MongoDB errors (AutoReconnect, NetworkTimeout) on reads are
+    retried `transient_retries` times with a short backoff (writes rely on the driver's
+    retryWrites, so an $inc is never applied twice). If the connection is still gone, the
+    provider marks MongoDB unavailable: every call then raises DatabaseUnavailable at once,
+    rather than waiting out timeouts or answering from JsonDB (which is not a replica and
+    would return wrong data). A background thread probes MongoDB, backing off from 1 s to
+    `retry_interval`, and clears the outage when it answers. When JsonDB was chosen at
+    startup it is the primary store; the provider only moves to MongoDB later if nothing
+    was written to JsonDB in the meantime.
+    """
+    def __init__(self, uri, db_name, max_pool_size=50, min_pool_size=0, connect_timeout_ms=5000,
+                 server_selection_timeout_ms=5000, socket_timeout_ms=0, retry_interval=30.0, transient_retries=2, json_db_name="smart_vision"):
+        self.uri = uri
+        self.db_name = db_name
+        self.client_options = {
+            "maxPoolSize": max_pool_size,
+            "minPoolSize": min_pool_size,
+            "connectTimeoutMS": connect_timeout_ms,
+            "serverSelectionTimeoutMS": server_selection_timeout_ms,
+            "socketTimeoutMS": socket_timeout_ms or None,
+        }
+        self.retry_interval = retry_interval
+        self.transient_retries = transient_retries
+        self.json_db_name = json_db_name
+        self.lock = threading.Lock()
+        self._db = None
+        self._json_db = None
+        self._client = None
+        self.backend = None # "mongodb (<label>)" or "json_db"
+        self.failovers = 0
+        self.unavailable = False # MongoDB outage: calls fail fast until recovery
+        self.json_writes = 0 # Writes to JsonDB as the primary store (they pin it)
+        self._recovering = False
+
+    def _candidates(self):
+        return [
+            ("Atlas - Certifi", lambda: MongoClient(self.uri, tlsCAFile=certifi.where(), **self.client_options)),
+            ("Atlas - Unverified SSL", lambda: MongoClient(self.uri, tls=True, tlsAllowInvalidCertificates=True, **self.client_options)),
+            ("Localhost", lambda: MongoClient("mongodb://localhost:27017/", **self.client_options)),
+        ]
+
+    @staticmethod
+    def _try(factory):
+        client = factory()
+        try:
+            client.admin.command('ping')
+            return client
+        except Exception:
+            client.close()
+            raise
+
+    def _connect_mongo(self):
+        """Pings every candidate at once. Returns (label, client) for the best one, or (None, None)."""
+        candidates = self._candidates()
+        pool = ThreadPoolExecutor(max_workers=len(candidates), thread_name_prefix="db-connect")
+        futures = [pool.submit(self._try, factory) for _, factory in candidates]
+        pool.shutdown(wait=False)
+
+        chosen = (None, None)
+        for (label, _), future in zip(candidates, futures):
+            if chosen[1] is not None:
+                # Less preferred: don't wait for it, just close it if it connects
+                future.add_done_callback(lambda f: f.exception() is None and f.result().close())
+                continue
+            try:
+                chosen = (label, future.result())
+            except Exception as e:
+                print(f"Info: MongoDB ({label}) not available: {e.__class__.__name__}")
+        return chosen
+
+    def _json(self):
+        if self._json_db is None:
+            self._json_db = JsonDB(self.json_db_name)
+        return self._json_db
+
+    def get(self):
+        """The active database (connects on first call)."""
+        db = self._db
+        if db is not None:
+            return db
+        with self.lock:
+            if self._db is None:
+                start = time.time()
+                label, client = self._connect_mongo()
+                if client is not None:
+                    self._use_mongo(label, client)
+                else:
+                    print("Info: MongoDB not available. Using Built-in Local Storage (json_db).")
+                    self._db = self._json()
+                    self.backend = "json_db"
+                    self._start_recovery()
+                print(f"Database ready: {self.backend} ({time.time() - start:.1f}s)")
+            return self._db
+
+    def _use_mongo(self, label, client):
+        if self._client is not None and self._client is not client:
+            self._client.close()
+        self._client = client
+        self._db = client[self.db_name]
+        self.backend = f"mongodb ({label})"
+        print(f"Connected to MongoDB ({label})")
+
+    def failover(self, error):
+        """Called when a MongoDB operation hit a connection error: fail calls fast and keep probing."""
+        with self.lock:
+            if self.unavailable or getattr(self._db, 'is_json_db', False):
+                return
+            print(f"Warning: MongoDB connection lost ({error}). Database calls fail until it recovers.")
+            self.unavailable = True
+            self.backend = "unavailable"
+            self.failovers += 1
+            self._start_recovery()
+
+    def _start_recovery(self):
+        if self._recovering: return
+        self._recovering = True
+        threading.Thread(target=self._recover_loop, name="db-recovery", daemon=True).start()
+
+    def _recover_loop(self):
+        attempt = 0
+        while True:
+            time.sleep(min(self.retry_interval, 2 ** attempt))
+            attempt += 1
+            if self._pinned_to_json():
+                return
+            label, client = self._connect_mongo()
+            if client is not None:
+                with self.lock:
+                    if self._pinned_to_json():
+                        client.close()
+                        return
+                    self._use_mongo(label, client)
+                    self.unavailable = False
+                    self._recovering = False
+                return
+
+    def _pinned_to_json(self):
+        """True (and stops the probing) once JsonDB, as the primary store, holds writes MongoDB lacks."""
+        if not getattr(self._db, 'is_json_db', False) or not self.json_writes:
+            return False
+        print("Warning: json_db has local writes; staying on it (restart to use MongoDB).")
+        self._recovering = False
+        return True
+
+    @property
+    def is_json_db(self):
+        return getattr(self.get(), 'is_json_db', False)
+
+    def call(self, func, write=False):
+        """Runs func(db) under the retry/outage policy (see the class docstring)."""
+        for attempt in range(self.transient_retries + 1):
+            db = self.get()
+            if self.unavailable:
+                raise DatabaseUnavailable("MongoDB is unavailable (reconnecting)")
+            if getattr(db, 'is_json_db', False):
+                if write:
+                    self.json_writes += 1
+                return func(db)
+            try:
+                return func(db)
+            except ServerSelectionTimeoutError as e:
+                error = e
+            except TRANSIENT_ERRORS as e:
+                error = e
+                if not write and attempt < self.transient_retries:
+                    time.sleep(0.1 * 2 ** attempt)
+                    continue
+            except CONNECTION_ERRORS as e:
+                error = e
+            break
+        self.failover(error)
+        raise DatabaseUnavailable(f"MongoDB is unavailable: {error}") from error
+
+class LazyDatabase:
+    """Database-shaped handle (db["collection"], db.list_collection_names(), ...) over a provider."""
+    def __init__(self, provider):
+        self._provider = provider
+
+    def __getitem__(self, name):
+        return LazyCollection(self._provider, name)
+
+    @property
+    def is_json_db(self):
+        return self._provider.is_json_db
+
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        return lambda *args, **kwargs: self._provider.call(lambda db: getattr(db, attr)(*args, **kwargs), write=attr in WRITE_METHODS)
+
+class LazyCollection:
+    """Collection handle that resolves the active backend on every call."""
+    def __init__(self, provider, name):
+        self._provider = provider
+        self._name = name
+
+    def find(self, *args, **kwargs):
+        return LazyCursor(self, args, kwargs)
+
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        return lambda *args, **kwargs: self._provider.call(
+            lambda db: getattr(db[self._name], attr)(*args, **kwargs), write=attr in WRITE_METHODS
+        )
+
+class LazyCursor:
+    """Records sort/skip/limit and runs the query (with failover) when iterated."""
+    def __init__(self, collection, args, kwargs):
+        self._collection = collection
+        self._args = args
+        self._kwargs = kwargs
+        self._ops = []
+        self._results = None
+
+    def _chain(self, op, *args):
+        self._ops.append((op, args))
+        return self
+
+    def sort(self, *args):
+        return self._chain('sort', *args)
+
+    def skip(self, n):
+        return self._chain('skip', n)
+
+    def limit(self, n):
+        return self._chain('limit', n)
+
+    def _run(self, db):
+        cursor = db[self._collection._name].find(*self._args, **self._kwargs)
+        for op, args in self._ops:
+            cursor = getattr(cursor, op)(*args)
+        return list(cursor)
+
+    def __iter__(self):
+        if self._results is None:
+            self._results = self._collection._provider.call(self._run)
+        return iter(self._results)
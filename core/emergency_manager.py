@@ -1,17 +1,38 @@
 from datetime import datetime
+import threading
 import time
 from bson.objectid import ObjectId
 
 class EmergencyManager:
-    def __init__(self, db):
+    ALERT_TTL = 2 # Seconds an alert stays active
+    
+    def __init__(self, db, hub=None):
         self.db = db
+        self.hub = hub # EventHub: alert changes are pushed to dashboards
         # If 'emergency_contacts' collection doesn't exist, it will be created on insert
         self.contacts = db['emergency_contacts']
         self.active_alert = None
+        self.cached_contacts = None # What trigger_emergency dials from; refreshed on every read/change
+        self._refreshing = False
+        self._refresh_in_background() # Warm the cache before the first alert
         
     def get_contacts(self):
-        """Returns list of all emergency contacts"""
-        return list(self.contacts.find())
+        """Returns list of all emergency contacts (from the DB; refreshes the cache)"""
+        contacts = list(self.contacts.find())
+        self.cached_contacts = contacts
+        return contacts
+
+    def _refresh_in_background(self):
+        if self._refreshing: return
+        self._refreshing = True
+        def refresh():
+            try:
+                self.get_contacts()
+            except Exception as e:
+                print(f"Emergency Contacts Error: {e}")
+            finally:
+                self._refreshing = False
+        threading.Thread(target=refresh, name="emergency-contacts", daemon=True).start()
 
     def add_contact(self, name, phone, relation):
         """Adds a new contact"""
@@ -22,6 +43,7 @@ class EmergencyManager:
             "created_at": datetime.now()
         }
         self.contacts.insert_one(contact)
+        self._refresh_in_background()
         return True
 
     def delete_contact(self, contact_id):
@@ -29,7 +51,9 @@ class EmergencyManager:
         try:
             # 1. Try as ObjectId (MongoDB)
             res = self.contacts.delete_one({"_id": ObjectId(contact_id)})
-            if res.deleted_count > 0: return True
+            if res.deleted_count > 0:
+                self._refresh_in_background()
+                return True
         except:
              pass
         
@@ -44,6 +68,7 @@ class EmergencyManager:
              # target = self.find_one(filter_dict); if target: self.data.remove(target)...
              
              # If using real MongoDB with string ID, delete_one returns a result.
+             self._refresh_in_background()
              if res and hasattr(res, 'deleted_count'):
                   return res.deleted_count > 0
              return True # For JsonDB mock
@@ -62,7 +87,11 @@ class EmergencyManager:
 
         # Find who to call
         # Logic: Call "Security" first, then "Boss"
-        contact_list = self.get_contacts()
+        # Runs on the detection path, so it reads the cache, never the DB
+        contact_list = self.cached_contacts
+        if contact_list is None:
+            self._refresh_in_background()
+            contact_list = []
         target = contact_list[0] if contact_list else {"name": "Emergency Services", "phone": "911"}
 
         self.active_alert = {
@@ -74,8 +103,24 @@ class EmergencyManager:
             "message": f"DIALING {target['name']} ({target['phone']})..."
         }
         print(f"!!! EMERGENCY: {threat_type} DETECTED. DIALING {target['name']} !!!")
+        self._publish(self.active_alert)
         return self.active_alert
 
+    def _publish(self, status):
+        if self.hub is None: return
+        self.hub.publish("emergency", status)
+        if status.get("active"):
+            # get_status() auto-clears the alert; push that too instead of waiting for a poll
+            timer = threading.Timer(self.ALERT_TTL + 0.1, self._publish_if_cleared, args=(status["timestamp"],))
+            timer.daemon = True
+            timer.start()
+
+    def _publish_if_cleared(self, alert_timestamp):
+        if self.active_alert and self.active_alert['timestamp'] != alert_timestamp:
+            return # A newer alert replaced it and has its own timer
+        if not self.get_status().get("active"):
+            self.hub.publish("emergency", {"active": False})
+
     def get_status(self):
         """Returns current alert status. Auto-clears after 15 seconds."""
         if self.active_alert:
@@ -83,7 +128,7 @@ class EmergencyManager:
                 # Still active but maybe change message to "Connected"
                 self.active_alert['message'] = "CALL CONNECTED - ALERTING SUSPECT DETECTED"
             
-            if (time.time() - self.active_alert['timestamp']) > 2:
+            if (time.time() - self.active_alert['timestamp']) > self.ALERT_TTL:
                  self.active_alert = None # Reset
                  return {"active": False}
                  
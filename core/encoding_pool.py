@@ -0,0 +1,111 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+def _pool_context():
+    """
+    Workers are started with forkserver (spawn where it doesn't exist), never plain fork:
+    the Django process already runs camera/scheduler threads and holds torch state, and
+    forking a multithreaded process can deadlock the child on a lock copied mid-use.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def encode_image_file(path):
+    """
+    Decodes an image, finds faces and returns (path, first_encoding_or_None, error).
+    Module-level so it can run in a worker process.
+    """
+    import face_recognition
+    try:
+        image = face_recognition.load_image_file(path)
+        encs = face_recognition.face_encodings(image)
+        return path, (encs[0] if len(encs) > 0 else None), None
+    except Exception as e:
+        return path, None, str(e)
+
+class EncodingPool:
+    """
+    Encodes face images across CPU cores for bulk enrolment and cold cache rebuilds.
+    Cached images are served from the EncodingStore; misses are fanned out to a process
+    pool with at most `max_pending` jobs in flight, and every result is written to the
+    store as soon as it completes. Small batches are encoded in-process to skip pool startup.
+    """
+    def __init__(self, store, workers=0, max_pending=0, inline_below=8):
+        self.store = store
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 4
+        self.inline_below = inline_below
+        self.errors = 0 # Images that exist but could not be read or encoded (running total)
+
+    def _report(self, done, total, started, label):
+        if done == total or done % max(1, total // 10) == 0:
+            rate = done / max(time.time() - started, 1e-6)
+            print(f"{label}: {done}/{total} images ({rate:.1f}/s)")
+
+    def encode_files(self, paths, label="Encoding faces", progress=None):
+        """
+        Returns {path: encoding or None} for every path.
+        `progress(done, total)` is called as uncached images finish (default prints).
+        """
+        results = {}
+        todo = []
+        for path in paths:
+            key = self.store.key_for_file(path)
+            if key is None:
+                if os.path.exists(path):
+                    self.errors += 1 # Unreadable now, not gone: its cache row is still live
+                results[path] = None
+                continue
+            hit, enc = self.store.lookup(key)
+            if hit:
+                results[path] = enc
+            else:
+                todo.append((path, key))
+
+        if not todo:
+            return results
+
+        total = len(todo)
+        started = time.time()
+        report = progress or (lambda done, n: self._report(done, n, started, label))
+
+        def collect(path, key, enc, err, done):
+            if err:
+                print(f"Error processing {path}: {err}")
+                self.errors += 1
+                results[path] = None
+            else:
+                self.store.put(key, enc)
+                results[path] = enc
+            report(done, total)
+
+        if total < self.inline_below or self.workers <= 1:
+            for done, (path, key) in enumerate(todo, 1):
+                _, enc, err = encode_image_file(path)
+                collect(path, key, enc, err, done)
+            return results
+
+        done = 0
+        queue = iter(todo)
+        pending = {}
+        with ProcessPoolExecutor(max_workers=min(self.workers, total), mp_context=_pool_context()) as executor:
+            while True:
+                # Keep the pool fed without queueing every path up front
+                for path, key in queue:
+                    pending[executor.submit(encode_image_file, path)] = (path, key)
+                    if len(pending) >= self.max_pending:
+                        break
+                if not pending:
+                    break
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    path, key = pending.pop(fut)
+                    try:
+                        _, enc, err = fut.result()
+                    except Exception as e:
+                        enc, err = None, str(e)
+                    done += 1
+                    collect(path, key, enc, err, done)
+        return results
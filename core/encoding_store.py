@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import threading
+import numpy as np
+
+class EncodingStore:
+    """
+    Persistent face-encoding cache keyed by image content hash + model version.
+
+    Layout (inside `path`):
+      index.jsonl      - header line {"vectors": <file>}, then one {"key": ..., "row": n}
+                         line per entry, appended
+      vectors-<n>.f32  - raw float32 rows, appended; opened with np.memmap on startup
+    A row of -1 records "no face found" so undetectable images are not re-decoded.
+    Writes are append-only; `compact()` writes a new generation of both files and
+    commits it with one atomic rename of the index.
+    """
+    NO_FACE = -1
+
+    def __init__(self, path="encodings_cache", model_version="dlib-resnet-v1", dim=128):
+        self.path = path
+        self.model_version = model_version
+        self.dim = dim
+        self.index_path = os.path.join(path, "index.jsonl")
+        self.vectors_path = None
+        self.lock = threading.Lock()
+        self.index = {} # key -> row
+        self.touched = set() # keys looked up or written since the last compaction
+        self._vectors = None
+        self._rows_on_disk = 0
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        self.index = {}
+        entries = []
+        vectors_name = None
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r') as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue # Torn last line after a crash
+                        if 'vectors' in entry:
+                            vectors_name = entry['vectors']
+                        else:
+                            entries.append(entry)
+            except Exception as e:
+                print(f"Warning: Encoding index unreadable ({e}). Starting empty.")
+                vectors_name, entries = None, []
+
+        if vectors_name is None:
+            vectors_name = "vectors-0.f32"
+            entries = []
+            self._write_header(self.index_path, vectors_name)
+        self.vectors_path = os.path.join(self.path, vectors_name)
+
+        self._rows_on_disk = 0
+        if os.path.exists(self.vectors_path):
+            size = os.path.getsize(self.vectors_path)
+            self._rows_on_disk = size // (4 * self.dim)
+            if size % (4 * self.dim):
+                # Drop a torn trailing row so later appends stay aligned
+                with open(self.vectors_path, 'r+b') as f:
+                    f.truncate(self._rows_on_disk * 4 * self.dim)
+        for entry in entries:
+            if entry['row'] < self._rows_on_disk:
+                self.index[entry['key']] = entry['row']
+        self._map()
+
+    def _write_header(self, index_path, vectors_name):
+        with open(index_path, 'w') as f:
+            f.write(json.dumps({"vectors": vectors_name}) + "\n")
+
+    def _map(self):
+        if self._rows_on_disk > 0:
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(self._rows_on_disk, self.dim))
+        else:
+            self._vectors = None
+
+    def __len__(self):
+        return len(self.index)
+
+    def key_for_file(self, file_path):
+        """Content key for an image file, or None if it cannot be read."""
+        h = hashlib.sha1()
+        try:
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    h.update(chunk)
+        except OSError:
+            return None
+        return f"{self.model_version}:{h.hexdigest()}"
+
+    def lookup(self, key):
+        """Returns (hit, encoding). `encoding` is None on a miss or for a cached no-face image."""
+        with self.lock:
+            row = self.index.get(key)
+            if row is None:
+                return False, None
+            self.touched.add(key)
+            if row == self.NO_FACE:
+                return True, None
+            if self._vectors is None or row >= len(self._vectors):
+                self._map()
+            return True, np.array(self._vectors[row])
+
+    def put(self, key, encoding):
+        """Appends one entry; `encoding` None records that the image has no face."""
+        with self.lock:
+            if key in self.index:
+                self.touched.add(key)
+                return
+            row = self.NO_FACE
+            try:
+                if encoding is not None:
+                    vec = np.asarray(encoding, dtype=np.float32).reshape(self.dim)
+                    with open(self.vectors_path, 'ab') as f:
+                        f.write(vec.tobytes())
+                    row = self._rows_on_disk
+                    self._rows_on_disk += 1
+                with open(self.index_path, 'a') as f:
+                    f.write(json.dumps({"key": key, "row": row}) + "\n")
+                self.index[key] = row
+                self.touched.add(key)
+            except Exception as e:
+                print(f"Warning: Could not write encoding cache: {e}")
+
+    def dead_rows(self):
+        """Rows on disk not referenced by a key touched since the last compaction."""
+        live = sum(1 for k in self.touched if self.index.get(k, self.NO_FACE) != self.NO_FACE)
+        return self._rows_on_disk - live
+
+    def compact(self, keep_keys=None):
+        """Rewrites the store keeping only `keep_keys` (default: keys touched this session)."""
+        with self.lock:
+            keep = self.touched if keep_keys is None else set(keep_keys)
+            generation = int(os.path.basename(self.vectors_path).split('-')[1].split('.')[0]) + 1
+            new_vectors_name = f"vectors-{generation}.f32"
+            new_vectors = os.path.join(self.path, new_vectors_name)
+            tmp_index = self.index_path + ".tmp"
+            new_index = {}
+            try:
+                self._map()
+                self._write_header(tmp_index, new_vectors_name)
+                with open(new_vectors, 'wb') as vf, open(tmp_index, 'a') as jf:
+                    rows = 0
+                    for key, row in self.index.items():
+                        if key not in keep:
+                            continue
+                        if row != self.NO_FACE:
+                            vf.write(np.asarray(self._vectors[row], dtype=np.float32).tobytes())
+                            row = rows
+                            rows += 1
+                        new_index[key] = row
+                        jf.write(json.dumps({"key": key, "row": row}) + "\n")
+                    vf.flush(); os.fsync(vf.fileno())
+                    jf.flush(); os.fsync(jf.fileno())
+
+                # Commit point: the index now names the new vectors file
+                os.replace(tmp_index, self.index_path)
+                old_vectors = self.vectors_path
+                self._vectors = None # Release the mapping before deleting the old file
+                self.vectors_path = new_vectors
+                try:
+                    os.remove(old_vectors)
+                except OSError:
+                    pass
+                self.index = new_index
+                self._rows_on_disk = rows
+                self.touched = set(new_index)
+                self._map()
+            except Exception as e:
+                print(f"Warning: Encoding cache compaction failed: {e}")
+                for tmp in (new_vectors, tmp_index):
+                    if os.path.exists(tmp): os.remove(tmp)
+                self._map()
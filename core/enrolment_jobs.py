@@ -0,0 +1,72 @@
+import queue
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+
+class EnrolmentQueue:
+    """
+    Background job queue for face enrolment.
+    Views submit work and return a job ID at once; worker threads run the jobs
+    (image decoding, DB writes, face encoding) and record their status.
+    The default single worker also serialises serial_no allocation between enrolments.
+    """
+    def __init__(self, workers=1, keep_finished=200):
+        self.workers = workers
+        self.keep_finished = keep_finished
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self._threads = []
+
+    def _ensure_workers(self):
+        if self._threads: return
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"enrolment-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, kind, func, *args, **kwargs):
+        """Queues `func(*args, **kwargs)` and returns the job ID."""
+        job_id = uuid.uuid4().hex
+        with self.lock:
+            self._ensure_workers()
+            self.jobs[job_id] = {
+                "id": job_id,
+                "kind": kind,
+                "status": "queued",
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None,
+            }
+            self._prune()
+        self.queue.put((job_id, func, args, kwargs))
+        return job_id
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _prune(self):
+        finished = [jid for jid, j in self.jobs.items() if j['status'] in ('done', 'failed')]
+        for jid in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self.jobs[jid]
+
+    def _worker(self):
+        while True:
+            job_id, func, args, kwargs = self.queue.get()
+            with self.lock:
+                self.jobs[job_id].update(status="running", started_at=time.time())
+            try:
+                result = func(*args, **kwargs)
+                update = {"status": "done", "result": result}
+            except Exception as e:
+                traceback.print_exc()
+                update = {"status": "failed", "error": str(e)}
+            with self.lock:
+                self.jobs[job_id].update(finished_at=time.time(), **update)
+            self.queue.task_done()
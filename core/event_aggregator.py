@@ -0,0 +1,67 @@
+import threading
+
+class EventAggregator:
+    """
+    Turns per-detection observations into episodes keyed by (camera, identity, action).
+    The first observation of a key opens an episode and is reported once as "appeared";
+    repeated observations only extend it. An episode closes after `leave_after` seconds
+    without being observed and is reported once as "left" with its duration.
+    A key that appeared less than `cooldown` seconds ago opens a silent episode instead,
+    so someone stepping in and out of frame is not logged again and again.
+    """
+    def __init__(self, leave_after=5.0, cooldown=30.0):
+        self.leave_after = leave_after
+        self.cooldown = cooldown
+        self.episodes = {} # key -> {"first_seen", "last_seen", "logged", "relation"}
+        self.last_logged = {} # key -> time its last "appeared" was reported
+        self.lock = threading.Lock()
+
+        # Counters
+        self.observations = 0
+        self.appeared = 0
+        self.left = 0
+
+    def observe(self, camera, identity, action, relation=None, now=0.0):
+        """Records one sighting. Returns True when it should be logged as a new appearance."""
+        key = (camera, identity, action)
+        with self.lock:
+            self.observations += 1
+            episode = self.episodes.get(key)
+            if episode is not None:
+                episode["last_seen"] = now
+                return False
+
+            last = self.last_logged.get(key)
+            logged = last is None or now - last >= self.cooldown
+            self.episodes[key] = {"first_seen": now, "last_seen": now, "logged": logged, "relation": relation}
+            if logged:
+                self.last_logged[key] = now
+                self.appeared += 1
+            return logged
+
+    def expire(self, camera, now):
+        """
+        Closes this camera's episodes not observed for `leave_after` seconds.
+        Returns [(identity, action, relation, duration)] for the ones that were logged.
+        """
+        ended = []
+        with self.lock:
+            for key in [k for k, e in self.episodes.items() if k[0] == camera and now - e["last_seen"] >= self.leave_after]:
+                episode = self.episodes.pop(key)
+                if episode["logged"]:
+                    ended.append((key[1], key[2], episode["relation"], episode["last_seen"] - episode["first_seen"]))
+                    self.left += 1
+
+            # Cool-down entries are only needed while they can still suppress an event
+            for key in [k for k, t in self.last_logged.items() if now - t >= self.cooldown and k not in self.episodes]:
+                del self.last_logged[key]
+        return ended
+
+    def stats(self):
+        with self.lock:
+            return {
+                "observations": self.observations,
+                "appeared": self.appeared,
+                "left": self.left,
+                "open_episodes": len(self.episodes),
+            }
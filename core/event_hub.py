@@ -0,0 +1,101 @@
+import asyncio
+import json
+import threading
+from collections import deque
+
+class EventHub:
+    """
+    Broadcast hub for Server-Sent Events (detections, stat counters, emergency changes).
+    `publish` (called from detection/worker threads) formats each event once into an SSE
+    frame and appends it to a short ring; every client just remembers the last sequence
+    number it sent, so N dashboards cost N cursors, not N queues. Clients that fall further
+    behind than the ring get a `resync` event and should refetch the full state.
+    Both a blocking generator (WSGI) and an async generator (ASGI) are provided.
+    """
+    def __init__(self, backlog=256, keepalive=15.0):
+        self.cond = threading.Condition()
+        self.seq = 0
+        self.ring = deque(maxlen=backlog) # (seq, sse bytes)
+        self.keepalive = keepalive
+        self._async_waiters = set() # (loop, future)
+        self.clients = 0
+        self.published = 0
+
+    def publish(self, event, data):
+        with self.cond:
+            self.seq += 1
+            payload = json.dumps(data, default=str)
+            self.ring.append((self.seq, f"id: {self.seq}\nevent: {event}\ndata: {payload}\n\n".encode()))
+            self.published += 1
+            self.cond.notify_all()
+            waiters, self._async_waiters = self._async_waiters, set()
+        for loop, fut in waiters:
+            loop.call_soon_threadsafe(lambda f=fut: f.done() or f.set_result(None))
+
+    def _since(self, last_seq):
+        """Frames newer than last_seq (caller holds cond). Returns (new_last_seq, [bytes])."""
+        if self.seq <= last_seq:
+            return last_seq, []
+        if not self.ring or self.ring[0][0] > last_seq + 1:
+            frame = f"id: {self.seq}\nevent: resync\ndata: {{}}\n\n".encode()
+            return self.seq, [frame]
+        return self.seq, [frame for seq, frame in self.ring if seq > last_seq]
+
+    def _count_client(self, n):
+        with self.cond:
+            self.clients += n
+
+    def _start(self, last_event_id, hello):
+        try:
+            last_seq = int(last_event_id)
+        except (TypeError, ValueError):
+            last_seq = None
+        with self.cond:
+            if last_seq is None or last_seq > self.seq:
+                last_seq = self.seq # New client: starts from "now" after the hello snapshot
+        first = b"retry: 3000\n\n"
+        if hello is not None:
+            first += f"id: {last_seq}\nevent: hello\ndata: {json.dumps(hello(), default=str)}\n\n".encode()
+        return last_seq, first
+
+    def stream(self, last_event_id=None, hello=None):
+        """Blocking generator for WSGI (one server thread per connected client)."""
+        last_seq, first = self._start(last_event_id, hello)
+        self._count_client(1)
+        try:
+            yield first
+            while True:
+                with self.cond:
+                    self.cond.wait_for(lambda: self.seq > last_seq, self.keepalive)
+                    last_seq, frames = self._since(last_seq)
+                yield b"".join(frames) if frames else b": ping\n\n"
+        finally:
+            self._count_client(-1)
+
+    async def stream_async(self, last_event_id=None, hello=None):
+        """Async generator for ASGI: idle clients are parked futures on the event loop."""
+        last_seq, first = self._start(last_event_id, hello)
+        loop = asyncio.get_running_loop()
+        self._count_client(1)
+        try:
+            yield first
+            while True:
+                with self.cond:
+                    last_seq, frames = self._since(last_seq)
+                    if not frames:
+                        fut = loop.create_future()
+                        self._async_waiters.add((loop, fut))
+                if frames:
+                    yield b"".join(frames)
+                    continue
+                try:
+                    await asyncio.wait_for(fut, self.keepalive)
+                except asyncio.TimeoutError:
+                    with self.cond:
+                        self._async_waiters.discard((loop, fut))
+                    yield b": ping\n\n"
+        finally:
+            self._count_client(-1)
+
+    def stats(self):
+        return {"clients": self.clients, "published": self.published, "seq": self.seq}
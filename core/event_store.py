@@ -0,0 +1,208 @@
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from bson.objectid import ObjectId
+from .dashboard_stats import DashboardStats
+
+class EventStore:
+    """
+    Time-partitioned storage for detection events, on MongoDB or JsonDB alike.
+
+    Events go to one collection per day (`<base>_YYYYMMDD`), so retention drops whole
+    partitions instead of deleting rows, and "today" queries only touch today's partition.
+    Every insert also bumps hourly and daily rollup counters (`<base>_rollups`) per camera
+    and category, so dashboard counts and trend charts read a handful of rollup documents
+    no matter how many events are stored. Rows of the old unpartitioned `<base>` collection
+    are moved into partitions by `migrate_legacy`; until then (and for rows without a
+    date) it is read as the oldest partition for history and deletes.
+    """
+    def __init__(self, db, base="suspect_logs", retention_days=0):
+        self.db = db
+        self.base = base
+        self.rollups_name = f"{base}_rollups"
+        self.retention_days = retention_days # 0 = keep everything
+        self._indexed = set()
+        self.lock = threading.Lock()
+
+    # --- Partitions ---
+
+    def partition_name(self, date):
+        """`date` is a "YYYY-MM-DD" string (the events' `date` field)."""
+        return f"{self.base}_{date.replace('-', '')}"
+
+    def _partition(self, date):
+        name = self.partition_name(date)
+        collection = self.db[name]
+        if name not in self._indexed:
+            self._indexed.add(name)
+            if not getattr(self.db, 'is_json_db', False):
+                try:
+                    collection.create_index([("timestamp", -1)])
+                except Exception as e:
+                    print(f"Event Store Index Error: {e}")
+        return collection
+
+    def partitions(self):
+        """Partition dates ("YYYY-MM-DD"), newest first."""
+        prefix = f"{self.base}_"
+        dates = []
+        for name in self.db.list_collection_names():
+            suffix = name[len(prefix):]
+            if name.startswith(prefix) and len(suffix) == 8 and suffix.isdigit():
+                dates.append(f"{suffix[:4]}-{suffix[4:6]}-{suffix[6:]}")
+        return sorted(dates, reverse=True)
+
+    def _collections_newest_first(self):
+        for date in self.partitions():
+            yield self.db[self.partition_name(date)]
+        yield self.db[self.base] # Pre-partitioning history
+
+    # --- Writes ---
+
+    def insert_many(self, docs):
+        """Inserts events into their day partitions and updates the rollups (LogWriter entry point)."""
+        by_date = {}
+        for doc in docs:
+            by_date.setdefault(doc.get("date") or datetime.now().strftime("%Y-%m-%d"), []).append(doc)
+        for date, day_docs in by_date.items():
+            self._partition(date).insert_many(day_docs)
+        self._update_rollups(docs)
+
+    def insert_one(self, doc):
+        self.insert_many([doc])
+
+    @staticmethod
+    def categories(doc):
+        return ["events"] + DashboardStats.classify(doc)
+
+    def _update_rollups(self, docs):
+        counts = Counter()
+        for doc in docs:
+            ts = doc.get("timestamp")
+            date = doc.get("date")
+            hour = ts.hour if isinstance(ts, datetime) else None
+            camera = str(doc.get("camera") or "")
+            for category in self.categories(doc):
+                counts[("day", date, None, camera, category)] += 1
+                if hour is not None:
+                    counts[("hour", date, hour, camera, category)] += 1
+
+        rollups = self.db[self.rollups_name]
+        for (period, date, hour, camera, category), n in counts.items():
+            rollups.update_one(
+                {"_id": f"{period}|{date}|{hour}|{camera}|{category}"},
+                {"$inc": {"count": n}, "$set": {"period": period, "date": date, "hour": hour, "camera": camera, "category": category}},
+                upsert=True
+            )
+
+    def migrate_legacy(self, batch_size=500):
+        """
+        Moves dated rows of the unpartitioned `<base>` collection into their day partitions
+        and counts them in the rollups, so dashboards and retention cover them. Each batch
+        is upserted by _id before it is deleted from `<base>`, so an interrupted run resumes
+        without losing or duplicating rows (a crash between the upserts and the rollup
+        update leaves that batch uncounted). Returns the number of rows moved.
+        """
+        legacy = self.db[self.base]
+        moved = 0
+        with self.lock:
+            while True:
+                batch = list(legacy.find({"date": {"$nin": [None, ""]}}).limit(batch_size))
+                if not batch:
+                    break
+                new = []
+                for doc in batch:
+                    fields = {k: v for k, v in doc.items() if k != "_id"}
+                    result = self._partition(doc["date"]).update_one({"_id": doc["_id"]}, {"$set": fields}, upsert=True)
+                    if result.upserted_id is not None:
+                        new.append(doc) # Not moved by an earlier, interrupted run
+                self._update_rollups(new)
+                legacy.delete_many({"_id": {"$in": [doc["_id"] for doc in batch]}})
+                moved += len(batch)
+        if moved:
+            print(f"Event Store: moved {moved} legacy event(s) into day partitions")
+        return moved
+
+    # --- Reads ---
+
+    def recent(self, limit=100, skip=0):
+        """Newest events across partitions, stopping as soon as `skip + limit` are found."""
+        wanted = skip + limit
+        logs = []
+        for collection in self._collections_newest_first():
+            logs.extend(collection.find().sort("timestamp", -1).limit(wanted - len(logs)))
+            if len(logs) >= wanted:
+                break
+        return logs[skip:wanted]
+
+    def daily_counts(self, date, camera=None):
+        """{category: count} for one day, from the daily rollups."""
+        query = {"period": "day", "date": date}
+        if camera is not None:
+            query["camera"] = str(camera)
+        totals = Counter()
+        for doc in self.db[self.rollups_name].find(query):
+            totals[doc["category"]] += doc.get("count", 0)
+        return dict(totals)
+
+    def trend(self, days=7, period="day", camera=None, category="events"):
+        """[(label, count)] for the last `days` days (hourly labels "YYYY-MM-DD HH")."""
+        today = datetime.now().date()
+        dates = [(today - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days - 1, -1, -1)]
+        query = {"period": period, "category": category, "date": {"$in": dates}}
+        if camera is not None:
+            query["camera"] = str(camera)
+        totals = Counter()
+        for doc in self.db[self.rollups_name].find(query):
+            label = doc["date"] if period == "day" else f"{doc['date']} {doc['hour']:02d}"
+            totals[label] += doc.get("count", 0)
+        if period == "day":
+            return [(d, totals.get(d, 0)) for d in dates]
+        return [(f"{d} {h:02d}", totals.get(f"{d} {h:02d}", 0)) for d in dates for h in range(24)]
+
+    # --- Deletes / retention ---
+
+    def delete(self, log_id):
+        """Deletes one event by id from whichever partition holds it. Returns True if found."""
+        ids = [log_id]
+        if ObjectId.is_valid(log_id):
+            ids.insert(0, ObjectId(log_id))
+        targets = [(self.db[self.partition_name(date)], True) for date in self.partitions()]
+        targets.append((self.db[self.base], False)) # Legacy rows are not in the rollups
+        for collection, counted in targets:
+            for doc_id in ids:
+                doc = collection.find_one({"_id": doc_id})
+                if doc is None:
+                    continue
+                collection.delete_one({"_id": doc_id})
+                if counted:
+                    self._update_rollups_removed(doc)
+                return True
+        return False
+
+    def _update_rollups_removed(self, doc):
+        ts = doc.get("timestamp")
+        hour = ts.hour if isinstance(ts, datetime) else None
+        camera = str(doc.get("camera") or "")
+        rollups = self.db[self.rollups_name]
+        for category in self.categories(doc):
+            rollups.update_one({"_id": f"day|{doc.get('date')}|None|{camera}|{category}"}, {"$inc": {"count": -1}})
+            if hour is not None:
+                rollups.update_one({"_id": f"hour|{doc.get('date')}|{hour}|{camera}|{category}"}, {"$inc": {"count": -1}})
+
+    def enforce_retention(self, now=None):
+        """Drops partitions (and their rollups) older than `retention_days`. Returns dropped dates."""
+        if self.retention_days <= 0:
+            return []
+        cutoff = ((now or datetime.now()) - timedelta(days=self.retention_days)).strftime("%Y-%m-%d")
+        dropped = []
+        with self.lock:
+            for date in self.partitions():
+                if date < cutoff:
+                    self.db.drop_collection(self.partition_name(date))
+                    self.db[self.rollups_name].delete_many({"date": date})
+                    self._indexed.discard(self.partition_name(date))
+                    dropped.append(date)
+        if dropped:
+            print(f"Event Store: dropped {len(dropped)} partition(s) older than {cutoff}")
+        return dropped
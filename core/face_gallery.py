@@ -0,0 +1,202 @@
+import threading
+import numpy as np
+from .gallery_search import make_search_backend
+
+class FaceGallery:
+    """
+    In-memory gallery of known face encodings.
+    Encodings live in one preallocated float32 matrix with parallel label arrays,
+    so a whole frame of faces is matched with a single matrix product.
+    Rows are stable slots: removed rows are marked inactive and reused on insert.
+    Lookups go through a pluggable search backend ('exact' or 'ivf', see gallery_search).
+    All mutations and matches hold `lock`, so enrolment threads never race detection.
+    """
+    def __init__(self, dim=128, capacity=256, search="exact", **search_options):
+        self.dim = dim
+        self.encodings = np.zeros((capacity, dim), dtype=np.float32)
+        self.sq_norms = np.zeros(capacity, dtype=np.float32)
+        self.names = np.empty(capacity, dtype=object)
+        self.relations = np.empty(capacity, dtype=object)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.size = 0 # High-water mark of used rows
+        self.count = 0 # Number of active rows
+        self._free_slots = []
+        self.lock = threading.RLock()
+        self.search = make_search_backend(self, search, **search_options)
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self, min_capacity):
+        capacity = max(1, len(self.encodings)) # A zero-capacity gallery would never double
+        while capacity < min_capacity:
+            capacity *= 2
+
+        encodings = np.zeros((capacity, self.dim), dtype=np.float32)
+        encodings[:self.size] = self.encodings[:self.size]
+        sq_norms = np.zeros(capacity, dtype=np.float32)
+        sq_norms[:self.size] = self.sq_norms[:self.size]
+        names = np.empty(capacity, dtype=object)
+        names[:self.size] = self.names[:self.size]
+        relations = np.empty(capacity, dtype=object)
+        relations[:self.size] = self.relations[:self.size]
+        active = np.zeros(capacity, dtype=bool)
+        active[:self.size] = self.active[:self.size]
+
+        self.encodings, self.sq_norms = encodings, sq_norms
+        self.names, self.relations, self.active = names, relations, active
+
+    def add(self, encoding, name, relation):
+        """Adds one encoding and returns its slot index."""
+        with self.lock:
+            return self._add(encoding, name, relation)
+
+    def _add(self, encoding, name, relation):
+        if self._free_slots:
+            slot = self._free_slots.pop()
+        else:
+            if self.size >= len(self.encodings):
+                self._grow(self.size + 1)
+            slot = self.size
+            self.size += 1
+
+        vec = np.asarray(encoding, dtype=np.float32)
+        self.encodings[slot] = vec
+        self.sq_norms[slot] = float(np.dot(vec, vec))
+        self.names[slot] = name
+        self.relations[slot] = relation
+        self.active[slot] = True
+        self.count += 1
+        self.search.on_add(slot)
+        return slot
+
+    def add_many(self, encodings, name, relation):
+        with self.lock:
+            return [self._add(enc, name, relation) for enc in encodings]
+
+    def replace(self, name, encodings, relation):
+        """Atomically swaps all of `name`'s encodings for the new ones."""
+        with self.lock:
+            self._remove(name)
+            return [self._add(enc, name, relation) for enc in encodings]
+
+    def remove(self, name):
+        """Removes every encoding stored under `name`. Returns the freed slots."""
+        with self.lock:
+            return self._remove(name)
+
+    def _remove(self, name):
+        slots = np.flatnonzero(self.active[:self.size] & (self.names[:self.size] == name))
+        for slot in slots:
+            self.active[slot] = False
+            self.names[slot] = None
+            self.relations[slot] = None
+            self._free_slots.append(int(slot))
+        self.count -= len(slots)
+        freed = [int(s) for s in slots]
+        self.search.on_remove(freed)
+        return freed
+
+    def clear(self):
+        with self.lock:
+            self._clear()
+
+    def _clear(self):
+        self.active[:] = False
+        self.names[:] = None
+        self.relations[:] = None
+        self.size = 0
+        self.count = 0
+        self._free_slots = []
+        self.search.rebuild()
+
+    def distances(self, face_encodings, slots=None):
+        """
+        Euclidean distances between each query and gallery rows, shape (queries, rows).
+        Uses |q|^2 + |k|^2 - 2 q.k so all faces are scored in one matrix product.
+        Inactive rows get +inf.
+        """
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, self.dim)
+        if slots is None:
+            rows = self.encodings[:self.size]
+            sq_norms = self.sq_norms[:self.size]
+            active = self.active[:self.size]
+        else:
+            rows = self.encodings[slots]
+            sq_norms = self.sq_norms[slots]
+            active = self.active[slots]
+
+        q_norms = np.einsum('ij,ij->i', queries, queries)
+        d2 = q_norms[:, None] + sq_norms[None, :] - 2.0 * (queries @ rows.T)
+        np.maximum(d2, 0.0, out=d2)
+        dist = np.sqrt(d2)
+        dist[:, ~active] = np.inf
+        return dist
+
+    def match(self, face_encodings, tolerance=0.6):
+        """
+        Matches a batch of encodings against the gallery.
+        Returns one (name, relation, distance) per query; name/relation are None when
+        the best distance is above `tolerance` (same rule as face_recognition.compare_faces).
+        """
+        n = len(face_encodings)
+        if n == 0:
+            return []
+        with self.lock:
+            if self.count == 0:
+                return [(None, None, float('inf'))] * n
+
+            best, best_dist = self.search.search(face_encodings)
+
+            results = []
+            for idx, d in zip(best, best_dist):
+                if d <= tolerance:
+                    results.append((self.names[idx], self.relations[idx], float(d)))
+                else:
+                    results.append((None, None, float(d)))
+            return results
+
+def compact_encodings(encodings, max_prototypes, iters=5):
+    """
+    Reduces one person's encodings to at most `max_prototypes` rows: the centroid plus
+    k-medoids picked from the samples, so outlying poses/lighting keep a representative.
+    Returns the encodings unchanged when compaction is disabled (0) or not needed.
+    """
+    if max_prototypes <= 0 or len(encodings) <= max_prototypes:
+        return list(encodings)
+
+    X = np.asarray(encodings, dtype=np.float32)
+
+    centroid = X.mean(axis=0)
+    k = max_prototypes - 1
+    if k == 0:
+        return [centroid]
+
+    sq = np.einsum('ij,ij->i', X, X)
+    D = np.sqrt(np.maximum(sq[:, None] + sq[None, :] - 2.0 * (X @ X.T), 0.0))
+    to_centroid = np.linalg.norm(X - centroid, axis=1)
+
+    # Farthest-point init, starting from the sample furthest from the centroid
+    medoids = [int(np.argmax(to_centroid))]
+    closest = np.minimum(to_centroid, D[medoids[0]])
+    while len(medoids) < k:
+        nxt = int(np.argmax(closest))
+        medoids.append(nxt)
+        closest = np.minimum(closest, D[nxt])
+
+    # Alternate assignment/update; the centroid is a fixed extra cluster
+    for _ in range(iters):
+        dist = np.column_stack([to_centroid, D[:, medoids]])
+        labels = np.argmin(dist, axis=1)
+        updated = []
+        for j, m in enumerate(medoids):
+            members = np.flatnonzero(labels == j + 1)
+            if len(members) == 0:
+                updated.append(m)
+                continue
+            updated.append(int(members[np.argmin(D[np.ix_(members, members)].sum(axis=1))]))
+        if updated == medoids:
+            break
+        medoids = updated
+
+    return [centroid] + [X[m] for m in medoids]
@@ -0,0 +1,102 @@
+import itertools
+
+def box_iou(a, b):
+    """IoU of two (top, right, bottom, left) boxes."""
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    inter = max(0, right - left) * max(0, bottom - top)
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    union = area_a + area_b - inter
+    return inter / float(union) if union > 0 else 0.0
+
+def _centroid_close(a, b, factor):
+    """True if the box centres are within `factor` x the mean box size of each other."""
+    ay, ax = (a[0] + a[2]) / 2, (a[1] + a[3]) / 2
+    by, bx = (b[0] + b[2]) / 2, (b[1] + b[3]) / 2
+    size = ((a[1] - a[3]) + (a[2] - a[0]) + (b[1] - b[3]) + (b[2] - b[0])) / 4
+    return ((ax - bx) ** 2 + (ay - by) ** 2) ** 0.5 <= factor * size
+
+class FaceTrack:
+    def __init__(self, track_id, box, now):
+        self.id = track_id
+        self.box = box
+        self.name = None
+        self.relation = None
+        self.verified_at = 0.0
+        self.verified_box = None
+        self.first_seen = now
+        self.last_seen = now
+        self.misses = 0
+
+class FaceTracker:
+    """
+    Tracks faces between detection cycles for one camera (greedy IoU association with a
+    centroid-distance fallback), so a recognised face keeps its identity and track ID
+    without being re-encoded every tick. A track is re-verified (encoded + matched again)
+    every `reverify_interval` seconds, or sooner when its box drifts from where it was
+    last verified (IoU below `reverify_iou`).
+    """
+    _ids = itertools.count(1) # Track IDs are unique across cameras
+
+    def __init__(self, iou_threshold=0.3, centroid_factor=0.5, max_misses=5, reverify_interval=2.0, reverify_iou=0.5):
+        self.iou_threshold = iou_threshold
+        self.centroid_factor = centroid_factor
+        self.max_misses = max_misses
+        self.reverify_interval = reverify_interval
+        self.reverify_iou = reverify_iou
+        self.tracks = []
+
+    def update(self, boxes, now):
+        """
+        Associates this cycle's face boxes with tracks.
+        Returns (tracks, needs_encoding): one track per box, plus a parallel list of
+        booleans telling which faces must be encoded and matched again.
+        """
+        pairs = sorted(((box_iou(t.box, b), ti, bi) for ti, t in enumerate(self.tracks) for bi, b in enumerate(boxes)),
+                       reverse=True)
+        assigned = {}
+        used_tracks = set()
+        for iou, ti, bi in pairs:
+            if iou < self.iou_threshold: break
+            if ti in used_tracks or bi in assigned: continue
+            assigned[bi] = self.tracks[ti]
+            used_tracks.add(ti)
+
+        # Fast movers: fall back to centroid distance
+        for bi, b in enumerate(boxes):
+            if bi in assigned: continue
+            for ti, t in enumerate(self.tracks):
+                if ti not in used_tracks and _centroid_close(t.box, b, self.centroid_factor):
+                    assigned[bi] = t
+                    used_tracks.add(ti)
+                    break
+
+        result, needs_encoding = [], []
+        for bi, b in enumerate(boxes):
+            track = assigned.get(bi)
+            if track is None:
+                track = FaceTrack(next(self._ids), b, now)
+                self.tracks.append(track)
+            track.box = b
+            track.last_seen = now
+            track.misses = 0
+            result.append(track)
+            needs_encoding.append(
+                track.name is None
+                or now - track.verified_at >= self.reverify_interval
+                or box_iou(track.verified_box, b) < self.reverify_iou
+            )
+
+        # Age out tracks that were not seen this cycle
+        for ti, t in enumerate(self.tracks):
+            if ti not in used_tracks and t not in result:
+                t.misses += 1
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+        return result, needs_encoding
+
+    def set_identity(self, track, name, relation, now):
+        track.name = name
+        track.relation = relation
+        track.verified_at = now
+        track.verified_box = track.box
@@ -0,0 +1,89 @@
+import threading
+import cv2
+from .stage_timer import stage_timer
+
+# Named stream profiles for video_feed (?profile=...). width None = native resolution.
+STREAM_PROFILES = {
+    'full': {'width': None, 'quality': 95, 'fps': 30},
+    'low': {'width': 640, 'quality': 70, 'fps': 15},
+    'thumb': {'width': 320, 'quality': 60, 'fps': 8},
+}
+
+def resolve_profile(params):
+    """
+    Builds a {'width', 'quality', 'fps'} profile from query params: a named `profile`
+    (default 'full') optionally overridden by explicit `width`, `quality` and `fps`.
+    Widths are rounded to a multiple of 16 so near-identical requests share one encode.
+    """
+    profile = dict(STREAM_PROFILES.get(params.get('profile'), STREAM_PROFILES['full']))
+    try:
+        if params.get('width'):
+            profile['width'] = min(3840, max(64, int(params['width']) // 16 * 16))
+        if params.get('quality'):
+            profile['quality'] = min(100, max(10, int(params['quality'])))
+        if params.get('fps'):
+            profile['fps'] = min(30.0, max(0.2, float(params['fps'])))
+    except ValueError:
+        pass
+    return profile
+
+class FrameBroadcaster:
+    """
+    Fans a CameraStream's output frames out to any number of MJPEG viewers.
+    Each published frame gets a sequence number; viewers block on a condition variable
+    until a newer frame exists, and the JPEG for a frame is encoded once per
+    (width, quality) variant by whichever viewer asks first, then shared by the rest.
+    Viewers always jump to the newest frame, so slow consumers drop frames instead of
+    building a backlog. With no viewers nothing is encoded.
+    """
+    MAX_VARIANTS = 16
+
+    def __init__(self, name=None):
+        self.name = name # Camera id, for stage timing
+        self.cond = threading.Condition()
+        self.seq = 0
+        self._frame = None
+        self._variants = {} # (width, quality) -> (seq, bytes)
+        self._encode_locks = {}
+
+    def publish(self, frame):
+        with self.cond:
+            self._frame = frame
+            self.seq += 1
+            self.cond.notify_all()
+
+    def wait_jpeg(self, last_seq, timeout=1.0, width=None, quality=95):
+        """
+        Blocks until a frame newer than `last_seq` is published.
+        Returns (seq, jpeg_bytes) for the requested variant, or (last_seq, None) on timeout.
+        """
+        key = (width, quality)
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.seq > last_seq, timeout):
+                return last_seq, None
+            seq, frame = self.seq, self._frame
+            encode_lock = self._encode_locks.setdefault(key, threading.Lock())
+
+        with encode_lock:
+            cached = self._variants.get(key)
+            if cached and cached[0] >= seq:
+                return cached
+
+            with stage_timer.measure("jpeg_encode", self.name):
+                img = frame
+                h, w = frame.shape[:2]
+                if width and width < w:
+                    img = cv2.resize(frame, (width, max(1, round(h * width / w))), interpolation=cv2.INTER_AREA)
+                ret, buffer = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            if not ret:
+                return seq, None
+
+            encoded = (seq, buffer.tobytes())
+            with self.cond:
+                if len(self._variants) >= self.MAX_VARIANTS:
+                    # Forget variants nobody has asked for recently
+                    for k in [k for k, v in self._variants.items() if v[0] < seq]:
+                        self._variants.pop(k, None)
+                        self._encode_locks.pop(k, None)
+                self._variants[key] = encoded
+            return encoded
@@ -0,0 +1,263 @@
+import os
+import random
+import time
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+def capture_backend(src):
+    """OpenCV backend for a device index or stream URL (DirectShow only exists on Windows)."""
+    if isinstance(src, int):
+        if os.name == 'nt':
+            return cv2.CAP_DSHOW
+        if hasattr(cv2, 'CAP_V4L2') and os.path.exists(f"/dev/video{src}"):
+            return cv2.CAP_V4L2
+        return cv2.CAP_ANY
+    return cv2.CAP_FFMPEG
+
+class FrameSource:
+    """
+    A capture source: read() -> (ok, frame). `fps` caps the delivery rate (0 = as fast as
+    the source goes) and `width`/`height` resize frames (0 = native size). Sources that
+    are not paced by hardware (files, directories, synthetic) hold `fps` in pace(),
+    which the reader calls before read() (so read() itself only measures decoding).
+    """
+    def __init__(self, fps=0, width=0, height=0):
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self._next_frame = 0.0
+
+    def open(self):
+        return True
+
+    def read(self):
+        raise NotImplementedError
+
+    def release(self):
+        pass
+
+    def pace(self):
+        """Sleeps until the next frame is due."""
+        if not self.fps:
+            return
+        now = time.time()
+        if self._next_frame > now:
+            time.sleep(self._next_frame - now)
+        self._next_frame = max(now, self._next_frame) + 1.0 / self.fps
+
+    def _resize(self, frame):
+        if frame is None or not (self.width or self.height):
+            return frame
+        h, w = frame.shape[:2]
+        width = self.width or round(w * self.height / h)
+        height = self.height or round(h * self.width / w)
+        if (width, height) == (w, h):
+            return frame
+        return cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+
+class CaptureSource(FrameSource):
+    """Local camera (V4L2 / DirectShow / default backend) or RTSP/HTTP stream via cv2.VideoCapture."""
+
+    def __init__(self, src, fps=0, width=0, height=0, timeout=0):
+        super().__init__(fps, width, height)
+        self.src = src
+        self.timeout = timeout # Open/read timeout for URLs (s, 0 = OpenCV default)
+        self.cap = None
+
+    def open(self):
+        self.release()
+        backend = capture_backend(self.src)
+        if self.timeout and not isinstance(self.src, int):
+            ms = int(self.timeout * 1000)
+            try:
+                self.cap = cv2.VideoCapture(self.src, backend, [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, ms, cv2.CAP_PROP_READ_TIMEOUT_MSEC, ms])
+            except Exception:
+                self.cap = cv2.VideoCapture(self.src, backend) # OpenCV < 4.5.2: no open params
+        else:
+            self.cap = cv2.VideoCapture(self.src, backend)
+        if isinstance(self.src, int) and self.cap.isOpened():
+            # Ask the device for the mode we want rather than resizing every frame
+            if self.width: self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+            if self.height: self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+            if self.fps: self.cap.set(cv2.CAP_PROP_FPS, self.fps)
+        return self.cap.isOpened()
+
+    def read(self):
+        if self.cap is None or not self.cap.isOpened():
+            return False, None
+        ret, frame = self.cap.read()
+        if not ret:
+            return False, None
+        return True, self._resize(frame)
+
+    def pace(self):
+        if not isinstance(self.src, int):
+            super().pace() # Streams may deliver faster than wanted; devices were asked for fps in open()
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+class VideoFileSource(FrameSource):
+    """Video file played in real time (its own FPS unless `fps` is set), looping at the end."""
+
+    def __init__(self, path, fps=0, width=0, height=0, loop=True):
+        super().__init__(fps, width, height)
+        self.path = path
+        self.loop = loop
+        self.cap = None
+
+    def open(self):
+        self.release()
+        self.cap = cv2.VideoCapture(self.path)
+        if not self.fps:
+            self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 25
+        return self.cap.isOpened()
+
+    def read(self):
+        if self.cap is None:
+            return False, None
+        ret, frame = self.cap.read()
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        if not ret:
+            return False, None
+        return True, self._resize(frame)
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+class ImageDirSource(FrameSource):
+    """Images of a directory (sorted by name) played as a stream, looping at the end."""
+
+    def __init__(self, path, fps=5, width=0, height=0, loop=True):
+        super().__init__(fps, width, height)
+        self.path = path
+        self.loop = loop
+        self.files = []
+        self.index = 0
+
+    def open(self):
+        self.files = sorted(
+            os.path.join(self.path, name) for name in os.listdir(self.path)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self.index = 0
+        return bool(self.files)
+
+    def read(self):
+        for _ in range(len(self.files)):
+            if self.index >= len(self.files):
+                if not self.loop:
+                    return False, None
+                self.index = 0
+            frame = cv2.imread(self.files[self.index])
+            self.index += 1
+            if frame is not None:
+                return True, self._resize(frame)
+        return False, None # Nothing readable
+
+class SyntheticSource(FrameSource):
+    """
+    Generated frames for load tests without hardware: a noisy background with a few
+    moving blocks (so motion gating and detection see changes) and a frame counter.
+    Deterministic for a given `seed`.
+    """
+
+    def __init__(self, fps=15, width=640, height=480, objects=3, seed=0):
+        super().__init__(fps, width or 640, height or 480)
+        self.objects = objects
+        self.seed = seed
+        self.count = 0
+
+    def open(self):
+        rng = random.Random(self.seed)
+        noise = np.random.default_rng(self.seed).integers(0, 32, (self.height, self.width, 1), dtype=np.uint8)
+        self.background = cv2.cvtColor(noise + 40, cv2.COLOR_GRAY2BGR)
+        size = max(8, min(self.width, self.height) // 6)
+        self.blocks = [
+            {
+                'pos': [rng.uniform(0, self.width - size), rng.uniform(0, self.height - size)],
+                'vel': [rng.uniform(-6, 6), rng.uniform(-6, 6)],
+                'size': size,
+                'color': tuple(rng.randint(80, 255) for _ in range(3)),
+            }
+            for _ in range(self.objects)
+        ]
+        self.count = 0
+        return True
+
+    def read(self):
+        frame = self.background.copy()
+        for block in self.blocks:
+            for axis, limit in ((0, self.width), (1, self.height)):
+                block['pos'][axis] += block['vel'][axis]
+                if not 0 <= block['pos'][axis] <= limit - block['size']:
+                    block['vel'][axis] = -block['vel'][axis]
+                    block['pos'][axis] = min(max(block['pos'][axis], 0), limit - block['size'])
+            x, y = int(block['pos'][0]), int(block['pos'][1])
+            cv2.rectangle(frame, (x, y), (x + block['size'], y + block['size']), block['color'], -1)
+        self.count += 1
+        cv2.putText(frame, f"SYNTHETIC {self.count}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+        return True, frame
+
+def parse_synthetic(spec):
+    """"synthetic" / "synthetic:640x480@15" -> (width, height, fps), zeros where not given."""
+    width = height = fps = 0
+    _, _, params = spec.partition(":")
+    size, _, rate = params.partition("@")
+    if "x" in size:
+        width, height = (int(v) for v in size.split("x", 1))
+    if rate:
+        fps = float(rate)
+    return width, height, fps
+
+def open_source(src, fps=0, width=0, height=0, timeout=0):
+    """
+    FrameSource for a camera spec (not opened yet): a device index, "synthetic[:WxH@FPS]",
+    an rtsp/http URL, a directory of images or a video file.
+    """
+    if isinstance(src, str) and src.isdigit():
+        src = int(src)
+    if isinstance(src, int):
+        return CaptureSource(src, fps, width, height)
+    if src.startswith("synthetic"):
+        s_width, s_height, s_fps = parse_synthetic(src)
+        return SyntheticSource(fps or s_fps or 15, width or s_width, height or s_height)
+    if "://" in src:
+        return CaptureSource(src, fps, width, height, timeout=timeout)
+    if os.path.isdir(src):
+        return ImageDirSource(src, fps or 5, width, height)
+    return VideoFileSource(src, fps, width, height)
+
+def source_kind(src):
+    """"device", "synthetic", "url", "images" or "file"."""
+    if isinstance(src, int) or (isinstance(src, str) and src.isdigit()):
+        return "device"
+    if src.startswith("synthetic"):
+        return "synthetic"
+    if "://" in src:
+        return "url"
+    return "images" if os.path.isdir(src) else "file"
+
+class Backoff:
+    """Exponential reconnect delay: `initial`, doubling up to `maximum`, with a little jitter."""
+
+    def __init__(self, initial=0.5, maximum=10.0):
+        self.initial = initial
+        self.maximum = maximum
+        self.attempts = 0
+
+    def next(self):
+        delay = min(self.maximum, self.initial * (2 ** min(self.attempts, 16)))
+        self.attempts += 1
+        return delay * random.uniform(0.8, 1.0)
+
+    def reset(self):
+        self.attempts = 0
@@ -0,0 +1,145 @@
+import numpy as np
+
+class ExactSearch:
+    """Brute-force search: scores the query batch against every active gallery row."""
+    name = "exact"
+
+    def __init__(self, gallery):
+        self.gallery = gallery
+
+    def on_add(self, slot):
+        pass
+
+    def on_remove(self, slots):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, queries):
+        """Returns (best_slots, best_distances) for each query."""
+        dist = self.gallery.distances(queries)
+        best = np.argmin(dist, axis=1)
+        return best, dist[np.arange(len(best)), best]
+
+class IVFSearch:
+    """
+    Approximate search with an inverted file (IVF) index.
+    Gallery rows are bucketed by their nearest k-means centroid; a query only scans the
+    `nprobe` closest buckets. Inserts and deletes update the buckets in place, and the
+    centroids are retrained only when the gallery has grown well past the training set.
+    Small galleries (below `min_train`) are searched exactly.
+    """
+    name = "ivf"
+
+    def __init__(self, gallery, nlist=64, nprobe=8, min_train=None, kmeans_iters=10, seed=0):
+        self.gallery = gallery
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train = min_train if min_train is not None else nlist * 8
+        self.kmeans_iters = kmeans_iters
+        self.rng = np.random.default_rng(seed)
+
+        self.centroids = None
+        self.lists = []
+        self.slot_list = {} # slot -> list number
+        self.trained_count = 0
+
+    # --- Index maintenance ---
+
+    def _assign(self, vectors):
+        c_norms = np.einsum('ij,ij->i', self.centroids, self.centroids)
+        d2 = c_norms[None, :] - 2.0 * (vectors @ self.centroids.T)
+        return np.argmin(d2, axis=1)
+
+    def _kmeans(self, data):
+        k = min(self.nlist, len(data))
+        centroids = data[self.rng.choice(len(data), size=k, replace=False)].copy()
+        for _ in range(self.kmeans_iters):
+            c_norms = np.einsum('ij,ij->i', centroids, centroids)
+            labels = np.argmin(c_norms[None, :] - 2.0 * (data @ centroids.T), axis=1)
+            counts = np.bincount(labels, minlength=k)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, data)
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+            # Re-seed empty clusters on random points
+            empty = np.flatnonzero(~filled)
+            if len(empty):
+                centroids[empty] = data[self.rng.choice(len(data), size=len(empty))]
+        return centroids
+
+    def rebuild(self):
+        g = self.gallery
+        slots = np.flatnonzero(g.active[:g.size])
+        self.slot_list = {}
+        if len(slots) < self.min_train:
+            self.centroids = None
+            self.lists = []
+            self.trained_count = 0
+            return
+
+        data = g.encodings[slots]
+        # Cap the training sample; assignment below still covers every row
+        max_train = self.nlist * 256
+        sample = data if len(data) <= max_train else data[self.rng.choice(len(data), size=max_train, replace=False)]
+        self.centroids = self._kmeans(sample)
+        self.lists = [[] for _ in range(len(self.centroids))]
+        for slot, lst in zip(slots, self._assign(data)):
+            self.lists[lst].append(int(slot))
+            self.slot_list[int(slot)] = int(lst)
+        self.trained_count = len(slots)
+
+    def on_add(self, slot):
+        if self.centroids is None:
+            if self.gallery.count >= self.min_train:
+                self.rebuild()
+            return
+        if self.gallery.count > 4 * self.trained_count:
+            self.rebuild() # Amortised retrain as the gallery outgrows its centroids
+            return
+        lst = int(self._assign(self.gallery.encodings[slot][None, :])[0])
+        self.lists[lst].append(slot)
+        self.slot_list[slot] = lst
+
+    def on_remove(self, slots):
+        for slot in slots:
+            lst = self.slot_list.pop(slot, None)
+            if lst is not None:
+                self.lists[lst].remove(slot)
+
+    # --- Query ---
+
+    def search(self, queries):
+        g = self.gallery
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, g.dim)
+        if self.centroids is None:
+            return ExactSearch(g).search(queries)
+
+        nprobe = min(self.nprobe, len(self.centroids))
+        c_norms = np.einsum('ij,ij->i', self.centroids, self.centroids)
+        coarse = c_norms[None, :] - 2.0 * (queries @ self.centroids.T)
+        probes = np.argpartition(coarse, nprobe - 1, axis=1)[:, :nprobe]
+
+        best_slots = np.zeros(len(queries), dtype=np.int64)
+        best_dist = np.full(len(queries), np.inf, dtype=np.float32)
+        for qi, probe in enumerate(probes):
+            candidates = [s for lst in probe for s in self.lists[lst]]
+            if not candidates:
+                continue
+            candidates = np.asarray(candidates, dtype=np.int64)
+            dist = g.distances(queries[qi:qi + 1], candidates)[0]
+            j = int(np.argmin(dist))
+            best_slots[qi] = candidates[j]
+            best_dist[qi] = dist[j]
+        return best_slots, best_dist
+
+SEARCH_BACKENDS = {
+    ExactSearch.name: ExactSearch,
+    IVFSearch.name: IVFSearch,
+}
+
+def make_search_backend(gallery, kind="exact", **options):
+    if kind not in SEARCH_BACKENDS:
+        raise ValueError(f"Unknown gallery search backend: {kind}")
+    return SEARCH_BACKENDS[kind](gallery, **options)
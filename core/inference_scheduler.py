@@ -0,0 +1,128 @@
+import threading
+import time
+
+class InferenceScheduler:
+    """
+    One inference loop shared by every camera, replacing a detection thread per stream.
+    Each tick it collects the latest frame from every camera that is due, drops those the
+    motion gate rejects, and runs them through `detect_batch` in a single call so YOLO sees
+    one batch instead of N threads fighting over the GIL and torch's intra-op threads.
+    Overlays are dispatched back to each stream.
+
+    Fairness/priority: a camera is due every `interval / priority` seconds; when more
+    cameras are due than `max_batch`, the most overdue (weighted by priority) go first and
+    the rest carry their backlog into the next tick, so no camera starves.
+    """
+    def __init__(self, detect_batch, interval=0.08, max_batch=8, tick=0.01):
+        self.detect_batch = detect_batch
+        self.interval = interval
+        self.max_batch = max_batch
+        self.tick = tick
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+
+        # Counters
+        self.batches = 0
+        self.frames = 0
+        self.last_batch_size = 0
+        self.last_batch_latency = 0.0
+        self.failures = 0 # Frames dropped because detection raised
+
+    def register(self, key, stream, priority=1.0):
+        with self.lock:
+            self.entries[key] = {
+                "stream": stream,
+                "priority": max(priority, 0.01),
+                "next_due": 0.0,
+                "runs": 0,
+            }
+        self.start()
+
+    def unregister(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def set_priority(self, key, priority):
+        with self.lock:
+            if key in self.entries:
+                self.entries[key]["priority"] = max(priority, 0.01)
+
+    def start(self):
+        if self.running: return
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, name="inference-scheduler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def _pick(self, now):
+        with self.lock:
+            due = [e for e in self.entries.values() if now >= e["next_due"]]
+        due.sort(key=lambda e: (now - e["next_due"]) * e["priority"], reverse=True)
+        return due[:self.max_batch]
+
+    def _loop(self):
+        while self.running:
+            now = time.time()
+            batch = []
+            for entry in self._pick(now):
+                entry["next_due"] = now + self.interval / entry["priority"]
+                stream = entry["stream"]
+                frame = stream.frame
+                if frame is None:
+                    continue
+                frame = frame.copy()
+                roi_mask = stream.roi_mask
+                if stream.motion_gate and not stream.motion_gate.should_detect(frame, roi_mask, now):
+                    continue # Counted by the gate
+                batch.append((entry, frame, roi_mask, stream.camera_id))
+
+            if not batch:
+                time.sleep(self.tick)
+                continue
+
+            start = time.time()
+            try:
+                results = list(zip(batch, self.detect_batch([item[1:] for item in batch])))
+            except Exception as e:
+                print(f"Inference Scheduler Error: {e}")
+                results = self._detect_each(batch)
+
+            for (entry, *_), overlays in results:
+                entry["stream"].set_overlays(overlays)
+                entry["runs"] += 1
+
+            if not results:
+                time.sleep(self.tick)
+                continue
+            self.batches += 1
+            self.frames += len(results)
+            self.last_batch_size = len(results)
+            self.last_batch_latency = time.time() - start
+
+    def _detect_each(self, batch):
+        """After a failed batch: one call per camera, so a bad frame only skips its own camera."""
+        results = []
+        for item in batch:
+            try:
+                results.append((item, self.detect_batch([item[1:]])[0]))
+            except Exception as e:
+                self.failures += 1
+                print(f"Inference Scheduler Error ({item[3]}): {e}")
+        return results
+
+    def stats(self):
+        with self.lock:
+            cameras = {str(k): {"priority": e["priority"], "runs": e["runs"]}
+                       for k, e in self.entries.items()}
+        return {
+            "batches": self.batches,
+            "frames": self.frames,
+            "last_batch_size": self.last_batch_size,
+            "last_batch_latency_ms": round(self.last_batch_latency * 1000, 1),
+            "failures": self.failures,
+            "cameras": cameras,
+        }
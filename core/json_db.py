@@ -1,109 +1,445 @@
+import bisect
+import heapq
 import json
 import os
+import threading
 from datetime import datetime
+from .json_query import MISSING, compile_filter, sort_key
 
 class JsonDB:
     """Authentication and Database mock acting as a MongoDB Database object."""
-    def __init__(self, db_name="local_data"):
+    def __init__(self, db_name="local_data", folder="."):
         self.name = db_name
+        self.folder = folder # Where the collection files live
         self.is_json_db = True
         self.collections = {}
+        self.lock = threading.Lock()
 
     def __getitem__(self, collection_name):
-        if collection_name not in self.collections:
-            self.collections[collection_name] = JsonCollection(collection_name)
-        return self.collections[collection_name]
+        with self.lock:
+            if collection_name not in self.collections:
+                self.collections[collection_name] = JsonCollection(collection_name, self.folder)
+            return self.collections[collection_name]
+
+    def list_collection_names(self):
+        # Every collection that was ever opened has a write-ahead log file
+        names = {f[:-len(".wal")] for f in os.listdir(self.folder) if f.endswith(".wal")}
+        with self.lock:
+            return sorted(names | set(self.collections))
+
+    def drop_collection(self, collection_name):
+        with self.lock:
+            collection = self.collections.pop(collection_name, None)
+        if collection is None:
+            collection = JsonCollection(collection_name, self.folder)
+        collection.drop()
+
+def _result(**fields):
+    return type('obj', (object,), fields)
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
 
 class JsonCollection:
-    """Mock MongoDB Collection that persists to a specific JSON file."""
-    def __init__(self, name):
-        self.filename = f"{name}.json"
-        self.data = []
+    """
+    Mock MongoDB Collection persisted as a snapshot file plus an append-only write-ahead log.
+
+    `<name>.json` is a snapshot (a JSON array, same format as before) and `<name>.wal` holds
+    one JSON line per insert/update/delete since that snapshot, so a write appends one line
+    instead of rewriting the collection. When the log grows past the collection size (or past
+    COMPACT_MAX_OPS, which is what bounds insert-only collections) it is compacted: a new snapshot is written to a temp file and atomically renamed over the old
+    one, then the log is reset the same way. WAL records are idempotent (keyed by _id), so a
+    crash between the two renames just replays them onto the new snapshot. A torn last line
+    (crash mid-append) is dropped on load.
+
+    Documents live in a dict keyed by _id, with hash indexes on INDEXED_FIELDS that `find`
+    uses for equality filters, and sorted indexes on ORDERED_FIELDS so sorted top-N
+    queries walk the index instead of sorting the collection (see JsonCursor).
+    """
+    INDEXED_FIELDS = ('_id', 'serial_no', 'name', 'email', 'date')
+    ORDERED_FIELDS = ('timestamp', 'serial_no')
+    COMPACT_MIN_OPS = 1000
+    COMPACT_MAX_OPS = 50 * COMPACT_MIN_OPS # Insert-only logs never outgrow the docs; bound their replay time
+
+    def __init__(self, name, folder="."):
+        self.filename = os.path.join(folder, f"{name}.json")
+        self.wal_filename = os.path.join(folder, f"{name}.wal")
+        self.docs = {} # _id -> doc, in insertion order
+        self.indexes = {field: {} for field in self.INDEXED_FIELDS} # field -> value -> {_id: None}
+        self.ordered = {field: [] for field in self.ORDERED_FIELDS} # field -> sorted [(sort_key, seq, _id)]
+        self._seqs = {} # _id -> insertion sequence (tie-break in ordered indexes)
+        self._next_seq = 0
+        self.lock = threading.RLock()
+        self.wal_ops = 0
+        self._wal = None
         self._load()
 
+    @property
+    def data(self):
+        return list(self.docs.values())
+
+    # --- Persistence ---
+
     def _load(self):
         if os.path.exists(self.filename):
             try:
                 with open(self.filename, 'r') as f:
-                    self.data = json.load(f, object_hook=self._datetime_hook)
+                    for doc in json.load(f, object_hook=self._datetime_hook):
+                        if '_id' not in doc:
+                            doc['_id'] = self._new_id()
+                        self._put(doc)
             except:
-                self.data = []
+                self.docs = {}
+                self.indexes = {field: {} for field in self.INDEXED_FIELDS}
+                self.ordered = {field: [] for field in self.ORDERED_FIELDS}
+                self._seqs = {}
+
+        if os.path.exists(self.wal_filename):
+            valid_bytes = 0
+            with open(self.wal_filename, 'rb') as f:
+                for line in f:
+                    try:
+                        self._apply(json.loads(line, object_hook=self._datetime_hook))
+                    except ValueError:
+                        break # Torn tail from a crash mid-append
+                    valid_bytes += len(line)
+                    self.wal_ops += 1
+            if valid_bytes < os.path.getsize(self.wal_filename):
+                with open(self.wal_filename, 'r+b') as f:
+                    f.truncate(valid_bytes)
+
+        self._wal = open(self.wal_filename, 'a', encoding='utf-8')
+
+    def _log(self, *records):
+        self._wal.write("".join(json.dumps(r, default=_json_default) + "\n" for r in records))
+        self._wal.flush()
+        self.wal_ops += len(records)
+        if self.wal_ops >= self.COMPACT_MAX_OPS or (self.wal_ops >= self.COMPACT_MIN_OPS and self.wal_ops > len(self.docs)):
+            self.compact()
 
-    def _save(self):
-        with open(self.filename, 'w') as f:
-            json.dump(self.data, f, default=str, indent=2)
+    def _apply(self, record):
+        op = record.get('op')
+        if op == 'i':
+            self._put(record['doc'])
+        elif op == 'u':
+            doc = self.docs.get(record['_id'])
+            if doc is not None:
+                self._set(doc, record['set'])
+        elif op == 'd':
+            self._drop(record['_id'])
+
+    def compact(self):
+        """Writes a fresh snapshot and empties the log (both via atomic renames)."""
+        with self.lock:
+            tmp = self.filename + ".tmp"
+            with open(tmp, 'w') as f:
+                json.dump(self.data, f, default=_json_default)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.filename)
+
+            self._wal.close()
+            tmp = self.wal_filename + ".tmp"
+            open(tmp, 'w').close()
+            os.replace(tmp, self.wal_filename)
+            self._wal = open(self.wal_filename, 'a', encoding='utf-8')
+            self.wal_ops = 0
 
     def _datetime_hook(self, dct):
-        if 'created_at' in dct and isinstance(dct['created_at'], str):
-            try:
-                dct['created_at'] = datetime.fromisoformat(dct['created_at'])
-            except:
-                pass
+        for key in ('created_at', 'timestamp'):
+            if key in dct and isinstance(dct[key], str):
+                try:
+                    dct[key] = datetime.fromisoformat(dct[key])
+                except:
+                    pass
         return dct
 
-    def find(self, filter_dict=None):
-        return JsonCursor(self.data, filter_dict)
+    # --- In-memory documents + indexes ---
+
+    def _index_add(self, doc):
+        for field, index in self.indexes.items():
+            value = doc.get(field)
+            try:
+                index.setdefault(value, {})[doc['_id']] = None
+            except TypeError:
+                pass # Unhashable values can't match an equality lookup anyway
+        for field, index in self.ordered.items():
+            bisect.insort(index, self._ordered_entry(field, doc))
+
+    def _index_remove(self, doc):
+        for field, index in self.indexes.items():
+            try:
+                ids = index.get(doc.get(field))
+            except TypeError:
+                continue
+            if ids is not None:
+                ids.pop(doc['_id'], None)
+                if not ids:
+                    del index[doc.get(field)]
+        for field, index in self.ordered.items():
+            entry = self._ordered_entry(field, doc)
+            i = bisect.bisect_left(index, entry)
+            if i < len(index) and index[i] == entry:
+                del index[i]
+
+    def _ordered_entry(self, field, doc):
+        return (sort_key(doc.get(field, MISSING)), self._seqs[doc['_id']], doc['_id'])
 
-    def find_one(self, filter_dict=None, sort=None):
-        results = self.find(filter_dict).sort(sort)._results
-        return results[0] if results else None
+    def _put(self, doc):
+        old = self.docs.get(doc['_id'])
+        if old is not None:
+            self._index_remove(old)
+        self._next_seq += 1
+        self._seqs[doc['_id']] = self._next_seq
+        self.docs[doc['_id']] = doc
+        self._index_add(doc)
+
+    def _drop(self, doc_id):
+        doc = self.docs.pop(doc_id, None)
+        if doc is not None:
+            self._index_remove(doc)
+            del self._seqs[doc_id]
+        return doc
+
+    def _set(self, doc, fields):
+        self._index_remove(doc)
+        doc.update(fields)
+        self._index_add(doc)
+
+    def _candidates(self, filter_dict):
+        """
+        Docs that may match, narrowed through the most selective usable hash index,
+        or None when no equality filter on an indexed field exists.
+        """
+        best = None
+        for field, value in (filter_dict or {}).items():
+            if field not in self.indexes or isinstance(value, dict):
+                continue
+            try:
+                ids = self.indexes[field].get(value, {})
+            except TypeError:
+                continue
+            if best is None or len(ids) < len(best):
+                best = ids
+        if best is None:
+            return None
+        return [self.docs[i] for i in best]
+
+    def _ordered_docs(self, field, direction):
+        """Docs in sort order of `field` (caller holds the lock)."""
+        index = self.ordered[field]
+        entries = reversed(index) if direction == -1 else iter(index)
+        return (self.docs[doc_id] for _, _, doc_id in entries)
+
+    def _first(self, filter_dict):
+        match = compile_filter(filter_dict)
+        candidates = self._candidates(filter_dict)
+        for doc in (self.docs.values() if candidates is None else candidates):
+            if match(doc):
+                return doc
+        return None
+
+    # --- MongoDB-style API ---
+
+    def find(self, filter_dict=None, projection=None):
+        return JsonCursor(self, filter_dict, projection)
+
+    def find_one(self, filter_dict=None, projection=None, sort=None):
+        cursor = self.find(filter_dict, projection)
+        if sort:
+            cursor.sort(sort)
+        for doc in cursor.limit(1):
+            return doc
+        return None
+
+    def count_documents(self, filter_dict=None):
+        if not filter_dict:
+            return len(self.docs)
+        match = compile_filter(filter_dict)
+        with self.lock:
+            candidates = self._candidates(filter_dict)
+            return sum(1 for doc in (self.docs.values() if candidates is None else candidates) if match(doc))
+
+    def _new_id(self):
+        # Millisecond timestamp, bumped past the last one so batched inserts stay unique
+        self._last_id = max(int(datetime.now().timestamp() * 1000), getattr(self, '_last_id', 0) + 1)
+        return str(self._last_id)
 
     def insert_one(self, doc):
-        # Generate simple ID if not present
-        if '_id' not in doc:
-             doc['_id'] = str(int(datetime.now().timestamp() * 1000))
-        self.data.append(doc)
-        self._save()
-        return type('obj', (object,), {'inserted_id': doc['_id']})
+        with self.lock:
+            # Generate simple ID if not present
+            if '_id' not in doc:
+                 doc['_id'] = self._new_id()
+            self._put(doc)
+            self._log({'op': 'i', 'doc': doc})
+        return _result(inserted_id=doc['_id'])
+
+    def insert_many(self, docs):
+        with self.lock:
+            for doc in docs:
+                if '_id' not in doc:
+                    doc['_id'] = self._new_id()
+                self._put(doc)
+            # One append for the whole batch
+            self._log(*({'op': 'i', 'doc': doc} for doc in docs))
+        return _result(inserted_ids=[doc['_id'] for doc in docs])
 
     def delete_one(self, filter_dict):
-        target = self.find_one(filter_dict)
-        if target:
-            self.data.remove(target)
-            self._save()
-
-    def update_one(self, filter_dict, update_dict):
-        target = self.find_one(filter_dict)
-        if target and "$set" in update_dict:
-            for k, v in update_dict["$set"].items():
-                target[k] = v
-            self._save()
+        with self.lock:
+            target = self._first(filter_dict)
+            if target is None:
+                return _result(deleted_count=0)
+            self._drop(target['_id'])
+            self._log({'op': 'd', '_id': target['_id']})
+        return _result(deleted_count=1)
+
+    def delete_many(self, filter_dict):
+        match = compile_filter(filter_dict)
+        with self.lock:
+            candidates = self._candidates(filter_dict)
+            ids = [doc['_id'] for doc in (self.docs.values() if candidates is None else candidates) if match(doc)]
+            for doc_id in ids:
+                self._drop(doc_id)
+            if ids:
+                self._log(*({'op': 'd', '_id': doc_id} for doc_id in ids))
+        return _result(deleted_count=len(ids))
+
+    def update_one(self, filter_dict, update_dict, upsert=False):
+        """Supports $set and $inc. The WAL records resulting values, so replay stays idempotent."""
+        with self.lock:
+            target = self._first(filter_dict)
+            if target is None:
+                if not upsert:
+                    return _result(matched_count=0, modified_count=0, upserted_id=None)
+                doc = {k: v for k, v in (filter_dict or {}).items() if not k.startswith('$') and not isinstance(v, dict)}
+                doc.update(update_dict.get("$set", {}))
+                for k, v in update_dict.get("$inc", {}).items():
+                    doc[k] = doc.get(k, 0) + v
+                self.insert_one(doc)
+                return _result(matched_count=0, modified_count=0, upserted_id=doc['_id'])
+
+            fields = dict(update_dict.get("$set", {}))
+            for k, v in update_dict.get("$inc", {}).items():
+                fields[k] = target.get(k, 0) + v
+            if not fields:
+                return _result(matched_count=1, modified_count=0, upserted_id=None)
+            self._set(target, fields)
+            self._log({'op': 'u', '_id': target['_id'], 'set': fields})
+        return _result(matched_count=1, modified_count=1, upserted_id=None)
+
+    def find_one_and_update(self, filter_dict, update_dict, upsert=False, return_document=False):
+        """
+        update_one that returns a copy of the document, as it was before the update or,
+        with return_document=True (pymongo's ReturnDocument.AFTER), after it.
+        """
+        with self.lock:
+            target = self._first(filter_dict)
+            before = dict(target) if target is not None else None
+            result = self.update_one(filter_dict, update_dict, upsert=upsert)
+            if not return_document:
+                return before
+            doc_id = result.upserted_id if before is None else before['_id']
+            doc = self.docs.get(doc_id) if doc_id is not None else None
+            return dict(doc) if doc is not None else None
+
+    def drop(self):
+        """Deletes the collection and its files."""
+        with self.lock:
+            self._wal.close()
+            for path in (self.filename, self.wal_filename):
+                if os.path.exists(path):
+                    os.remove(path)
+            self.docs = {}
+            self.indexes = {field: {} for field in self.INDEXED_FIELDS}
+            self.ordered = {field: [] for field in self.ORDERED_FIELDS}
+            self._seqs = {}
 
 class JsonCursor:
-    def __init__(self, data, filter_dict):
-        self._results = []
-        if not filter_dict:
-            self._results = data.copy()
-        else:
-            for item in data:
-                match = True
-                for k, v in filter_dict.items():
-                    # Support simple equality
-                    if item.get(k) != v:
-                        match = False
-                        break
-                if match:
-                    self._results.append(item)
+    """
+    Lazy MongoDB-style cursor: the filter is compiled once and the query runs on first
+    iteration, with sort/skip/limit applied as a plan:
+      - an equality filter on a hash-indexed field narrows candidates first;
+      - otherwise a single-key sort on an ordered field walks that index and stops after
+        skip + limit matches (top-N without sorting the collection);
+      - otherwise a scan, using a heap for limited sorts.
+    Results are shallow (optionally projected) copies, so callers can edit them
+    without touching stored docs.
+    """
+    def __init__(self, collection, filter_dict=None, projection=None):
+        self._collection = collection
+        self._filter = filter_dict or {}
+        self._match = compile_filter(self._filter)
+        self._project = self._compile_projection(projection)
+        self._sort = []
+        self._skip = 0
+        self._limit = 0
+        self._results = None
 
     def sort(self, key_or_list, direction=1):
-        if not self._results:
-            return self
-            
-        key = key_or_list
-        reverse = False
-        
         # Handle simple tuple list format: [("key", -1)]
         if isinstance(key_or_list, list):
-            key, direction = key_or_list[0]
-        
-        if direction == -1:
-            reverse = True
-            
-        self._results.sort(key=lambda x: x.get(key, 0), reverse=reverse)
+            self._sort = [(k, d) for k, d in key_or_list]
+        elif key_or_list:
+            self._sort = [(key_or_list, direction)]
+        return self
+
+    def skip(self, n):
+        self._skip = max(0, int(n))
         return self
 
+    def limit(self, n):
+        self._limit = max(0, int(n))
+        return self
+
+    def _sorted(self, docs):
+        if self._limit and len(self._sort) == 1:
+            key, direction = self._sort[0]
+            pick = heapq.nlargest if direction == -1 else heapq.nsmallest
+            return pick(self._skip + self._limit, docs, key=lambda d: sort_key(d.get(key, MISSING)))[self._skip:]
+        docs = list(docs)
+        for key, direction in reversed(self._sort):
+            docs.sort(key=lambda d: sort_key(d.get(key, MISSING)), reverse=direction == -1)
+        end = self._skip + self._limit if self._limit else None
+        return docs[self._skip:end]
+
+    def _execute(self):
+        col = self._collection
+        with col.lock:
+            candidates = col._candidates(self._filter)
+            if candidates is None and len(self._sort) == 1 and self._sort[0][0] in col.ordered:
+                key, direction = self._sort[0]
+                wanted = self._skip + self._limit if self._limit else None
+                matched = []
+                for doc in col._ordered_docs(key, direction):
+                    if self._match(doc):
+                        matched.append(doc)
+                        if wanted is not None and len(matched) >= wanted:
+                            break
+                docs = matched[self._skip:]
+            else:
+                pool = col.docs.values() if candidates is None else candidates
+                docs = self._sorted(d for d in pool if self._match(d))
+            return [self._project(doc) for doc in docs]
+
+    @staticmethod
+    def _compile_projection(projection):
+        """MongoDB-style projection: {"field": 0} excludes fields, {"field": 1} keeps only those (+ _id)."""
+        if not projection:
+            return dict
+        include = {k for k, v in projection.items() if v}
+        exclude = {k for k, v in projection.items() if not v}
+        if include - {'_id'}:
+            if '_id' not in exclude:
+                include.add('_id')
+            return lambda doc: {k: doc[k] for k in include if k in doc}
+        return lambda doc: {k: v for k, v in doc.items() if k not in exclude}
+
     def __iter__(self):
+        if self._results is None:
+            self._results = self._execute()
         return iter(self._results)
 
     def __list__(self):
-        return self._results
+        return list(self)
@@ -0,0 +1,109 @@
+import re
+from datetime import datetime
+
+# Filter compiler for JsonDB: turns a MongoDB-style filter into one predicate, once per query.
+
+MISSING = object()
+
+def sort_key(value):
+    """Total order across types, following MongoDB: missing/None < numbers < strings < bools < dates."""
+    if value is MISSING or value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (3, value)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    if isinstance(value, datetime):
+        return (4, value)
+    return (5, str(value))
+
+def _equals(value, expected):
+    if isinstance(value, list) and not isinstance(expected, list):
+        return expected in value
+    if value is MISSING:
+        return expected is None
+    return value == expected
+
+def _compare(op):
+    def check(value, bound):
+        if value is MISSING or value is None:
+            return False
+        a, b = sort_key(value), sort_key(bound)
+        return a[0] == b[0] and op(a[1], b[1])
+    return check
+
+def _regex(pattern, options=""):
+    if isinstance(pattern, re.Pattern):
+        return pattern
+    flags = 0
+    for flag in options or "":
+        flags |= {'i': re.IGNORECASE, 'm': re.MULTILINE, 's': re.DOTALL, 'x': re.VERBOSE}.get(flag, 0)
+    return re.compile(pattern, flags)
+
+_COMPARISONS = {
+    '$gt': _compare(lambda a, b: a > b),
+    '$gte': _compare(lambda a, b: a >= b),
+    '$lt': _compare(lambda a, b: a < b),
+    '$lte': _compare(lambda a, b: a <= b),
+}
+
+def _compile_ops(ops):
+    """Predicate on one field value for an operator dict like {"$regex": ..., "$ne": ...}."""
+    checks = []
+    for op, arg in ops.items():
+        if op == '$eq':
+            checks.append(lambda v, a=arg: _equals(v, a))
+        elif op == '$ne':
+            checks.append(lambda v, a=arg: not _equals(v, a))
+        elif op in _COMPARISONS:
+            checks.append(lambda v, a=arg, c=_COMPARISONS[op]: c(v, a))
+        elif op == '$in':
+            checks.append(lambda v, a=list(arg): any(_equals(v, x) for x in a))
+        elif op == '$nin':
+            checks.append(lambda v, a=list(arg): not any(_equals(v, x) for x in a))
+        elif op == '$exists':
+            checks.append(lambda v, a=bool(arg): (v is not MISSING) == a)
+        elif op == '$regex':
+            rx = _regex(arg, ops.get('$options'))
+            checks.append(lambda v, rx=rx: isinstance(v, str) and rx.search(v) is not None)
+        elif op == '$options':
+            continue # Consumed by $regex
+        elif op == '$not':
+            inner = _compile_ops(arg) if isinstance(arg, dict) else _compile_ops({'$regex': arg})
+            checks.append(lambda v, inner=inner: not inner(v))
+        else:
+            raise ValueError(f"Unsupported query operator: {op}")
+    return lambda value: all(check(value) for check in checks)
+
+def _is_operator_dict(cond):
+    return isinstance(cond, dict) and cond and all(k.startswith('$') for k in cond)
+
+def compile_filter(filter_dict):
+    """Compiles a MongoDB-style filter into predicate(doc) -> bool."""
+    if not filter_dict:
+        return lambda doc: True
+
+    preds = []
+    for key, cond in filter_dict.items():
+        if key == '$or':
+            subs = [compile_filter(f) for f in cond]
+            preds.append(lambda doc, subs=subs: any(s(doc) for s in subs))
+        elif key == '$and':
+            subs = [compile_filter(f) for f in cond]
+            preds.append(lambda doc, subs=subs: all(s(doc) for s in subs))
+        elif key == '$nor':
+            subs = [compile_filter(f) for f in cond]
+            preds.append(lambda doc, subs=subs: not any(s(doc) for s in subs))
+        elif _is_operator_dict(cond):
+            check = _compile_ops(cond)
+            preds.append(lambda doc, k=key, check=check: check(doc.get(k, MISSING)))
+        elif isinstance(cond, re.Pattern):
+            preds.append(lambda doc, k=key, rx=cond: isinstance(doc.get(k), str) and rx.search(doc[k]) is not None)
+        else:
+            preds.append(lambda doc, k=key, c=cond: _equals(doc.get(k, MISSING), c))
+
+    if len(preds) == 1:
+        return preds[0]
+    return lambda doc: all(p(doc) for p in preds)
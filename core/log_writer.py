@@ -0,0 +1,121 @@
+import queue
+import threading
+import time
+import cv2
+from .stage_timer import stage_timer
+
+class LogWriter:
+    """
+    Background writer for detection events, so a slow disk or database never stalls
+    detection. `submit` only enqueues (never blocks); a worker thread drains the queue in
+    batches, writes the JPEG snapshots and inserts the rows with one `insert_many`.
+
+    Backpressure: the queue holds at most `max_queue` events. When it is full, new
+    events are dropped and counted. Once it is more than half full, `snapshots_allowed`
+    says no, so rows are still written but without an image and the backlog drains faster.
+
+    Outages: a batch whose insert raises one of `retry_on` (e.g. DatabaseUnavailable) is
+    held and retried every `retry_delay` seconds until it goes through; meanwhile the queue
+    fills up and, once full, further events are dropped and counted as above.
+    """
+    def __init__(self, get_collection, max_queue=1000, batch_size=50, flush_interval=0.5, jpeg_quality=85,
+                 retry_on=(), retry_delay=2.0):
+        self.get_collection = get_collection # Called per batch, so a swapped DB is picked up
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.jpeg_quality = jpeg_quality
+        self.retry_on = tuple(retry_on)
+        self.retry_delay = retry_delay
+
+        # Counters
+        self.written = 0
+        self.dropped = 0
+        self.snapshots_written = 0
+        self.snapshots_skipped = 0
+        self.failed = 0
+        self.held = 0 # Rows of a batch waiting out an outage
+        self.retries = 0
+        self.last_batch_latency = 0.0
+
+        self.thread = threading.Thread(target=self._loop, name="log-writer", daemon=True)
+        self.thread.start()
+
+    def snapshots_allowed(self):
+        """False while the backlog is over half the queue; callers then log without a snapshot."""
+        if self.queue.qsize() > self.queue.maxsize // 2:
+            self.snapshots_skipped += 1
+            return False
+        return True
+
+    def submit(self, entry, snapshot=None, snapshot_path=None):
+        """Queues one row (and optionally its snapshot image). Returns False if it was dropped."""
+        try:
+            self.queue.put_nowait((entry, snapshot, snapshot_path))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _loop(self):
+        while True:
+            try:
+                batch = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch):
+        start = time.time()
+        for entry, snapshot, path in batch:
+            if snapshot is None or not path:
+                continue
+            try:
+                cv2.imwrite(path, snapshot, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+                self.snapshots_written += 1
+            except Exception as e:
+                print(f"Failed to save snap: {e}")
+
+        docs = [entry for entry, _, _ in batch]
+        while True:
+            try:
+                with stage_timer.measure("db_write"):
+                    self.get_collection().insert_many(docs)
+                self.written += len(docs)
+            except self.retry_on as e:
+                if not self.held:
+                    print(f"DB Log: holding {len(docs)} rows until the database is back ({e})")
+                self.held = len(docs)
+                self.retries += 1
+                time.sleep(self.retry_delay)
+                continue
+            except Exception as e:
+                self.failed += len(docs)
+                print(f"DB Log Error: {e}")
+            break
+        self.held = 0
+        self.last_batch_latency = time.time() - start
+
+    def flush(self, timeout=5.0):
+        """Waits (up to `timeout`) for queued events to be written."""
+        deadline = time.time() + timeout
+        while not self.queue.empty() and time.time() < deadline:
+            time.sleep(0.05)
+
+    def stats(self):
+        return {
+            "queued": self.queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "held": self.held,
+            "retries": self.retries,
+            "snapshots_written": self.snapshots_written,
+            "snapshots_skipped": self.snapshots_skipped,
+            "last_batch_latency_ms": round(self.last_batch_latency * 1000, 1),
+        }
@@ -0,0 +1,109 @@
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from core.face_gallery import FaceGallery, compact_encodings
+
+def synthetic_gallery(people, samples, dim=128, spread=0.02, seed=0):
+    """
+    Builds clustered fake encodings that look like dlib's: ~unit norm, samples of the
+    same person ~0.3 apart (spread=0.02), different people ~1.4 apart.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(0, 0.09, size=(people, dim)).astype(np.float32)
+    encodings = np.repeat(centers, samples, axis=0)
+    encodings += rng.normal(0, spread, size=encodings.shape).astype(np.float32)
+    names = np.repeat(np.arange(people), samples)
+    return centers, encodings, names
+
+def timed_match(gallery, queries, batch, tolerance):
+    latencies = []
+    results = []
+    for i in range(0, len(queries), batch):
+        start = time.perf_counter()
+        results.extend(gallery.match(queries[i:i + batch], tolerance=tolerance))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return results, np.array(latencies)
+
+class Command(BaseCommand):
+    help = ("Benchmarks face gallery search backends (recall and latency of 'ivf' against 'exact'), "
+            "and optionally the accuracy/latency trade-off of per-person prototype compaction.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--people', type=int, default=10000)
+        parser.add_argument('--samples', type=int, default=3, help="Encodings per person")
+        parser.add_argument('--queries', type=int, default=500)
+        parser.add_argument('--batch', type=int, default=4, help="Faces matched per call (faces per frame)")
+        parser.add_argument('--nlist', type=int, default=64)
+        parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 4, 8, 16])
+        parser.add_argument('--tolerance', type=float, default=0.55)
+        parser.add_argument('--spread', type=float, default=0.02, help="Per-sample noise around each person")
+        parser.add_argument('--prototypes', type=int, nargs='*', default=[],
+                            help="Prototype caps to compare (0 = keep every sample), e.g. --prototypes 0 1 3 5")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **opts):
+        centers, encodings, names = synthetic_gallery(opts['people'], opts['samples'], spread=opts['spread'], seed=opts['seed'])
+        rng = np.random.default_rng(opts['seed'] + 1)
+        picks = rng.integers(0, opts['people'], size=opts['queries'])
+        queries = centers[picks] + rng.normal(0, opts['spread'], size=(len(picks), centers.shape[1])).astype(np.float32)
+
+        if opts['prototypes']:
+            self.report_prototypes(encodings, names, queries, picks, opts)
+            return
+
+        self.stdout.write(f"Gallery: {len(encodings)} encodings ({opts['people']} people x {opts['samples']}), "
+                          f"{len(queries)} queries, batch {opts['batch']}")
+
+        exact = FaceGallery(capacity=len(encodings))
+        start = time.perf_counter()
+        for enc, n in zip(encodings, names):
+            exact.add(enc, int(n), "bench")
+        exact_build = time.perf_counter() - start
+        exact_results, exact_lat = timed_match(exact, queries, opts['batch'], opts['tolerance'])
+        truth = [r[0] for r in exact_results]
+        exact_acc = np.mean([t == p for t, p in zip(truth, picks)])
+
+        self.stdout.write(f"{'backend':<18}{'build s':>9}{'mean ms':>10}{'p95 ms':>9}{'recall':>9}{'accuracy':>10}")
+        self.stdout.write(f"{'exact':<18}{exact_build:>9.2f}{exact_lat.mean():>10.3f}"
+                          f"{np.percentile(exact_lat, 95):>9.3f}{1.0:>9.3f}{exact_acc:>10.3f}")
+
+        for nprobe in opts['nprobe']:
+            ivf = FaceGallery(capacity=len(encodings), search="ivf", nlist=opts['nlist'], nprobe=nprobe)
+            start = time.perf_counter()
+            for enc, n in zip(encodings, names):
+                ivf.add(enc, int(n), "bench")
+            build = time.perf_counter() - start
+            results, lat = timed_match(ivf, queries, opts['batch'], opts['tolerance'])
+            recall = np.mean([r[0] == t for r, t in zip(results, truth)])
+            acc = np.mean([r[0] == p for r, p in zip(results, picks)])
+            label = f"ivf nprobe={nprobe}"
+            self.stdout.write(f"{label:<18}{build:>9.2f}{lat.mean():>10.3f}"
+                              f"{np.percentile(lat, 95):>9.3f}{recall:>9.3f}{acc:>10.3f}")
+
+    def report_prototypes(self, encodings, names, queries, picks, opts):
+        self.stdout.write(f"Prototype compaction: {opts['people']} people x {opts['samples']} samples, "
+                          f"{len(queries)} queries, tolerance {opts['tolerance']}")
+        self.stdout.write(f"{'cap':<6}{'rows':>9}{'MB':>8}{'compact s':>11}{'mean ms':>10}{'p95 ms':>9}"
+                          f"{'accuracy':>10}{'rejected':>10}")
+
+        per_person = {}
+        for enc, n in zip(encodings, names):
+            per_person.setdefault(int(n), []).append(enc)
+
+        for cap in opts['prototypes']:
+            start = time.perf_counter()
+            compacted = {n: compact_encodings(encs, cap) for n, encs in per_person.items()}
+            compact_time = time.perf_counter() - start
+
+            rows = sum(len(v) for v in compacted.values())
+            gallery = FaceGallery(capacity=rows)
+            for n, encs in compacted.items():
+                gallery.add_many(encs, n, "bench")
+
+            results, lat = timed_match(gallery, queries, opts['batch'], opts['tolerance'])
+            acc = np.mean([r[0] == p for r, p in zip(results, picks)])
+            rejected = np.mean([r[0] is None for r in results])
+            label = str(cap) if cap else "all"
+            self.stdout.write(f"{label:<6}{rows:>9}{rows * 128 * 4 / 1e6:>8.2f}{compact_time:>11.2f}{lat.mean():>10.3f}"
+                              f"{np.percentile(lat, 95):>9.3f}{acc:>10.3f}{rejected:>10.3f}")
@@ -0,0 +1,236 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from core.camera_manager import CameraManager, CameraStream
+from core.inference_scheduler import InferenceScheduler
+from core.json_db import JsonDB
+from core.stage_timer import stage_timer
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Reported in this order; "detect" is a whole detection call, the rest are its parts
+STAGES = ["decode", "resize", "face_locate", "face_encode", "match", "yolo", "detect", "draw", "jpeg_encode", "log_event", "db_write"]
+
+class StageRecorder:
+    """Stage observer that keeps every sample (seconds) per stage and per camera."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.per_camera = {}
+
+    def __call__(self, stage, camera, seconds):
+        with self.lock:
+            self.samples.setdefault(stage, []).append(seconds)
+            if camera is not None:
+                self.per_camera.setdefault(str(camera), {}).setdefault(stage, 0)
+                self.per_camera[str(camera)][stage] += 1
+
+    def reset(self):
+        with self.lock:
+            self.samples = {}
+            self.per_camera = {}
+
+class ProcessSampler:
+    """Process CPU time and resident memory (psutil when installed, else os.times and /proc)."""
+    def __init__(self):
+        self.process = psutil.Process() if psutil else None
+        self.peak_rss = 0
+
+    def cpu_seconds(self):
+        if self.process:
+            t = self.process.cpu_times()
+            return t.user + t.system
+        t = os.times()
+        return t.user + t.system
+
+    def rss_mb(self):
+        rss = None
+        if self.process:
+            rss = self.process.memory_info().rss
+        elif os.path.exists("/proc/self/statm"):
+            with open("/proc/self/statm") as f:
+                rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        if rss is None:
+            return None
+        self.peak_rss = max(self.peak_rss, rss)
+        return rss / 1e6
+
+def summarize(samples):
+    ms = np.array(samples) * 1000
+    return {
+        "count": len(ms),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p90_ms": round(float(np.percentile(ms, 90)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+def viewer(stream, stop):
+    """Pulls every frame as JPEG, like one video_feed client."""
+    seq = 0
+    while not stop.is_set():
+        seq, _ = stream.broadcaster.wait_jpeg(seq, timeout=0.5)
+
+class Command(BaseCommand):
+    help = ("Benchmarks the whole capture -> detection -> drawing -> JPEG pipeline on N simulated cameras "
+            "fed from a video file, an image folder or synthetic frames. Reports per-stage latency "
+            "percentiles, FPS, CPU and RSS, optionally as JSON and against a baseline run.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cameras', type=int, default=2)
+        parser.add_argument('--source', default="synthetic",
+                            help="Video file, image folder or synthetic[:WxH@FPS] (one copy per camera)")
+        parser.add_argument('--fps', type=float, default=15, help="Capture FPS per camera (0 = unpaced)")
+        parser.add_argument('--width', type=int, default=640)
+        parser.add_argument('--height', type=int, default=480)
+        parser.add_argument('--duration', type=float, default=30, help="Measured seconds")
+        parser.add_argument('--warmup', type=float, default=5, help="Seconds run before measuring (model warm-up)")
+        parser.add_argument('--viewers', type=int, default=1, help="JPEG viewers per camera")
+        parser.add_argument('--scheduler', action='store_true', help="Batch detection through the InferenceScheduler")
+        parser.add_argument('--interval', type=float, default=0.08, help="Scheduler interval per camera (s)")
+        parser.add_argument('--max-batch', type=int, default=8)
+        parser.add_argument('--no-motion-gate', action='store_true', help="Detect on every cycle")
+        parser.add_argument('--json', help="Write results to this file ('-' for stdout)")
+        parser.add_argument('--baseline', help="Earlier --json result to compare against")
+        parser.add_argument('--max-regression', type=float, default=0.15,
+                            help="Fail if a stage p50/p90 grows, or FPS drops, by more than this fraction of the baseline")
+
+    def handle(self, *args, **opts):
+        workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+        try:
+            self.benchmark(workdir, opts)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def benchmark(self, workdir, opts):
+        # Isolated: auto-registered faces, events and the encoding cache stay in the temp dir
+        db = JsonDB("bench", folder=workdir)
+        manager = CameraManager({'UPLOAD_FOLDER': workdir}, db, encodings_dir=os.path.join(workdir, "encodings_cache"))
+
+        recorder = StageRecorder()
+        stage_timer.add_observer(recorder)
+        sampler = ProcessSampler()
+        stop = threading.Event()
+        streams = []
+        scheduler = None
+        try:
+            if opts['scheduler']:
+                scheduler = InferenceScheduler(manager.detect_batch, interval=opts['interval'], max_batch=opts['max_batch'])
+            for i in range(opts['cameras']):
+                stream = CameraStream(opts['source'], f"bench-{i}", fps=opts['fps'], width=opts['width'], height=opts['height'], camera_id=i)
+                if not stream.grabbed:
+                    raise CommandError(f"Cannot read frames from {opts['source']}")
+                if opts['no_motion_gate']:
+                    stream.motion_gate = None
+                stream.set_pipeline(detector=manager.detect_task, drawer=manager.draw_task)
+                stream.start(run_detector=scheduler is None)
+                if scheduler:
+                    scheduler.register(stream.camera_id, stream)
+                for _ in range(opts['viewers']):
+                    threading.Thread(target=viewer, args=(stream, stop), daemon=True).start()
+                streams.append(stream)
+            if scheduler:
+                scheduler.start()
+
+            self.stdout.write(f"Warming up {opts['warmup']:.0f}s ({opts['cameras']} cameras, {opts['source']})...")
+            time.sleep(opts['warmup'])
+            recorder.reset()
+            seqs = [s.broadcaster.seq for s in streams]
+            rss_start = sampler.rss_mb()
+            sampler.peak_rss = 0
+            cpu_start = sampler.cpu_seconds()
+            start = time.time()
+            while time.time() - start < opts['duration']:
+                time.sleep(0.5)
+                sampler.rss_mb()
+            elapsed = time.time() - start
+            cpu = sampler.cpu_seconds() - cpu_start
+            outputs = sum(s.broadcaster.seq - seq for s, seq in zip(streams, seqs))
+        finally:
+            stop.set()
+            if scheduler:
+                scheduler.stop()
+            for stream in streams:
+                stream.stop()
+            stage_timer.remove_observer(recorder)
+            manager.log_writer.flush()
+            manager.person_writer.flush()
+
+        with recorder.lock:
+            samples = dict(recorder.samples)
+            per_camera = dict(recorder.per_camera)
+        detections = sum(counts.get("face_locate", 0) for counts in per_camera.values())
+        result = {
+            "config": {k: opts[k] for k in ('cameras', 'source', 'fps', 'width', 'height', 'duration',
+                                            'viewers', 'scheduler', 'interval', 'max_batch', 'no_motion_gate')},
+            "cpu_count": os.cpu_count(),
+            "elapsed_s": round(elapsed, 2),
+            "stages": {stage: summarize(samples[stage]) for stage in STAGES if samples.get(stage)},
+            "fps": {
+                "capture": round(len(samples.get("decode", [])) / elapsed, 2),
+                "detection": round(detections / elapsed, 2),
+                "output": round(outputs / elapsed, 2),
+                "capture_per_camera": round(len(samples.get("decode", [])) / elapsed / len(streams), 2),
+                "detection_per_camera": round(detections / elapsed / len(streams), 2),
+            },
+            "cpu_percent": round(100 * cpu / elapsed, 1),
+            "rss_mb": {
+                "start": round(rss_start, 1) if rss_start else None,
+                "peak": round(sampler.peak_rss / 1e6, 1) if sampler.peak_rss else None,
+            },
+            "per_camera": per_camera,
+        }
+        if scheduler:
+            result["scheduler"] = scheduler.stats()
+
+        self.report(result)
+        if opts['json'] == '-':
+            self.stdout.write(json.dumps(result, indent=2))
+        elif opts['json']:
+            with open(opts['json'], 'w') as f:
+                json.dump(result, f, indent=2)
+            self.stdout.write(f"Results written to {opts['json']}")
+        if opts['baseline']:
+            self.compare(result, opts['baseline'], opts['max_regression'])
+
+    def report(self, result):
+        self.stdout.write(f"{'stage':<14}{'count':>8}{'mean ms':>10}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+        for stage, s in result["stages"].items():
+            self.stdout.write(f"{stage:<14}{s['count']:>8}{s['mean_ms']:>10.2f}{s['p50_ms']:>9.2f}"
+                              f"{s['p90_ms']:>9.2f}{s['p99_ms']:>9.2f}{s['max_ms']:>9.2f}")
+        fps = result["fps"]
+        self.stdout.write(f"FPS: capture {fps['capture']:.1f} ({fps['capture_per_camera']:.1f}/camera), "
+                          f"detection {fps['detection']:.1f} ({fps['detection_per_camera']:.1f}/camera), "
+                          f"output {fps['output']:.1f}")
+        self.stdout.write(f"CPU: {result['cpu_percent']:.0f}% of one core ({result['cpu_count']} cores), "
+                          f"RSS: {result['rss_mb']['start']} MB at start, {result['rss_mb']['peak']} MB peak")
+
+    def compare(self, result, baseline_path, max_regression):
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        regressions = []
+        for stage, base in baseline.get("stages", {}).items():
+            current = result["stages"].get(stage)
+            if not current:
+                continue
+            for key in ("p50_ms", "p90_ms"):
+                if base[key] > 0 and current[key] > base[key] * (1 + max_regression):
+                    regressions.append(f"{stage} {key}: {base[key]:.2f} -> {current[key]:.2f}")
+        for key in ("capture", "detection", "output"):
+            base = baseline.get("fps", {}).get(key, 0)
+            if base > 0 and result["fps"][key] < base * (1 - max_regression):
+                regressions.append(f"fps {key}: {base:.1f} -> {result['fps'][key]:.1f}")
+
+        if regressions:
+            raise CommandError("Regressions against baseline:\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS(f"No regressions beyond {max_regression:.0%} against {baseline_path}"))
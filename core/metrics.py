@@ -0,0 +1,169 @@
+import bisect
+import threading
+
+# Latency buckets (s): 1 ms .. 10 s, covers JPEG encodes up to a slow YOLO batch
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _label_text(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}"
+
+def _number(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()
+        self.values = {} # label values tuple -> value
+
+    def _key(self, labels):
+        return tuple(str(v) for v in labels) if labels else ()
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self):
+        lines = self.header()
+        with self.lock:
+            items = sorted(self.values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_label_text(self.labels, key)} {_number(value)}")
+        return lines
+
+class Counter(_Metric):
+    """Monotonic count, e.g. frames grabbed per camera."""
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def set(self, *labels, value):
+        """For collectors copying a running total that is kept elsewhere."""
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+class Gauge(_Metric):
+    """Point-in-time value, e.g. connected viewers."""
+    kind = "gauge"
+
+    def set(self, *labels, value):
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+    def inc(self, *labels, amount=1):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+class Histogram(_Metric):
+    """Latency distribution in fixed buckets (cumulative only when rendered)."""
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, *labels, value):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0] # bucket counts, sum, count
+            state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        lines = self.header()
+        with self.lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self.values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, key, [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {count}")
+        return lines
+
+class MetricsRegistry:
+    """
+    Counters, gauges and histograms rendered in the Prometheus text format (0.0.4).
+
+    Hot paths only touch pre-created metrics (one dict update under a lock). Values that
+    already live elsewhere (queue depths, motion gate counters) are not mirrored on every
+    change; collectors registered with `add_collector` copy them into gauges/counters
+    when /metrics is scraped.
+    """
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = []
+        self.lock = threading.Lock()
+
+    def _get(self, cls, name, help, labels, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help, labels, **kwargs)
+            return metric
+
+    def counter(self, name, help, labels=()):
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name, help, labels=()):
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def add_collector(self, collector):
+        """`collector()` runs before every render to refresh pulled values."""
+        self.collectors.append(collector)
+
+    def render(self):
+        for collector in list(self.collectors):
+            try:
+                collector()
+            except Exception as e:
+                print(f"Metrics Collector Error: {e}")
+        with self.lock:
+            metrics = sorted(self.metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+# --- Pipeline metrics (pushed from the hot paths) ---
+
+STAGE_SECONDS = metrics.histogram(
+    "smartvision_stage_seconds", "Pipeline stage latency (camera=\"all\" for batched stages)", ("stage", "camera"))
+FRAMES_GRABBED = metrics.counter("smartvision_frames_grabbed_total", "Frames read from the source", ("camera",))
+FRAME_READ_FAILURES = metrics.counter("smartvision_frame_read_failures_total", "Failed frame reads (each starts a reconnect wait)", ("camera",))
+RECONNECTS = metrics.counter("smartvision_reconnects_total", "Source reopen attempts", ("camera",))
+STREAM_FRAMES_SENT = metrics.counter("smartvision_stream_frames_sent_total", "MJPEG frames sent to viewers", ("camera",))
+STREAM_FRAMES_SKIPPED = metrics.counter("smartvision_stream_frames_skipped_total", "Frames a viewer did not get (slow client or the profile's FPS cap)", ("camera",))
+STREAM_VIEWERS = metrics.gauge("smartvision_stream_viewers", "Connected MJPEG viewers", ("camera",))
+
+def observe_stage(stage, camera, seconds):
+    """StageTimer observer feeding STAGE_SECONDS."""
+    STAGE_SECONDS.observe(stage, "all" if camera is None else camera, value=seconds)
@@ -0,0 +1,20 @@
+from django.http import JsonResponse
+from .db_provider import DatabaseUnavailable
+
+class DatabaseUnavailableMiddleware:
+    """
+    Answers 503 (instead of a 500 traceback) for any view that hit a MongoDB outage, so
+    clients can tell "database down, retry later" from a bug. See DatabaseProvider.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, DatabaseUnavailable):
+            response = JsonResponse({"success": False, "error": "Database unavailable, retry shortly", "database": "unavailable"}, status=503)
+            response["Retry-After"] = "5"
+            return response
+        return None
@@ -0,0 +1,78 @@
+import time
+import cv2
+import numpy as np
+
+class MotionGate:
+    """
+    Cheap change detector in front of the heavy detector.
+    Compares a downscaled, blurred grayscale copy of each frame with the previous one
+    (inside the ROI mask only) and lets detection run when enough pixels changed.
+    After activity detection keeps running for `hold` seconds (people standing still),
+    and a heartbeat detection runs every `idle_interval` seconds on a static scene.
+    """
+    def __init__(self, threshold=0.01, pixel_delta=25, width=160, hold=2.0, idle_interval=5.0):
+        self.threshold = threshold # Fraction of (ROI) pixels that must change
+        self.pixel_delta = pixel_delta
+        self.width = width
+        self.hold = hold
+        self.idle_interval = idle_interval
+
+        self._prev = None
+        self._mask = None
+        self._mask_src = None
+        self.last_motion = 0.0
+        self.last_detect = 0.0
+
+        # Counters
+        self.frames_checked = 0
+        self.detections_run = 0
+        self.detections_skipped = 0
+        self.last_change_ratio = 0.0
+
+    def _small_mask(self, roi_mask, size):
+        if roi_mask is None:
+            return None
+        if self._mask_src is not roi_mask or self._mask.shape[::-1] != size:
+            self._mask = cv2.resize(roi_mask, size, interpolation=cv2.INTER_NEAREST) > 0
+            self._mask_src = roi_mask
+        return self._mask
+
+    def should_detect(self, frame, roi_mask=None, now=None):
+        now = time.time() if now is None else now
+        h, w = frame.shape[:2]
+        size = (self.width, max(1, round(h * self.width / w)))
+        gray = cv2.cvtColor(cv2.resize(frame, size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        gray = cv2.GaussianBlur(gray, (5, 5), 0)
+
+        prev, self._prev = self._prev, gray
+        if prev is None or prev.shape != gray.shape:
+            ratio = 1.0
+        else:
+            changed = cv2.absdiff(gray, prev) > self.pixel_delta
+            mask = self._small_mask(roi_mask, size)
+            if mask is not None:
+                area = int(np.count_nonzero(mask))
+                ratio = np.count_nonzero(changed & mask) / area if area else 0.0
+            else:
+                ratio = np.count_nonzero(changed) / changed.size
+
+        self.frames_checked += 1
+        self.last_change_ratio = float(ratio)
+        if ratio >= self.threshold:
+            self.last_motion = now
+
+        run = (now - self.last_motion) < self.hold or (now - self.last_detect) >= self.idle_interval
+        if run:
+            self.last_detect = now
+            self.detections_run += 1
+        else:
+            self.detections_skipped += 1
+        return run
+
+    def stats(self):
+        return {
+            "frames_checked": self.frames_checked,
+            "detections_run": self.detections_run,
+            "detections_skipped": self.detections_skipped,
+            "change_ratio": round(self.last_change_ratio, 4),
+        }
@@ -0,0 +1,157 @@
+import math
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+# Leaf functions that mean "blocked, not using CPU" when per-thread CPU clocks are unavailable
+IDLE_LEAVES = {
+    ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"), ("threading.py", "join"),
+    ("queue.py", "get"), ("selectors.py", "select"), ("socket.py", "accept"), ("socket.py", "readinto"),
+    ("socketserver.py", "serve_forever"), ("ssl.py", "read"),
+}
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+def _thread_label(name):
+    """"Thread-12 (process_request_thread)" -> "process_request_thread", so request threads aggregate."""
+    match = re.match(r"^Thread-\d+ \((.*)\)$", name)
+    if match:
+        return match.group(1)
+    return re.sub(r"^Thread-\d+$", "thread", name)
+
+def _clamp(value, low, high, default):
+    """`value` limited to [low, high]; NaN/inf (which would never end the sampling loop) -> `default`."""
+    if not math.isfinite(value):
+        return default
+    return min(max(value, low), high)
+
+def _cpu_clock(ident):
+    """Per-thread CPU clock id (Linux/BSD), or None."""
+    try:
+        return time.pthread_getcpuclockid(ident)
+    except (AttributeError, OSError, OverflowError):
+        return None
+
+class SamplingProfiler:
+    """
+    Statistical profiler for the live process: every `interval` seconds it snapshots all
+    thread stacks with sys._current_frames() and counts identical stacks, prefixed with
+    the thread's name (camera threads are named "camera:<name>:grab" / ":detect").
+    Output is the collapsed-stack format flamegraph.pl and speedscope read.
+
+    Nothing is installed in the profiled threads; the cost is one stack walk per thread
+    per sample, paid by the profiling thread. By default only threads that used CPU since
+    the previous sample are counted (per-thread CPU clocks where the OS has them, else a
+    list of known blocking calls), so idle viewers and waiting queues don't drown the
+    hot paths. Only one profile runs at a time.
+    """
+    def __init__(self, max_duration=30.0, min_interval=0.002, max_depth=64):
+        self.max_duration = max_duration
+        self.min_interval = min_interval
+        self.max_depth = max_depth
+        self.lock = threading.Lock()
+        self.last_run = None
+
+    def _frame_label(self, code, cache):
+        label = cache.get(code)
+        if label is None:
+            label = cache[code] = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+        return label
+
+    def _stack(self, frame, cache):
+        labels = []
+        while frame is not None and len(labels) < self.max_depth:
+            labels.append(self._frame_label(frame.f_code, cache))
+            frame = frame.f_back
+        labels.reverse()
+        return labels
+
+    def run(self, duration=5.0, interval=0.01, threads=None, include_idle=False):
+        """
+        Samples for `duration` seconds (clamped to `max_duration`, `interval` to at most
+        `duration`) and returns (collapsed_lines, summary). `threads` keeps only thread names starting with it.
+        Raises ProfilerBusy if a profile is already running.
+        """
+        if not self.lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        duration = _clamp(duration, 0.1, self.max_duration, min(5.0, self.max_duration))
+        interval = _clamp(interval, self.min_interval, duration, max(0.01, self.min_interval))
+        try:
+            return self._run(duration, interval, threads, include_idle)
+        finally:
+            self.lock.release()
+
+    def _run(self, duration, interval, threads, include_idle):
+        me = threading.get_ident()
+        stacks = Counter()
+        per_thread = Counter()
+        labels = {}
+        cpu_seen = {}
+        names = {}
+        samples = 0
+        cpu_mode = _cpu_clock(me) is not None
+        start = time.perf_counter()
+        next_sample = start
+        next_names = start
+
+        while True:
+            now = time.perf_counter()
+            if now - start >= duration:
+                break
+            if now >= next_names:
+                # Thread list refreshed twice a second, not on every sample
+                names = {t.ident: _thread_label(t.name) for t in threading.enumerate()}
+                next_names = now + 0.5
+
+            frames = sys._current_frames()
+            samples += 1
+            for ident, frame in frames.items():
+                if ident == me:
+                    continue
+                name = names.get(ident, "thread")
+                if threads and not name.startswith(threads):
+                    continue
+                if not include_idle:
+                    if cpu_mode:
+                        clock = cpu_seen.get(ident)
+                        if clock is None:
+                            clock = cpu_seen[ident] = [_cpu_clock(ident), 0.0]
+                        try:
+                            used = time.clock_gettime(clock[0]) if clock[0] is not None else None
+                        except OSError:
+                            used = None # Thread exited
+                        if used is not None:
+                            busy = used > clock[1]
+                            first = clock[1] == 0.0
+                            clock[1] = used
+                            if first or not busy:
+                                continue
+                    elif (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_LEAVES:
+                        continue
+                stack = self._stack(frame, labels)
+                stacks[";".join([name] + stack)] += 1
+                per_thread[name] += 1
+            del frames
+
+            next_sample += interval
+            delay = next_sample - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_sample = time.perf_counter() # Fell behind (heavy load): don't burst to catch up
+
+        elapsed = time.perf_counter() - start
+        summary = {
+            "duration": round(elapsed, 2),
+            "interval": interval,
+            "samples": samples,
+            "mode": "all" if include_idle else ("cpu" if cpu_mode else "heuristic"),
+            "threads": dict(per_thread.most_common()),
+        }
+        self.last_run = summary
+        lines = [f"{stack} {count}" for stack, count in stacks.most_common()]
+        return lines, summary
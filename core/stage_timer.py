@@ -0,0 +1,42 @@
+import time
+from contextlib import contextmanager
+
+class StageTimer:
+    """
+    Timing hook for the capture/detection/output pipeline.
+
+    Pipeline code wraps each stage in `measure(stage, camera)`; every observer is called
+    with (stage, camera, seconds) when the stage ends. With no observers registered
+    `measure` does not even read the clock. Observers run on the pipeline threads, so
+    they must be cheap and thread-safe. `camera` is None for stages that run on a whole
+    batch of frames (resize, YOLO).
+    """
+    def __init__(self):
+        self.observers = [] # Replaced, never mutated: readers iterate without a lock
+
+    def add_observer(self, observer):
+        self.observers = self.observers + [observer]
+
+    def remove_observer(self, observer):
+        self.observers = [o for o in self.observers if o is not observer]
+
+    def record(self, stage, camera, seconds):
+        for observer in self.observers:
+            try:
+                observer(stage, camera, seconds)
+            except Exception as e:
+                print(f"Stage Observer Error: {e}")
+
+    @contextmanager
+    def measure(self, stage, camera=None):
+        if not self.observers:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, camera, time.perf_counter() - start)
+
+# Shared by CameraStream, CameraManager and FrameBroadcaster
+stage_timer = StageTimer()
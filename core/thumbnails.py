@@ -0,0 +1,75 @@
+import hashlib
+import os
+import threading
+import cv2
+import numpy as np
+
+class ThumbnailCache:
+    """
+    Person photo thumbnails, generated once and kept on disk (`<folder>/<serial>_<version>.jpg`).
+    The version is derived from the photo path and the photo file's mtime, so a replaced
+    photo gets a new URL and thumbnails can be served as immutable with a long max-age.
+    Old versions of a person's thumbnail are removed when a new one is written.
+    """
+    def __init__(self, folder, upload_folder, size=256, quality=80):
+        self.folder = folder
+        self.upload_folder = upload_folder
+        self.size = size
+        self.quality = quality
+        self.lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    def version(self, photo):
+        """Short content version for a person's `photo` field (None if there is no photo)."""
+        if not photo or photo == "default.jpg":
+            return None
+        try:
+            mtime = os.path.getmtime(os.path.join(self.upload_folder, photo))
+        except OSError:
+            mtime = 0
+        return hashlib.sha1(f"{photo}|{mtime}|{self.size}".encode()).hexdigest()[:12]
+
+    def get(self, serial_no, photo, load_photo_bin=None):
+        """
+        Returns (version, jpeg_bytes) for a person, generating and storing the thumbnail on
+        first use. `load_photo_bin` is called only if the photo file is missing on disk.
+        Returns (None, None) when the person has no usable photo.
+        """
+        version = self.version(photo)
+        if version is None:
+            return None, None
+        path = os.path.join(self.folder, f"{serial_no}_{version}.jpg")
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                return version, f.read()
+
+        img = cv2.imread(os.path.join(self.upload_folder, photo))
+        if img is None and load_photo_bin is not None:
+            photo_bin = load_photo_bin()
+            # On json_db binary fields come back as their str() repr, not bytes
+            if photo_bin and isinstance(photo_bin, (bytes, bytearray, memoryview)):
+                img = cv2.imdecode(np.frombuffer(photo_bin, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            return None, None
+
+        h, w = img.shape[:2]
+        scale = self.size / float(max(h, w))
+        if scale < 1:
+            img = cv2.resize(img, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+        ret, buffer = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ret:
+            return None, None
+        data = buffer.tobytes()
+
+        with self.lock:
+            # Drop older versions, then write atomically so readers never see a partial file
+            prefix = f"{serial_no}_"
+            for name in os.listdir(self.folder):
+                if name.startswith(prefix) and name.endswith(".jpg"):
+                    try: os.remove(os.path.join(self.folder, name))
+                    except OSError: pass
+            tmp = path + ".tmp"
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        return version, data
@@ -14,16 +14,22 @@ urlpatterns = [
     # Camera / API
     path('video_feed/<int:device_id>/', views.video_feed, name='video_feed'),
     path('cameras/', views.get_cameras, name='get_cameras'),
+    path('api/cameras/rescan/', views.rescan_cameras, name='rescan_cameras'),
     path('api/added_cameras/', views.get_added_cameras, name='get_added_cameras'),
     path('add_camera/', views.add_camera, name='add_camera'),
     path('set_main/<int:device_id>/', views.set_main, name='set_main'),
     path('api/set_roi/', views.set_roi, name='set_roi'),
     path('api/stats/', views.get_stats, name='get_stats'),
+    path('api/stats/trend/', views.get_stats_trend, name='get_stats_trend'),
     path('api/emergency_status/', views.get_emergency_status, name='get_emergency_status'),
+    path('api/events/', views.event_stream, name='event_stream'),
+    path('metrics/', views.metrics_view, name='metrics'),
+    path('api/admin/profile/', views.profile_view, name='profile'),
     path('api/simulate_threat/', views.simulate_threat, name='simulate_threat'),
     
     # New React APIs
     path('api/persons/', views.get_persons_api, name='get_persons_api'),
+    path('api/persons/<int:serial_no>/thumbnail/', views.person_thumbnail, name='person_thumbnail'),
     path('api/contacts/', views.get_contacts_api, name='get_contacts_api'),
     path('api/logs/', views.get_logs_api, name='get_logs_api'),
     
@@ -35,6 +41,7 @@ urlpatterns = [
     # Actions
     path('admin/add/', views.add_person, name='add_person'),
     path('admin/register_samples/', views.register_samples, name='register_samples'),
+    path('api/enrolment/<str:job_id>/', views.enrolment_status, name='enrolment_status'),
     path('admin/delete/<int:serial_no>/', views.delete_person, name='delete_person'),
     path('admin/update/<int:serial_no>/', views.update_person, name='update_person'),
     
@@ -1,62 +1,79 @@
 import os
-import cv2
 import threading
 import base64
+import hmac
 import time
 import json
+import math
 from datetime import datetime
-from pymongo import MongoClient
-from pymongo.errors import ConfigurationError, ConnectionFailure, ServerSelectionTimeoutError
-from bson.objectid import ObjectId
 
 from django.shortcuts import render, redirect
-from django.http import HttpResponse, StreamingHttpResponse, JsonResponse
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse, JsonResponse
+from django.core.handlers.asgi import ASGIRequest
 from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
 from django.urls import reverse
+from django.utils.functional import SimpleLazyObject, empty
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 
 # Import core modules (moved inside core app)
-from .config import MONGODB_URI, DATABASE_NAME, COLLECTION_NAME
-from .json_db import JsonDB
+from .config import MONGODB_URI, DATABASE_NAME, COLLECTION_NAME, ENROLMENT_WORKERS
+from .config import INFERENCE_SCHEDULER, INFERENCE_INTERVAL, INFERENCE_MAX_BATCH, INFERENCE_MAIN_PRIORITY
+from .config import (
+    DB_MAX_POOL_SIZE, DB_MIN_POOL_SIZE, DB_CONNECT_TIMEOUT_MS, DB_SERVER_SELECTION_TIMEOUT_MS,
+    DB_SOCKET_TIMEOUT_MS, DB_RETRY_INTERVAL, DB_TRANSIENT_RETRIES,
+)
+from .config import CAMERA_SCAN_DEVICES, CAMERA_SOURCES, CAMERA_SCAN_TTL, CAMERA_PROBE_TIMEOUT
+from .config import METRICS_ENABLED, METRICS_TOKEN
+from .config import ADMIN_EMAILS, ADMIN_TOKEN, PROFILER_MAX_SECONDS
+from .db_provider import DatabaseProvider, LazyDatabase
 from .camera_manager import CameraManager, CameraStream
 from .auth_manager import AuthManager
+from .enrolment_jobs import EnrolmentQueue
+from .frame_broadcast import STREAM_PROFILES, resolve_profile
+from .inference_scheduler import InferenceScheduler
+from .thumbnails import ThumbnailCache
+from .camera_registry import CameraRegistry, parse_sources
+from .stage_timer import stage_timer
+from .metrics import metrics, observe_stage, STREAM_FRAMES_SENT, STREAM_FRAMES_SKIPPED, STREAM_VIEWERS
+from .sampling_profiler import SamplingProfiler, ProfilerBusy
 
 # Setup Global State
 cameras = {}
 main_camera_id = None
 lock = threading.Lock()
 
-# DB Config
-# DB Config
-import certifi
-
-try:
-    print("Attempting to connect to MongoDB Atlas...")
-    client = MongoClient(MONGODB_URI, serverSelectionTimeoutMS=5000, tlsCAFile=certifi.where())
-    client.admin.command('ping') 
-    print("Connected to MongoDB (Primary - Certifi)")
-    db = client[DATABASE_NAME]
-    persons = db[COLLECTION_NAME]
-except (ConfigurationError, ConnectionFailure, ServerSelectionTimeoutError) as e:
-    print(f"Warning: Primary connection failed ({e}). Trying Unverified SSL...")
-    try:
-        client = MongoClient(MONGODB_URI, serverSelectionTimeoutMS=3000, tls=True, tlsAllowInvalidCertificates=True)
-        client.admin.command('ping')
-        print("Connected to MongoDB (Atlas - Unverified SSL)")
-        db = client[DATABASE_NAME]
-        persons = db[COLLECTION_NAME]
-    except Exception as e_ssl:
-        print(f"Warning: SSL connection failed ({e_ssl}). Trying Localhost...")
-        try:
-             client = MongoClient("mongodb://localhost:27017/", serverSelectionTimeoutMS=2000)
-             client.admin.command('ping')
-             print("Connected to MongoDB (Localhost)")
-             db = client[DATABASE_NAME]
-             persons = db[COLLECTION_NAME]
-        except Exception as e2:
-             print(f"Info: Localhost MongoDB not available. Using Built-in Local Storage (json_db).")
-             db = JsonDB("smart_vision") 
-             persons = db[COLLECTION_NAME]
+# DB Config: the backend is picked on first use, not at import (see db_provider)
+db_provider = DatabaseProvider(
+    MONGODB_URI, DATABASE_NAME,
+    max_pool_size=DB_MAX_POOL_SIZE, min_pool_size=DB_MIN_POOL_SIZE,
+    connect_timeout_ms=DB_CONNECT_TIMEOUT_MS, server_selection_timeout_ms=DB_SERVER_SELECTION_TIMEOUT_MS,
+    socket_timeout_ms=DB_SOCKET_TIMEOUT_MS, retry_interval=DB_RETRY_INTERVAL,
+    transient_retries=DB_TRANSIENT_RETRIES
+)
+db = LazyDatabase(db_provider)
+persons = db[COLLECTION_NAME]
+counters = db['counters']
+serial_seed_lock = threading.Lock()
+
+def next_serial_no():
+    """
+    Allocates a person serial_no with an atomic $inc on a counters document, so
+    concurrent add_person requests and enrolment workers never hand out the same one.
+    The counter is seeded from the highest existing serial_no on first use.
+    """
+    with serial_seed_lock:
+        if counters.find_one({"_id": "person_serial_no"}) is None:
+            last = persons.find_one({}, {"serial_no": 1}, sort=[("serial_no", -1)])
+            try:
+                counters.insert_one({"_id": "person_serial_no", "value": last['serial_no'] if last else 1000})
+            except DuplicateKeyError:
+                pass # Seeded by another process
+    counter = counters.find_one_and_update(
+        {"_id": "person_serial_no"}, {"$inc": {"value": 1}}, return_document=ReturnDocument.AFTER
+    )
+    return counter['value']
 
 # App Config Shim
 class AppConfig:
@@ -72,9 +89,89 @@ class AppConfig:
 app_shim = AppConfig()
 os.makedirs(app_shim['UPLOAD_FOLDER'], exist_ok=True)
 
-# Initialize Manager
-camera_manager = CameraManager(app_shim.config, db)
-auth_manager = AuthManager(db, app_shim.config)
+thumbnails = ThumbnailCache(os.path.join(app_shim['UPLOAD_FOLDER'], 'thumbs'), app_shim['UPLOAD_FOLDER'])
+PERSON_LIST_FIELDS = {"photo_bin": 0} # Never ship photo blobs in listings
+
+class LockedLazyObject(SimpleLazyObject):
+    """SimpleLazyObject whose factory runs once, even when concurrent requests touch it first."""
+    def __init__(self, func):
+        self.__dict__['_setup_lock'] = threading.Lock() # Instance dict: reading it never triggers _setup
+        super().__init__(func)
+
+    def _setup(self):
+        with self._setup_lock:
+            if self._wrapped is empty:
+                super()._setup()
+
+# Initialize Manager (lazily: models and known faces load on the first request that needs them)
+camera_manager = LockedLazyObject(lambda: CameraManager(app_shim.config, db))
+auth_manager = LockedLazyObject(lambda: AuthManager(db, app_shim.config))
+enrolment_queue = EnrolmentQueue(workers=ENROLMENT_WORKERS)
+
+# One batched inference loop for all cameras (None = a detection thread per camera)
+inference_scheduler = None
+if INFERENCE_SCHEDULER:
+    inference_scheduler = InferenceScheduler(lambda items: camera_manager.detect_batch(items), interval=INFERENCE_INTERVAL, max_batch=INFERENCE_MAX_BATCH)
+
+# Discovered/configured capture sources, probed in the background (first scan on the first camera list request,
+# so imports, migrations and management commands don't open devices)
+camera_registry = CameraRegistry(CAMERA_SCAN_DEVICES, parse_sources(CAMERA_SOURCES), ttl=CAMERA_SCAN_TTL, probe_timeout=CAMERA_PROBE_TIMEOUT)
+
+# Pulled into /metrics at scrape time (nothing here runs on the hot path)
+CAMERA_UP = metrics.gauge("smartvision_camera_up", "1 while the camera delivers frames", ("camera",))
+DETECTIONS_RUN = metrics.counter("smartvision_detections_run_total", "Detection cycles the motion gate let through", ("camera",))
+DETECTIONS_SKIPPED = metrics.counter("smartvision_detections_skipped_total", "Detection cycles skipped on a static scene", ("camera",))
+LOG_QUEUE_DEPTH = metrics.gauge("smartvision_log_queue_depth", "Events waiting for the background DB writer")
+LOG_EVENTS = metrics.counter("smartvision_log_events_total", "Events by outcome in the background DB writer", ("outcome",))
+AUTO_REGISTRATIONS = metrics.counter("smartvision_auto_registrations_total", "Auto-registered faces by outcome in their background writer", ("outcome",))
+SSE_CLIENTS = metrics.gauge("smartvision_sse_clients", "Connected Server-Sent Events clients")
+ENROLMENT_QUEUE_DEPTH = metrics.gauge("smartvision_enrolment_queue_depth", "Enrolment jobs waiting for a worker")
+INFERENCE_BATCHES = metrics.counter("smartvision_inference_batches_total", "Batches run by the inference scheduler")
+INFERENCE_FRAMES = metrics.counter("smartvision_inference_frames_total", "Frames run by the inference scheduler")
+DB_BACKEND = metrics.gauge("smartvision_db_backend", "Active database backend (1 = in use)", ("backend",))
+DB_FAILOVERS = metrics.counter("smartvision_db_failovers_total", "MongoDB outages detected at runtime")
+
+def collect_metrics():
+    with lock:
+        streams = [entry['stream'] for entry in cameras.values()]
+    for stream in streams:
+        CAMERA_UP.set(stream.camera_id, value=1 if stream.grabbed else 0)
+        if stream.motion_gate:
+            DETECTIONS_RUN.set(stream.camera_id, value=stream.motion_gate.detections_run)
+            DETECTIONS_SKIPPED.set(stream.camera_id, value=stream.motion_gate.detections_skipped)
+    ENROLMENT_QUEUE_DEPTH.set(value=enrolment_queue.queue.qsize())
+    if inference_scheduler:
+        INFERENCE_BATCHES.set(value=inference_scheduler.batches)
+        INFERENCE_FRAMES.set(value=inference_scheduler.frames)
+    if db_provider.backend:
+        for backend in list(DB_BACKEND.values):
+            DB_BACKEND.set(*backend, value=0)
+        DB_BACKEND.set(db_provider.backend, value=1)
+    DB_FAILOVERS.set(value=db_provider.failovers)
+    if camera_manager._wrapped is not empty: # Don't load the models just to report on them
+        writer = camera_manager.log_writer.stats()
+        LOG_QUEUE_DEPTH.set(value=writer['queued'])
+        for outcome in ('written', 'dropped', 'failed'):
+            LOG_EVENTS.set(outcome, value=writer[outcome])
+        writer = camera_manager.person_writer.stats()
+        for outcome in ('written', 'dropped', 'failed'):
+            AUTO_REGISTRATIONS.set(outcome, value=writer[outcome])
+        SSE_CLIENTS.set(value=camera_manager.hub.stats()['clients'])
+
+if METRICS_ENABLED:
+    stage_timer.add_observer(observe_stage)
+    metrics.add_collector(collect_metrics)
+
+profiler = SamplingProfiler(max_duration=PROFILER_MAX_SECONDS)
+
+def _is_admin(request):
+    if ADMIN_TOKEN and hmac.compare_digest(request.headers.get('Authorization', '').encode(), f"Bearer {ADMIN_TOKEN}".encode()):
+        return True
+    email = request.session.get('user_email')
+    return bool(email) and email.lower() in ADMIN_EMAILS
+
+def _camera_priority(device_id):
+    return INFERENCE_MAIN_PRIORITY if device_id == main_camera_id else 1.0
 
 # --- VIEWS ---
 
@@ -82,56 +179,88 @@ def index(request):
     return render(request, 'index.html')
 
 # Streaming Generator
-def generate_frames(device_id):
-    while True:
-        stream = None
-        with lock:
-            if device_id in cameras:
-                stream = cameras[device_id]['stream']
-        
-        if stream:
-            frame = stream.read()
-            if frame is None:
-                time.sleep(0.01)
+def generate_frames(device_id, profile=None):
+    """
+    Yields MJPEG parts from the stream's shared broadcaster (one encode per frame and profile).
+    Paced to the profile's max FPS; a slow client simply skips to the newest frame.
+    """
+    profile = profile or STREAM_PROFILES['full']
+    min_interval = 1.0 / profile['fps']
+    stream = None
+    seq = 0
+    last_sent = 0.0
+    try:
+        while True:
+            with lock:
+                current = cameras[device_id]['stream'] if device_id in cameras else None
+            
+            if current is None:
+                time.sleep(0.1)
                 continue
+            if current is not stream:
+                # Camera (re)added: sequence numbers restart
+                if stream is not None:
+                    STREAM_VIEWERS.dec(stream.camera_id)
+                stream, seq = current, 0
+                STREAM_VIEWERS.inc(stream.camera_id)
             
-            ret, buffer = cv2.imencode('.jpg', frame)
-            if ret:
-                yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-        
-        time.sleep(0.03)
+            wait = last_sent + min_interval - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            
+            # Blocks until a new frame is published
+            new_seq, jpeg = stream.broadcaster.wait_jpeg(seq, timeout=1.0, width=profile['width'], quality=profile['quality'])
+            if jpeg is not None:
+                if seq and new_seq > seq + 1:
+                    STREAM_FRAMES_SKIPPED.inc(stream.camera_id, amount=new_seq - seq - 1)
+                last_sent = time.time()
+                # Time until the client has taken the part (slow clients show up here)
+                with stage_timer.measure("stream_write", stream.camera_id):
+                    yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
+                STREAM_FRAMES_SENT.inc(stream.camera_id)
+            seq = new_seq
+    finally:
+        if stream is not None:
+            STREAM_VIEWERS.dec(stream.camera_id)
 
 def video_feed(request, device_id):
-    return StreamingHttpResponse(generate_frames(device_id), content_type='multipart/x-mixed-replace; boundary=frame')
+    """MJPEG stream. Optional query params: profile=full|low|thumb, width, quality, fps."""
+    profile = resolve_profile(request.GET)
+    return StreamingHttpResponse(generate_frames(device_id, profile), content_type='multipart/x-mixed-replace; boundary=frame')
 
 def get_cameras(request):
     """
-    Scans for available cameras (0-9) that are NOT already added to the system.
-    Returns a list of available camera info.
+    Available cameras that are NOT already added to the system, from the registry's last scan.
+    Doesn't touch any device; only the very first call starts and waits for the initial scan.
     """
-    available = []
-    # Simple scan of first 5 indexes
-    for i in range(5):
-        # Skip if already added
-        if i in cameras:
-            continue
-            
-        cap = cv2.VideoCapture(i, cv2.CAP_DSHOW)
-        if cap.isOpened():
-            ret, _ = cap.read()
-            if ret:
-                available.append({'id': i, 'label': f'Camera {i}'})
-            cap.release()
-    return JsonResponse(available, safe=False)
+    with lock:
+        active = set(cameras)
+    if camera_registry.last_scan == 0:
+        camera_registry.rescan(skip=active)
+        camera_registry.wait(CAMERA_PROBE_TIMEOUT + 1)
+    return JsonResponse(camera_registry.available(exclude=active), safe=False)
+
+@csrf_exempt
+def rescan_cameras(request):
+    """Probes all sources again (except active cameras) and returns the fresh list."""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=400)
+    with lock:
+        active = set(cameras)
+    camera_registry.rescan(skip=active)
+    camera_registry.wait(CAMERA_PROBE_TIMEOUT + 1)
+    return JsonResponse(camera_registry.available(exclude=active), safe=False)
 
 def get_added_cameras(request):
     active_list = []
     with lock:
         for cam_id, cam_data in cameras.items():
+            gate = cam_data['stream'].motion_gate
             active_list.append({
                 'id': cam_id,
                 'label': cam_data['label'],
-                'main': cam_data.get('main', False)
+                'main': cam_data.get('main', False),
+                'detection': gate.stats() if gate else None
             })
     return JsonResponse(active_list, safe=False)
 
@@ -151,16 +280,20 @@ def add_camera(request):
                 else:
                     cameras[device_id]['stream'].stop()
                     del cameras[device_id]
+                    if inference_scheduler: inference_scheduler.unregister(device_id)
 
             try:
                 # Ensure source is integer for local webcams
                 source = device_id
                 if isinstance(source, str) and source.isdigit():
                     source = int(source)
+                # Configured URL/file sources are addressed by their registry id
+                if isinstance(source, int) and camera_registry.source(source) is not None:
+                    source = camera_registry.source(source)
 
-                stream = CameraStream(source, data['label'])
+                stream = CameraStream(source, data['label'], camera_id=device_id)
                 # Start stream first to establish connection
-                stream.start()
+                stream.start(run_detector=inference_scheduler is None)
                 
                 # Check for initial grab
                 time.sleep(1.0) # slightly longer wait
@@ -178,6 +311,8 @@ def add_camera(request):
                 if main_camera_id is None:
                     main_camera_id = device_id
                     cameras[device_id]['main'] = True
+                if inference_scheduler:
+                    inference_scheduler.register(device_id, stream, priority=_camera_priority(device_id))
             except Exception as e:
                 print(f"Error adding camera: {e}")
                 return JsonResponse({'success': False, 'message': str(e)})
@@ -188,10 +323,14 @@ def set_main(request, device_id):
     global main_camera_id
     with lock:
         if device_id in cameras:
+            previous = main_camera_id
             if main_camera_id is not None:
                 cameras[main_camera_id]['main'] = False
             main_camera_id = device_id
             cameras[device_id]['main'] = True
+            if inference_scheduler:
+                inference_scheduler.set_priority(previous, _camera_priority(previous))
+                inference_scheduler.set_priority(device_id, _camera_priority(device_id))
     return JsonResponse({'success': True})
 
 @csrf_exempt
@@ -209,7 +348,70 @@ def set_roi(request):
     return JsonResponse({'error': 'POST required'}, status=400)
 
 def get_stats(request):
-    return JsonResponse(camera_manager.get_stats())
+    # Served from the cached snapshot; pollers revalidate with If-None-Match
+    etag, stats = camera_manager.get_stats_snapshot()
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse(stats)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+def event_stream(request):
+    """
+    Server-Sent Events: detections, counter deltas and emergency changes as they happen.
+    Under ASGI idle clients are parked on the event loop; under WSGI each holds a thread.
+    """
+    hub = camera_manager.hub
+    last_id = request.headers.get('Last-Event-ID')
+    hello = lambda: {"stats": camera_manager.get_stats(), "emergency": camera_manager.emergency.get_status()}
+    if isinstance(request, ASGIRequest):
+        stream = hub.stream_async(last_id, hello)
+    else:
+        stream = hub.stream(last_id, hello)
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no' # Don't let a proxy buffer the stream
+    return response
+
+def metrics_view(request):
+    """Prometheus text exposition of the pipeline metrics."""
+    if not METRICS_ENABLED:
+        return HttpResponse(status=404)
+    if METRICS_TOKEN and request.headers.get('Authorization') != f"Bearer {METRICS_TOKEN}":
+        return HttpResponse(status=401)
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def profile_view(request):
+    """
+    Admin only. Samples every thread's stack for `seconds` (default 5, capped) and returns
+    collapsed stacks (flamegraph.pl / speedscope input), or JSON with ?format=json.
+    Params: seconds, interval (s, default 0.01), threads (thread-name prefix, e.g. "camera:"),
+    idle=1 to include threads that are blocked rather than using CPU.
+    """
+    if not _is_admin(request):
+        return JsonResponse({'error': 'Admin only'}, status=403)
+    try:
+        seconds = float(request.GET.get('seconds', 5))
+        interval = float(request.GET.get('interval', 0.01))
+    except ValueError:
+        return JsonResponse({'error': 'seconds and interval must be numbers'}, status=400)
+    if not (math.isfinite(seconds) and math.isfinite(interval)):
+        return JsonResponse({'error': 'seconds and interval must be finite'}, status=400)
+    try:
+        lines, summary = profiler.run(seconds, interval, threads=request.GET.get('threads') or None,
+                                      include_idle=request.GET.get('idle') == '1')
+    except ProfilerBusy as e:
+        return JsonResponse({'error': str(e)}, status=409)
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({**summary, 'collapsed': lines})
+    response = HttpResponse("\n".join(lines) + "\n", content_type='text/plain; charset=utf-8')
+    response['X-Profile-Samples'] = summary['samples']
+    response['X-Profile-Duration'] = summary['duration']
+    response['X-Profile-Mode'] = summary['mode']
+    return response
 
 def get_emergency_status(request):
     return JsonResponse(camera_manager.emergency.get_status())
@@ -293,8 +495,8 @@ def logout_view(request):
 # --- ADMIN ---
 
 def admin_panel(request):
-    all_persons = list(persons.find().sort("serial_no", -1))
-    return render(request, 'admin.html', {'persons': all_persons})
+    # The React app pages through /api/persons/ itself
+    return render(request, 'admin.html')
 
 def contacts_panel(request):
     contacts = camera_manager.emergency.get_contacts()
@@ -331,8 +533,7 @@ def add_person(request):
         phone = request.POST.get('phone')
         address = request.POST.get('address')
         
-        last = persons.find_one(sort=[("serial_no", -1)])
-        serial_no = (last['serial_no'] + 1) if last else 1001
+        serial_no = next_serial_no()
         
         photo_path = "default.jpg"
         photo_bin = None
@@ -362,113 +563,121 @@ def add_person(request):
             "relation": relation,
             "photo": photo_path
         }
-        camera_manager.add_person_to_memory(new_person)
+        job_id = enrolment_queue.submit("add_person", camera_manager.add_person_to_memory, new_person)
         
-        return JsonResponse({"success": True})
+        return JsonResponse({"success": True, "job_id": job_id})
     return JsonResponse({'error': 'POST required'}, status=400)
 
 
 @csrf_exempt
 def delete_person(request, serial_no):
-    p = persons.find_one({"serial_no": int(serial_no)})
+    p = persons.find_one({"serial_no": int(serial_no)}, {"name": 1})
     if p:
-        name = p['name']
-        persons.delete_one({"serial_no": int(serial_no)})
-        camera_manager.remove_person_from_memory(name)
-        return JsonResponse({"success": True})
+        # Queued behind any add/register job for this person, which would otherwise re-add them
+        job_id = enrolment_queue.submit("delete_person", _delete_person_job, int(serial_no))
+        return JsonResponse({"success": True, "job_id": job_id})
     return JsonResponse({"success": False, "message": "Person not found"})
 
+def _delete_person_job(serial_no):
+    """Enrolment job: deletes the person and drops their encodings from the gallery."""
+    p = persons.find_one({"serial_no": serial_no}, {"name": 1})
+    if not p:
+        return {"serial_no": serial_no, "deleted": False}
+    persons.delete_one({"serial_no": serial_no})
+    camera_manager.remove_person_from_memory(p['name'])
+    return {"serial_no": serial_no, "deleted": True}
+
 @csrf_exempt
 def register_samples(request):
     if request.method == 'POST':
         data = json.loads(request.body)
-        name = data['name']
-        relation = data['relation']
-        phone = data['phone']
-        address = data['address']
-        images = data['images'] # List of base64 strings
-        
-        # Check for existing person
-        existing_person = persons.find_one({"name": name})
-        
-        if existing_person:
-            serial_no = existing_person['serial_no']
-            if 'photo_dir' in existing_person and existing_person['photo_dir']:
-                dir_name = existing_person['photo_dir'].split('/')[-1]
-                save_dir = os.path.join(app_shim['UPLOAD_FOLDER'], existing_person['photo_dir'])
-            else:
-                clean_name = "".join([c for c in name if c.isalnum() or c in (' ', '-', '_')]).strip().replace(' ', '_')
-                dir_name = f"{serial_no}_{clean_name}"
-                save_dir = os.path.join(app_shim['UPLOAD_FOLDER'], 'known', dir_name)
+        job_id = enrolment_queue.submit(
+            "register_samples", _register_samples_job,
+            data['name'], data['relation'], data['phone'], data['address'],
+            data['images'] # List of base64 strings
+        )
+        return JsonResponse({"success": True, "job_id": job_id})
+    return JsonResponse({'error': 'POST required'}, status=400)
+
+def _register_samples_job(name, relation, phone, address, images):
+    """Enrolment job: saves the samples, upserts the person and loads their encodings."""
+    # Check for existing person
+    existing_person = persons.find_one({"name": name}, PERSON_LIST_FIELDS)
+    
+    if existing_person:
+        serial_no = existing_person['serial_no']
+        if 'photo_dir' in existing_person and existing_person['photo_dir']:
+            dir_name = existing_person['photo_dir'].split('/')[-1]
+            save_dir = os.path.join(app_shim['UPLOAD_FOLDER'], existing_person['photo_dir'])
         else:
-            last = persons.find_one(sort=[("serial_no", -1)])
-            serial_no = (last['serial_no'] + 1) if last else 1001
-            
             clean_name = "".join([c for c in name if c.isalnum() or c in (' ', '-', '_')]).strip().replace(' ', '_')
             dir_name = f"{serial_no}_{clean_name}"
             save_dir = os.path.join(app_shim['UPLOAD_FOLDER'], 'known', dir_name)
-
-        os.makedirs(save_dir, exist_ok=True)
+    else:
+        serial_no = next_serial_no()
         
-        first_image_path = None
-        first_image_bin = None
-        
-        for idx, img_data in enumerate(images):
-            if ',' in img_data: img_data = img_data.split(',')[1]
-            try:
-                img_bytes = base64.b64decode(img_data)
-                ts = int(time.time() * 1000)
-                filename = f"sample_{ts}_{idx}.jpg"
-                filepath = os.path.join(save_dir, filename)
-                with open(filepath, "wb") as f:
-                     f.write(img_bytes)
-                
-                if idx == 0: 
-                    first_image_path = f"known/{dir_name}/{filename}"
-                    first_image_bin = img_bytes # Keep for binary storage
-            except Exception as e:
-                print(f"Error saving image: {e}")
-
-        if existing_person:
-            update_fields = {
-                "relation": relation,
-                "phone": phone,
-                "address": address,
-                "photo_dir": f"known/{dir_name}"
-            }
-            if existing_person.get('photo', 'default.jpg') == 'default.jpg' and first_image_path:
-                 update_fields['photo'] = first_image_path
-                 update_fields['photo_bin'] = first_image_bin
-                 
-            persons.update_one({"_id": existing_person['_id']}, {"$set": update_fields})
-        else:
-            persons.insert_one({
-                "serial_no": serial_no,
-                "name": name,
-                "relation": relation,
-                "phone": phone,
-                "address": address,
-                "photo": first_image_path if first_image_path else "default.jpg",
-                "photo_bin": first_image_bin if first_image_path else None,
-                "photo_dir": f"known/{dir_name}",
-                "created_at": datetime.now()
-            })
-        
-        if existing_person:
-            camera_manager.add_person_to_memory({
-                "name": name,
-                "relation": relation,
-                "photo_dir": f"known/{dir_name}" 
-            })
-        else:
-            camera_manager.add_person_to_memory({
-                "name": name,
-                "relation": relation,
-                "photo_dir": f"known/{dir_name}"
-            })
+        clean_name = "".join([c for c in name if c.isalnum() or c in (' ', '-', '_')]).strip().replace(' ', '_')
+        dir_name = f"{serial_no}_{clean_name}"
+        save_dir = os.path.join(app_shim['UPLOAD_FOLDER'], 'known', dir_name)
 
-        return JsonResponse({"success": True})
-    return JsonResponse({'error': 'POST required'}, status=400)
+    os.makedirs(save_dir, exist_ok=True)
+    
+    first_image_path = None
+    first_image_bin = None
+    
+    for idx, img_data in enumerate(images):
+        if ',' in img_data: img_data = img_data.split(',')[1]
+        try:
+            img_bytes = base64.b64decode(img_data)
+            ts = int(time.time() * 1000)
+            filename = f"sample_{ts}_{idx}.jpg"
+            filepath = os.path.join(save_dir, filename)
+            with open(filepath, "wb") as f:
+                 f.write(img_bytes)
+            
+            if idx == 0: 
+                first_image_path = f"known/{dir_name}/{filename}"
+                first_image_bin = img_bytes # Keep for binary storage
+        except Exception as e:
+            print(f"Error saving image: {e}")
+
+    if existing_person:
+        update_fields = {
+            "relation": relation,
+            "phone": phone,
+            "address": address,
+            "photo_dir": f"known/{dir_name}"
+        }
+        if existing_person.get('photo', 'default.jpg') == 'default.jpg' and first_image_path:
+             update_fields['photo'] = first_image_path
+             update_fields['photo_bin'] = first_image_bin
+             
+        persons.update_one({"_id": existing_person['_id']}, {"$set": update_fields})
+    else:
+        persons.insert_one({
+            "serial_no": serial_no,
+            "name": name,
+            "relation": relation,
+            "phone": phone,
+            "address": address,
+            "photo": first_image_path if first_image_path else "default.jpg",
+            "photo_bin": first_image_bin if first_image_path else None,
+            "photo_dir": f"known/{dir_name}",
+            "created_at": datetime.now()
+        })
+    
+    encodings = camera_manager.add_person_to_memory({
+        "name": name,
+        "relation": relation,
+        "photo_dir": f"known/{dir_name}"
+    })
+    return {"serial_no": serial_no, "encodings": encodings}
+
+def enrolment_status(request, job_id):
+    job = enrolment_queue.get(job_id)
+    if job is None:
+        return JsonResponse({"success": False, "message": "Job not found"}, status=404)
+    return JsonResponse(job)
 
 @csrf_exempt
 def update_person(request, serial_no):
@@ -489,8 +698,8 @@ def update_person(request, serial_no):
                 data["photo"] = photo_path
         
         persons.update_one({"serial_no": int(serial_no)}, {"$set": data})
-        camera_manager.load_known_faces()
-        return JsonResponse({"success": True})
+        job_id = enrolment_queue.submit("reload_faces", camera_manager.load_known_faces)
+        return JsonResponse({"success": True, "job_id": job_id})
     return JsonResponse({"success": False, "message": "POST required"}, status=400)
 
 # --- API AUTH & ACTIONS ---
@@ -503,6 +712,7 @@ def api_login(request):
         user, msg = auth_manager.login_user(email, password)
         if user:
             request.session['user_id'] = str(user.id)
+            request.session['user_email'] = user.email
             return JsonResponse({'success': True, 'user': {'name': user.name, 'email': user.email}})
         return JsonResponse({'success': False, 'message': msg})
     return JsonResponse({'error': 'POST required'}, status=400)
@@ -532,19 +742,60 @@ def api_delete_contact(request, contact_id):
 
 # API Endpoints for React
 def get_persons_api(request):
-    all_persons = list(persons.find().sort("serial_no", -1))
-    for p in all_persons:
+    """
+    One page of persons, newest serial first, without photo blobs.
+    ?limit= (max 200) and ?cursor=<serial_no of the last item seen>; `next_cursor` is
+    null on the last page. The first page also carries the totals for the stat cards.
+    """
+    try:
+        limit = min(200, max(1, int(request.GET.get('limit', 50))))
+        cursor = int(request.GET['cursor']) if request.GET.get('cursor') else None
+    except ValueError:
+        return JsonResponse({'error': 'Invalid limit/cursor'}, status=400)
+
+    query = {"serial_no": {"$lt": cursor}} if cursor is not None else {}
+    page = list(persons.find(query, PERSON_LIST_FIELDS).sort("serial_no", -1).limit(limit + 1))
+    has_more = len(page) > limit
+    page = page[:limit]
+    for p in page:
         if '_id' in p:
             p['_id'] = str(p['_id'])
-        
-        # Handle binary image data if present
-        if 'photo_bin' in p and isinstance(p['photo_bin'], bytes):
-            b64 = base64.b64encode(p['photo_bin']).decode('utf-8')
-            p['image'] = f"data:image/png;base64,{b64}"
-            # Remove binary from response to save bandwidth
-            del p['photo_bin']
-            
-    return JsonResponse(all_persons, safe=False)
+        version = thumbnails.version(p.get('photo'))
+        if version:
+            p['thumbnail'] = f"/api/persons/{p['serial_no']}/thumbnail/?v={version}"
+
+    response = {
+        "items": page,
+        "next_cursor": page[-1]['serial_no'] if has_more else None,
+    }
+    if cursor is None:
+        response["counts"] = {
+            "total": persons.count_documents({}),
+            "employees": persons.count_documents({"relation": "Employee"}),
+            "family": persons.count_documents({"relation": {"$regex": "Family"}}),
+            "visitors": persons.count_documents({"relation": {"$in": ["Visitor", "Suspect"]}}),
+        }
+    return JsonResponse(response)
+
+def person_thumbnail(request, serial_no):
+    """Resized person photo, generated once and stored; versioned URLs make it cacheable forever."""
+    p = persons.find_one({"serial_no": int(serial_no)}, {"photo": 1})
+    version = thumbnails.version(p.get('photo')) if p else None
+    if version is None:
+        return HttpResponse(status=404)
+
+    etag = f'"{version}"'
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        load_bin = lambda: (persons.find_one({"serial_no": int(serial_no)}, {"photo_bin": 1}) or {}).get('photo_bin')
+        _, data = thumbnails.get(int(serial_no), p.get('photo'), load_bin)
+        if data is None:
+            return HttpResponse(status=404)
+        response = HttpResponse(data, content_type='image/jpeg')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
 
 def get_contacts_api(request):
     contacts = camera_manager.emergency.get_contacts()
@@ -554,24 +805,36 @@ def get_contacts_api(request):
     return JsonResponse(contacts, safe=False)
 
 def get_logs_api(request):
-    # Fetch from MongoDB instead of memory
+    # Newest events from the day-partitioned store (only the partitions needed are read)
     try:
-        logs = list(db['suspect_logs'].find().sort("timestamp", -1).limit(100))
+        limit = min(500, max(1, int(request.GET.get('limit', 100))))
+        skip = max(0, int(request.GET.get('skip', 0)))
+        logs = camera_manager.event_store.recent(limit, skip)
         for log in logs:
             if '_id' in log: log['_id'] = str(log['_id'])
     except:
         logs = []
     return JsonResponse(logs, safe=False)
 
+def get_stats_trend(request):
+    # Served from the hourly/daily rollups, so cost doesn't grow with history
+    try:
+        days = min(366, max(1, int(request.GET.get('days', 7))))
+    except ValueError:
+        days = 7
+    period = 'hour' if request.GET.get('period') == 'hour' else 'day'
+    trend = camera_manager.event_store.trend(
+        days, period, camera=request.GET.get('camera'), category=request.GET.get('category', 'events')
+    )
+    return JsonResponse([{'label': label, 'count': count} for label, count in trend], safe=False)
+
 @csrf_exempt
 def api_delete_log(request, log_id):
     if request.method == 'DELETE':
         try:
-            result = db['suspect_logs'].delete_one({'_id': ObjectId(log_id)})
-            if result.deleted_count > 0:
-                # Also remove from memory history if needed, but CameraManager usually re-reads or appends.
-                # However, get_stats() returns history from memory. We might need to sync.
-                # For now, just DB deletion. The frontend re-fetches or updates local state.
+            if camera_manager.event_store.delete(log_id):
+                # Counters/history are cached in memory; resync them with the DB
+                camera_manager.request_stats_reconcile()
                 return JsonResponse({'success': True})
             return JsonResponse({'success': False, 'message': 'Log not found'})
         except Exception as e:
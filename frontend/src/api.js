@@ -5,6 +5,11 @@ export const fetchCameras = async () => {
     return res.json();
 };
 
+export const rescanCameras = async () => {
+    const res = await fetch(`${API_BASE}/api/cameras/rescan/`, { method: 'POST' });
+    return res.json();
+};
+
 export const fetchAddedCameras = async () => {
     const res = await fetch(`${API_BASE}/api/added_cameras/`);
     return res.json();
@@ -36,6 +41,17 @@ export const fetchStats = async () => {
     return res.json();
 };
 
+// Server-sent events: { hello, detection, stats, emergency, resync } -> handler(data)
+// Returns a function that closes the stream, or null if EventSource is unavailable.
+export const subscribeEvents = (handlers) => {
+    if (!window.EventSource) return null;
+    const source = new EventSource(`${API_BASE}/api/events/`);
+    Object.entries(handlers).forEach(([event, handler]) => {
+        source.addEventListener(event, (e) => handler(JSON.parse(e.data)));
+    });
+    return () => source.close();
+};
+
 export const fetchEmergencyStatus = async () => {
     const res = await fetch(`${API_BASE}/api/emergency_status/`);
     return res.json();
@@ -58,6 +74,16 @@ export const registerSample = async (payload) => {
     return res.json();
 };
 
+// Enrolment runs in the background; poll until the job finishes
+export const waitForEnrolment = async (jobId, intervalMs = 500) => {
+    while (true) {
+        const res = await fetch(`${API_BASE}/api/enrolment/${jobId}/`);
+        const job = await res.json();
+        if (!res.ok || job.status === 'done' || job.status === 'failed') return job;
+        await new Promise(r => setTimeout(r, intervalMs));
+    }
+};
+
 export const addPerson = async (formData) => {
     const res = await fetch(`${API_BASE}/admin/add/`, {
         method: 'POST',
@@ -115,8 +141,11 @@ export const deleteContact = async (id) => {
 };
 
 // New API functions
-export const fetchPersons = async () => {
-    const res = await fetch(`${API_BASE}/api/persons/`);
+// One page of persons: { items, next_cursor, counts (first page only) }
+export const fetchPersons = async (cursor = null, limit = 50) => {
+    const params = new URLSearchParams({ limit });
+    if (cursor !== null) params.set('cursor', cursor);
+    const res = await fetch(`${API_BASE}/api/persons/?${params}`);
     return res.json();
 };
 
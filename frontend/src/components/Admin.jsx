@@ -1,9 +1,11 @@
 import React, { useState, useEffect, useRef } from 'react';
-import { addPerson, registerSample, fetchPersons, updatePerson, deletePerson } from '../api';
+import { addPerson, registerSample, waitForEnrolment, fetchPersons, updatePerson, deletePerson } from '../api';
 import Sidebar from './Sidebar';
 
 const Admin = () => {
     const [persons, setPersons] = useState([]);
+    const [counts, setCounts] = useState({ total: 0, employees: 0, family: 0, visitors: 0 });
+    const [nextCursor, setNextCursor] = useState(null);
     const [showAddModal, setShowAddModal] = useState(false);
     const [showEditModal, setShowEditModal] = useState(false);
     const [editingPerson, setEditingPerson] = useState(null);
@@ -22,7 +24,17 @@ const Admin = () => {
     const loadPersons = async () => {
         try {
             const data = await fetchPersons();
-            setPersons(data);
+            setPersons(data.items);
+            setCounts(data.counts);
+            setNextCursor(data.next_cursor);
+        } catch (e) { console.error("Error loading persons", e); }
+    };
+
+    const loadMorePersons = async () => {
+        try {
+            const data = await fetchPersons(nextCursor);
+            setPersons(prev => [...prev, ...data.items]);
+            setNextCursor(data.next_cursor);
         } catch (e) { console.error("Error loading persons", e); }
     };
 
@@ -58,6 +70,8 @@ const Admin = () => {
         try {
             const res = await registerSample({ ...regForm, images: samples });
             if (res.success) {
+                const job = await waitForEnrolment(res.job_id);
+                if (job.status !== 'done') return alert("Error: " + (job.error || job.message));
                 alert("Registered Successfully!");
                 window.location.reload();
             } else {
@@ -122,6 +136,7 @@ const Admin = () => {
         try {
             const res = await deletePerson(person.serial_no);
             if (res.success || !res.error) {
+                if (res.job_id) await waitForEnrolment(res.job_id); // Deletes are queued behind enrolments
                 loadPersons();
             } else {
                 alert("Error: " + (res.message || res.error));
@@ -160,7 +175,7 @@ const Admin = () => {
                     <div className="col-lg-3">
                         <div className="stat-card border-secondary bg-panel p-4 d-flex justify-content-between align-items-center rounded-3 shadow-sm hover-elevate">
                             <div>
-                                <h2 className="fw-bold mb-0">{persons.length}</h2>
+                                <h2 className="fw-bold mb-0">{counts.total}</h2>
                                 <p className="text-secondary small text-uppercase mb-0 tracking-wider">Total Persons</p>
                             </div>
                             <div className="p-3 rounded-circle bg-primary bg-opacity-10 text-primary">
@@ -171,7 +186,7 @@ const Admin = () => {
                     <div className="col-lg-3">
                         <div className="stat-card border-secondary bg-panel p-4 d-flex justify-content-between align-items-center rounded-3 shadow-sm hover-elevate">
                             <div>
-                                <h2 className="fw-bold mb-0">{persons.filter(p => p.relation === 'Employee').length}</h2>
+                                <h2 className="fw-bold mb-0">{counts.employees}</h2>
                                 <p className="text-secondary small text-uppercase mb-0 tracking-wider">Employees</p>
                             </div>
                             <div className="p-3 rounded-circle bg-success bg-opacity-10 text-success">
@@ -182,7 +197,7 @@ const Admin = () => {
                     <div className="col-lg-3">
                         <div className="stat-card border-secondary bg-panel p-4 d-flex justify-content-between align-items-center rounded-3 shadow-sm hover-elevate">
                             <div>
-                                <h2 className="fw-bold mb-0">{persons.filter(p => p.relation.includes('Family')).length}</h2>
+                                <h2 className="fw-bold mb-0">{counts.family}</h2>
                                 <p className="text-secondary small text-uppercase mb-0 tracking-wider">Family Members</p>
                             </div>
                             <div className="p-3 rounded-circle bg-info bg-opacity-10 text-info">
@@ -193,7 +208,7 @@ const Admin = () => {
                     <div className="col-lg-3">
                         <div className="stat-card border-secondary bg-panel p-4 d-flex justify-content-between align-items-center rounded-3 shadow-sm hover-elevate">
                             <div>
-                                <h2 className="fw-bold mb-0">{persons.filter(p => p.relation === 'Visitor' || p.relation === 'Suspect').length}</h2>
+                                <h2 className="fw-bold mb-0">{counts.visitors}</h2>
                                 <p className="text-secondary small text-uppercase mb-0 tracking-wider">Visitors / Others</p>
                             </div>
                             <div className="p-3 rounded-circle bg-warning bg-opacity-10 text-warning">
@@ -210,7 +225,8 @@ const Admin = () => {
                             <div className="card h-100 bg-panel border-secondary shadow-sm overflow-hidden hover-border-primary transition-all group">
                                 <div className="position-relative" style={{ height: '240px' }}>
                                     <img
-                                        src={p.image ? p.image : (p.photo ? `/static/uploads/${p.photo}` : '/static/default_avatar.png')}
+                                        src={p.thumbnail ? p.thumbnail : (p.photo ? `/static/uploads/${p.photo}` : '/static/default_avatar.png')}
+                                        loading="lazy"
                                         className="w-100 h-100 object-fit-cover transition-transform group-hover-scale-110"
                                         alt={p.name}
                                         onError={(e) => { e.target.onerror = null; e.target.src = 'https://via.placeholder.com/300?text=No+Image'; }}
@@ -264,6 +280,13 @@ const Admin = () => {
                             <p>Start by registering a new person</p>
                         </div>
                     )}
+                    {nextCursor !== null && (
+                        <div className="col-12 text-center">
+                            <button className="btn btn-outline-light border-secondary" onClick={loadMorePersons}>
+                                <i className="fas fa-chevron-down me-2"></i> Load More
+                            </button>
+                        </div>
+                    )}
                 </div>
 
             </div>
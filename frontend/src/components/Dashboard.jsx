@@ -1,5 +1,5 @@
 import React, { useState, useEffect, useRef } from 'react';
-import { fetchAddedCameras, setMainCamera, fetchStats, fetchEmergencyStatus, addCamera, fetchCameras } from '../api';
+import { fetchAddedCameras, setMainCamera, fetchStats, fetchEmergencyStatus, addCamera, fetchCameras, rescanCameras, subscribeEvents } from '../api';
 import ROImodal from './ROImodal';
 import Sidebar from './Sidebar';
 import Logs from './Logs';
@@ -77,6 +77,18 @@ const DashboardContent = ({ onNavigate }) => {
         }
     };
 
+    const handleRescan = async () => {
+        try {
+            const avail = await rescanCameras();
+            setAvailableCameras(avail);
+            if (avail.length > 0) {
+                setNewCamData({ id: avail[0].id, label: avail[0].label });
+            }
+        } catch (e) {
+            alert("Error rescanning cameras");
+        }
+    };
+
     const handleAddCamera = async (e) => {
         e.preventDefault();
         try {
@@ -92,6 +104,20 @@ const DashboardContent = ({ onNavigate }) => {
 
     useEffect(() => {
         loadCameras();
+
+        // Pushed updates; fall back to polling without EventSource
+        const unsubscribe = subscribeEvents({
+            hello: (data) => {
+                setStats(data.stats);
+                setEmergency(data.emergency);
+            },
+            stats: (data) => setStats(prev => ({ ...prev, ...data.counts })),
+            detection: (log) => setStats(prev => ({ ...prev, history: [...(prev.history || []), log].slice(-20) })),
+            emergency: (data) => setEmergency(data),
+            resync: () => loadStats(),
+        });
+        if (unsubscribe) return unsubscribe;
+
         const interval = setInterval(loadStats, 2000);
         const emergInterval = setInterval(checkEmergency, 1000);
         return () => {
@@ -228,7 +254,7 @@ const DashboardContent = ({ onNavigate }) => {
                                     onClick={() => handleSetMain(cam.id)}
                                 >
                                     <img
-                                        src={`/video_feed/${cam.id}/?t=${Date.now()}`}
+                                        src={`/video_feed/${cam.id}/?profile=thumb&t=${Date.now()}`}
                                         className="w-100 h-100 object-fit-cover opacity-75 hover-opacity-100 transition-all"
                                     />
                                     <div className="position-absolute bottom-0 start-0 w-100 p-2 bg-gradient-to-t from-black to-transparent">
@@ -401,6 +427,9 @@ const DashboardContent = ({ onNavigate }) => {
                                 )}
                             </div>
                             <div className="modal-footer border-top border-secondary">
+                                <button type="button" className="btn btn-outline-secondary me-auto" onClick={handleRescan}>
+                                    <i className="fas fa-sync-alt me-2"></i>Rescan
+                                </button>
                                 <button type="button" className="btn btn-outline-light" onClick={() => setShowAddCameraModal(false)}>Cancel</button>
                                 <button type="submit" className="btn btn-primary px-4" disabled={availableCameras.length === 0}>Add Camera</button>
                             </div>
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { fetchLogs, deleteLog } from '../api';
+import { fetchLogs, deleteLog, subscribeEvents } from '../api';
 import Sidebar from './Sidebar';
 
 const Logs = () => {
@@ -9,6 +9,20 @@ const Logs = () => {
 
     useEffect(() => {
         loadLogs();
+
+        // Refetch when something is logged instead of polling
+        let pending = null;
+        const reload = () => {
+            if (!pending) pending = setTimeout(() => { pending = null; loadLogs(); }, 500);
+        };
+        const unsubscribe = subscribeEvents({ detection: reload, resync: reload });
+        if (unsubscribe) {
+            return () => {
+                unsubscribe();
+                clearTimeout(pending);
+            };
+        }
+
         const interval = setInterval(loadLogs, 5000);
         return () => clearInterval(interval);
     }, []);
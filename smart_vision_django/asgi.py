@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
+
+Serving through an ASGI server (e.g. ``uvicorn smart_vision_django.asgi:application``)
+lets the /api/events/ stream park idle dashboard clients on the event loop instead of
+holding a worker thread each.
 """
 
 import os